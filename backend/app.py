@@ -1,20 +1,61 @@
-from flask import Flask, request, jsonify, session
-from flask_socketio import SocketIO, join_room
+# Patch blocking I/O before anything else is imported so pooled database
+# connections and their waits cooperate with eventlet's green threads
+import eventlet
+eventlet.monkey_patch()
+
+import time
+import inspect
+import logging
+import functools
+from flask import Flask, Response, g, request, jsonify, session, json
+from flask_socketio import SocketIO, join_room, emit, rooms
 from flask_cors import CORS
 from backend.config import config
-from backend.database import init_db
+from backend.logs import configure_logging
+from backend.database import init_db, close_db_session, get_pool_stats, failure_count
+from backend import metrics, encodings
+from backend.history_cache import recent_messages
+from backend.pubsub import InProcessManager
+from backend.rooms import private_room, group_room, user_room
+from backend.presence import presence
+from backend.typing_indicators import typing_tracker
+from backend.pagination import decode_cursor
+from backend.versions import versions
 from backend.models.user import User
 from backend.models.private_chat import PrivateChat
 from backend.models.group_chat import GroupChat
+from backend.models.search import Search
+from backend.models.message_batch import MessageBatch
+from backend.models.sync import Sync
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = config.SECRET_KEY
 
+# One pooled connection per HTTP request / socket event, returned on teardown
+app.teardown_appcontext(close_db_session)
+
+# Message queue so emits reach clients connected to other workers / hosts
+socketio_options = {}
+if config.SOCKETIO_MESSAGE_QUEUE:
+    if config.SOCKETIO_MESSAGE_QUEUE.startswith('memory://'):
+        socketio_options['client_manager'] = InProcessManager(channel=config.SOCKETIO_CHANNEL)
+    else:
+        socketio_options['message_queue'] = config.SOCKETIO_MESSAGE_QUEUE
+        socketio_options['channel'] = config.SOCKETIO_CHANNEL
+if config.SOCKETIO_WEBSOCKET_ONLY:
+    socketio_options['transports'] = ['websocket']
+
 # Initializeing SocketIO with CORS
 socketio = SocketIO(app, 
                    cors_allowed_origins="*",
-                   logger=True,
-                   engineio_logger=True)
+                   logger=logging.getLogger('socketio') if config.SOCKETIO_LOGGER else False,
+                   engineio_logger=logging.getLogger('engineio') if config.ENGINEIO_LOGGER else False,
+                   # Encode payloads like jsonify does (messages carry datetimes)
+                   json=json,
+                   **socketio_options)
 
 #Enableing CORS for all routes
 CORS(app, 
@@ -23,14 +64,165 @@ CORS(app,
      methods=["GET", "POST", "PUT", "DELETE"],
      allow_headers=["Content-Type", "Authorization"])
 
+@app.before_request
+def start_request_timer():
+    g._request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('_request_started', None)
+    if started is not None:
+        # Label by route pattern, not path, so ids don't explode cardinality
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.http_request_seconds.observe(route, request.method, value=time.perf_counter() - started)
+        metrics.http_requests.inc(route, request.method, str(response.status_code))
+    return response
+
+def socket_event(name):
+    """Register a Socket.IO handler and record (and debug-log) its latency"""
+    def decorator(handler):
+        # Flask-SocketIO retries connect handlers without the auth argument
+        # on TypeError; pass only what the handler accepts so it runs once
+        arity = len(inspect.signature(handler).parameters)
+
+        @functools.wraps(handler)
+        def timed_handler(*args):
+            started = time.perf_counter()
+            try:
+                return handler(*args[:arity])
+            finally:
+                elapsed = time.perf_counter() - started
+                metrics.socket_event_seconds.observe(name, value=elapsed)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Socket event handled", extra={
+                        'event': name,
+                        'user_id': session.get('user_id'),
+                        'sid': request.sid,
+                        'latency_ms': round(elapsed * 1000, 2),
+                    })
+        return socketio.on(name)(timed_handler)
+    return decorator
+
+def emit_to_room(event, data, room):
+    """Emit to a room in each encoding its sockets negotiated, recording how
+    many of this worker's sockets are in it"""
+    rooms = socketio.server.manager.rooms.get('/', {})
+    fanout = 0
+    for encoding in encodings.ENCODINGS:
+        target = encodings.room_name(room, encoding)
+        recipients = rooms.get(target)
+        fanout += len(recipients) if recipients else 0
+        # Other workers' sockets are invisible here, so with a message
+        # queue every enabled encoding goes out
+        if recipients or encoding == encodings.DEFAULT or config.SOCKETIO_MESSAGE_QUEUE:
+            socketio.emit(event, encodings.encode(data, encoding), room=target)
+    metrics.emit_fanout.observe(event, value=fanout)
+
+def join_chat_room(room):
+    """Join room in the encoding this socket negotiated"""
+    join_room(encodings.room_name(room, session.get('encoding', encodings.DEFAULT)))
+
+def in_chat_room(room):
+    """Whether this socket has joined room (join handlers check access)"""
+    return encodings.room_name(room, session.get('encoding', encodings.DEFAULT)) in rooms()
+
+def conditional_json(etag, build):
+    """Answer 304 when the client holds etag, else jsonify(build()).
+
+    Listing responses are per-user and revalidated on every use, so a
+    poll whose data has not changed skips the model query entirely. A
+    build() whose queries failed gets a 500 without an ETag, so the
+    empty result the model fell back to is never revalidated as current.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        failures = failure_count()
+        data = build()
+        if failure_count() > failures:
+            return jsonify({'error': 'Internal server error'}), 500
+        response = jsonify(data)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def presence_contacts(user_ids):
+    """Map user ids to the users who share a private chat or a group with them"""
+    contacts = PrivateChat.get_partner_ids(user_ids)
+    for user_id in user_ids:
+        for group_id in GroupChat.get_user_group_ids(user_id):
+            contacts[user_id] |= GroupChat.get_member_ids(group_id)
+        contacts[user_id].discard(user_id)
+    return contacts
+
+def flush_presence():
+    """Send each online contact of every user whose status changed one
+    event with all of the changes they can see"""
+    changes = presence.flush()
+    if not changes:
+        return
+    updates = {}
+    for user_id, contacts in presence_contacts(list(changes)).items():
+        # Other workers' sockets are invisible here, so with a message
+        # queue every contact is sent the update
+        if not config.SOCKETIO_MESSAGE_QUEUE:
+            contacts = presence.online(contacts)
+        for contact_id in contacts:
+            update = updates.setdefault(contact_id, {'online': [], 'offline': []})
+            update['online' if changes[user_id] else 'offline'].append(user_id)
+    for contact_id, update in updates.items():
+        emit_to_room('presence', update, user_room(contact_id))
+
+def flush_typing():
+    """Send each room whose typers changed one snapshot of who is typing"""
+    for room, update in typing_tracker.flush().items():
+        emit_to_room('typing', update, room)
+
+def run_every(interval, flush):
+    """Background task: call flush every interval seconds, which bounds
+    how often its events go out"""
+    while True:
+        socketio.sleep(interval)
+        try:
+            with app.app_context():
+                flush()
+        except Exception as e:
+            logger.error("Background %s error: %s", flush.__name__, e)
+
+_background_tasks = None
+
+def start_background_tasks():
+    global _background_tasks
+    if _background_tasks is None:
+        _background_tasks = [
+            socketio.start_background_task(run_every, config.PRESENCE_INTERVAL, flush_presence),
+            socketio.start_background_task(run_every, config.TYPING_INTERVAL, flush_typing),
+        ]
+
+def send_batch(items):
+    """Store a batch for the session user and emit one event per room.
+
+    Returns (results, error); error is set when the batch itself is unusable.
+    """
+    if not isinstance(items, list) or not items:
+        return None, 'Messages are required'
+    if len(items) > config.MESSAGE_BATCH_MAX:
+        return None, f'At most {config.MESSAGE_BATCH_MAX} messages per batch'
+    results, rooms = MessageBatch.send(session['user_id'], items, session['username'])
+    for room, messages in rooms.items():
+        event = 'receive_group_messages' if messages[0]['message_type'] == 'group' else 'receive_private_messages'
+        emit_to_room(event, messages, room)
+    return results, None
+
 # Initialize database
-print("Initializing database.")
-try:
-    init_db()
-    print(" Database initialization complete!")
-except Exception as e:
-    print(f" Database initialization failed: {e}")
-    exit(1)
+if config.DB_AUTO_MIGRATE:
+    logger.info("Initializing database")
+    try:
+        init_db()
+        logger.info("Database initialization complete")
+    except Exception as e:
+        logger.error("Database initialization failed: %s", e)
+        exit(1)
 
 #AUTH ROUTES
 @app.route('/api/register', methods=['POST'])
@@ -66,7 +258,7 @@ def register():
         }), 201
         
     except Exception as e:
-        print(f"Registration error: {e}")
+        logger.error("Registration error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/login', methods=['POST'])
@@ -88,7 +280,7 @@ def login():
             session['user_id'] = user['id']
             session['username'] = user['username']
             
-            print(f" User {username} logged in successfully")
+            logger.info("User logged in", extra={'user_id': user['id']})
             
             return jsonify({
                 'message': 'Login successful',
@@ -102,19 +294,19 @@ def login():
             return jsonify({'error': 'Invalid credentials'}), 401
             
     except Exception as e:
-        print(f"Login error: {e}")
+        logger.error("Login error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/logout', methods=['POST'])
 def logout():
     """Logout user"""
     try:
-        username = session.get('username', 'Unknown')
+        user_id = session.get('user_id')
         session.clear()
-        print(f"User {username} logged out")
+        logger.info("User logged out", extra={'user_id': user_id})
         return jsonify({'message': 'Logout successful'}), 200
     except Exception as e:
-        print(f"Logout error: {e}")
+        logger.error("Logout error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/check_auth', methods=['GET'])
@@ -132,7 +324,7 @@ def check_auth():
         return jsonify({'authenticated': False}), 401
         
     except Exception as e:
-        print(f"Auth check error: {e}")
+        logger.error("Auth check error: %s", e)
         return jsonify({'authenticated': False}), 401
 
 #user routess
@@ -144,11 +336,65 @@ def get_users():
         if 'user_id' not in session:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        users = User.get_all(exclude_user_id=session['user_id'])
-        return jsonify(users), 200
+        user_id = session['user_id']
+        etag = versions.etag('users', versions.get('users'), user_id)
+        return conditional_json(etag, lambda: User.get_all(exclude_user_id=user_id))
         
     except Exception as e:
-        print(f" Get users error: {e}")
+        logger.error("Get users error: %s", e)
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/users/search', methods=['GET'])
+def search_users():
+    """Get a page of the user directory (?q=&match=prefix|contains&cursor=&limit=)"""
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        query = request.args.get('q', '').strip()
+        match = request.args.get('match', 'prefix')
+        if match not in ('prefix', 'contains'):
+            return jsonify({'error': "match must be 'prefix' or 'contains'"}), 400
+        
+        cursor = request.args.get('cursor')
+        try:
+            after = decode_cursor(cursor, 1) if cursor else None
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        user_id = session['user_id']
+        
+        def build():
+            users, next_cursor = User.search(
+                exclude_user_id=user_id,
+                query=query,
+                match=match,
+                after=after,
+                limit=request.args.get('limit', type=int)
+            )
+            return {'users': users, 'next_cursor': next_cursor}
+        
+        etag = versions.etag('user_search', versions.get('users'), user_id, request.query_string)
+        return conditional_json(etag, build)
+        
+    except Exception as e:
+        logger.error("Search users error: %s", e)
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/users/recent', methods=['GET'])
+def get_recent_contacts():
+    """Get the users the caller most recently chatted with privately (?limit=)"""
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        user_id = session['user_id']
+        limit = request.args.get('limit', type=int)
+        etag = versions.etag('recent_contacts', versions.get(('inbox', user_id, 'private')), user_id, limit)
+        return conditional_json(etag, lambda: User.get_recent_contacts(user_id, limit))
+        
+    except Exception as e:
+        logger.error("Get recent contacts error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 #Private chat routes
@@ -167,7 +413,7 @@ def start_private_chat(other_user_id):
             return jsonify({'error': 'Failed to create chat'}), 500
             
     except Exception as e:
-        print(f"Start private chat error: {e}")
+        logger.error("Start private chat error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/private/send-message', methods=['POST'])
@@ -187,72 +433,154 @@ def send_private_message():
         if not receiver_id or not content:
             return jsonify({'error': 'Receiver ID and content are required'}), 400
         
-        message = PrivateChat.send_message(session['user_id'], receiver_id, content)
+        message = PrivateChat.send_message(session['user_id'], receiver_id, content, session['username'])
         if message:
             return jsonify(message), 201
         else:
             return jsonify({'error': 'Failed to send message'}), 500
             
     except Exception as e:
-        print(f"Send private message error: {e}")
+        logger.error("Send private message error: %s", e)
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/messages/batch', methods=['POST'])
+def send_message_batch():
+    """Send several private / group messages at once; results are in request order"""
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+        
+        results, error = send_batch(data.get('messages'))
+        if error:
+            return jsonify({'error': error}), 400
+        return jsonify({'results': results}), 200
+        
+    except Exception as e:
+        logger.error("Send message batch error: %s", e)
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/sync', methods=['GET'])
+def sync_messages():
+    """Get every message newer than ?since_id= across the user's chats, a page at a time (&limit=)"""
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        since_id = request.args.get('since_id', type=int)
+        if since_id is None or since_id < 0:
+            return jsonify({'error': 'since_id is required'}), 400
+        
+        messages, next_cursor = Sync.messages(
+            session['user_id'], since_id,
+            limit=request.args.get('limit', type=int)
+        )
+        return jsonify({'messages': messages, 'next_cursor': next_cursor}), 200
+        
+    except Exception as e:
+        logger.error("Sync messages error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/private/messages/<int:other_user_id>', methods=['GET'])
 def get_private_messages(other_user_id):
-    """Get private messages between users"""
+    """Get a page of private messages between users (?before_id=&after_id=&limit=)"""
     try:
         if 'user_id' not in session:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        messages = PrivateChat.get_messages(session['user_id'], other_user_id)
-        return jsonify(messages), 200
+        messages, next_cursor = PrivateChat.get_messages(
+            session['user_id'], other_user_id,
+            before_id=request.args.get('before_id', type=int),
+            after_id=request.args.get('after_id', type=int),
+            limit=request.args.get('limit', type=int)
+        )
+        return jsonify({'messages': messages, 'next_cursor': next_cursor}), 200
         
     except Exception as e:
-        print(f"Get private messages error: {e}")
+        logger.error("Get private messages error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/private/chats', methods=['GET'])
 def get_private_chats():
-    """Get all private chats for user"""
+    """Get all private chats for user with last message and unread count"""
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        user_id = session['user_id']
+        etag = versions.etag('private_chats', versions.get(('inbox', user_id, 'private')), user_id)
+        return conditional_json(etag, lambda: PrivateChat.get_user_chats(user_id))
+        
+    except Exception as e:
+        logger.error("Get private chats error: %s", e)
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/private/chats/<int:other_user_id>/read', methods=['POST'])
+def mark_private_chat_read(other_user_id):
+    """Reset the unread counter of a private chat"""
     try:
         if 'user_id' not in session:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        chats = PrivateChat.get_user_chats(session['user_id'])
-        return jsonify(chats), 200
+        if PrivateChat.mark_read(session['user_id'], other_user_id):
+            return jsonify({'message': 'Marked as read'}), 200
+        return jsonify({'error': 'Chat not found'}), 404
         
     except Exception as e:
-        print(f"Get private chats error: {e}")
+        logger.error("Mark private chat read error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 #GroupChat routes
 
 @app.route('/api/groups', methods=['GET'])
 def get_groups():
-    """Get all groups"""
+    """Get a page of the group directory (?cursor=&limit=&q=name-prefix)"""
     try:
         if 'user_id' not in session:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        groups = GroupChat.get_all_groups()
-        return jsonify(groups), 200
+        name_prefix = request.args.get('q', '').strip()
+        cursor = request.args.get('cursor')
+        try:
+            after = decode_cursor(cursor, 2 if name_prefix else 1) if cursor else None
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        def build():
+            groups, next_cursor = GroupChat.get_all_groups(
+                after=after,
+                limit=request.args.get('limit', type=int),
+                name_prefix=name_prefix
+            )
+            return {'groups': groups, 'next_cursor': next_cursor}
+        
+        etag = versions.etag('groups', versions.get('groups'), request.query_string)
+        return conditional_json(etag, build)
         
     except Exception as e:
-        print(f" Get groups error: {e}")
+        logger.error("Get groups error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/groups/my', methods=['GET'])
 def get_my_groups():
-    """Get user's groups"""
+    """Get user's groups with last message and unread count"""
     try:
         if 'user_id' not in session:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        groups = GroupChat.get_user_groups(session['user_id'])
-        return jsonify(groups), 200
+        user_id = session['user_id']
+        # Last messages are versioned per group, membership per user
+        etag = versions.etag(
+            'my_groups', versions.get('groups'), versions.get(('inbox', user_id, 'group')), user_id,
+            sorted((group_id, versions.get(('group', group_id))) for group_id in GroupChat.get_user_group_ids(user_id))
+        )
+        return conditional_json(etag, lambda: GroupChat.get_user_groups(user_id))
         
     except Exception as e:
-        print(f"Get my groups error: {e}")
+        logger.error("Get my groups error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/groups/create', methods=['POST'])
@@ -282,7 +610,7 @@ def create_group():
             return jsonify({'error': 'Failed to create group'}), 500
             
     except Exception as e:
-        print(f" Create group error: {e}")
+        logger.error("Create group error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/groups/<int:group_id>/join', methods=['POST'])
@@ -299,7 +627,7 @@ def join_group(group_id):
             return jsonify({'message': 'Already a member'}), 200
             
     except Exception as e:
-        print(f" Join group error: {e}")
+        logger.error("Join group error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/groups/<int:group_id>/send-message', methods=['POST'])
@@ -318,28 +646,54 @@ def send_group_message(group_id):
         if not content:
             return jsonify({'error': 'Content is required'}), 400
         
-        message = GroupChat.send_message(group_id, session['user_id'], content)
+        if not GroupChat.is_member(group_id, session['user_id']):
+            return jsonify({'error': 'Not a member of this group'}), 403
+        
+        message = GroupChat.send_message(group_id, session['user_id'], content, session['username'])
         if message:
             return jsonify(message), 201
         else:
             return jsonify({'error': 'Failed to send message'}), 500
             
     except Exception as e:
-        print(f"Send group message error: {e}")
+        logger.error("Send group message error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/groups/<int:group_id>/messages', methods=['GET'])
 def get_group_messages(group_id):
-    """Get group messages"""
+    """Get a page of group messages (?before_id=&after_id=&limit=)"""
     try:
         if 'user_id' not in session:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        messages = GroupChat.get_messages(group_id)
-        return jsonify(messages), 200
+        if not GroupChat.is_member(group_id, session['user_id']):
+            return jsonify({'error': 'Not a member of this group'}), 403
+        
+        messages, next_cursor = GroupChat.get_messages(
+            group_id,
+            before_id=request.args.get('before_id', type=int),
+            after_id=request.args.get('after_id', type=int),
+            limit=request.args.get('limit', type=int)
+        )
+        return jsonify({'messages': messages, 'next_cursor': next_cursor}), 200
         
     except Exception as e:
-        print(f"Get group messages error: {e}")
+        logger.error("Get group messages error: %s", e)
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/groups/<int:group_id>/read', methods=['POST'])
+def mark_group_read(group_id):
+    """Reset the unread counter of a group"""
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        if GroupChat.mark_read(group_id, session['user_id']):
+            return jsonify({'message': 'Marked as read'}), 200
+        return jsonify({'error': 'Not a member of this group'}), 404
+        
+    except Exception as e:
+        logger.error("Mark group read error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/groups/<int:group_id>/members', methods=['GET'])
@@ -349,118 +703,248 @@ def get_group_members(group_id):
         if 'user_id' not in session:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        members = GroupChat.get_group_members(group_id)
-        return jsonify(members), 200
+        etag = versions.etag('members', versions.get(('members', group_id)), group_id)
+        return conditional_json(etag, lambda: GroupChat.get_group_members(group_id))
         
     except Exception as e:
-        print(f"Get group members error: {e}")
+        logger.error("Get group members error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 #socket.io event handler s
 
-@socketio.on('connect')
-def handle_connect():
+@socket_event('connect')
+def handle_connect(auth=None):
     #handleing socket connection
+    metrics.socket_connections.inc()
+    # Payload encoding from the auth payload or ?encoding=; json by default
+    requested = (auth.get('encoding') if isinstance(auth, dict) else None) or request.args.get('encoding')
+    if requested:
+        session['encoding'] = encodings.negotiate(requested)
+        emit('encoding', {'encoding': session['encoding']})
     if 'user_id' in session:
-        print(f"User {session['username']} connected (SID: {request.sid})")
-    else:
-        print(f"Unauthenticated user connected (SID: {request.sid})")
+        # Presence updates for this user arrive in their own room
+        join_chat_room(user_room(session['user_id']))
+        presence.connect(session['user_id'], request.sid)
+        start_background_tasks()
+    logger.debug("Socket connected", extra={'user_id': session.get('user_id'), 'sid': request.sid})
 
-@socketio.on('disconnect')
+@socket_event('disconnect')
 def handle_disconnect():
     #which handle socket disconnection
+    metrics.socket_connections.dec()
     if 'user_id' in session:
-        print(f"User {session['username']} disconnected (SID: {request.sid})")
-    else:
-        print(f"Unauthenticated user disconnected (SID: {request.sid})")
+        presence.disconnect(session['user_id'], request.sid)
+    logger.debug("Socket disconnected", extra={'user_id': session.get('user_id'), 'sid': request.sid})
 
-@socketio.on('join_private_chat')
+@socket_event('join_private_chat')
 def handle_join_private_chat(data):
    #join private chat room
     if 'user_id' not in session:
-        print("Unauthenticated user tried to join private chat")
+        logger.info("Unauthenticated join_private_chat", extra={'sid': request.sid})
         return
     
     other_user_id = data.get('other_user_id')
     if not other_user_id:
-        print("No other_user_id provided for private chat")
+        logger.info("join_private_chat without other_user_id", extra={'user_id': session['user_id']})
         return
     
-    room = f"private_{min(session['user_id'], other_user_id)}_{max(session['user_id'], other_user_id)}"
-    join_room(room)
-    print(f"User {session['username']} joined private chat room: {room}")
+    room = private_room(session['user_id'], other_user_id)
+    join_chat_room(room)
+    logger.debug("Joined room", extra={'user_id': session['user_id'], 'room': room})
 
-@socketio.on('join_group_chat')
+@socket_event('join_group_chat')
 def handle_join_group_chat(data):
     """Join group chat room"""
     if 'user_id' not in session:
-        print("Unauthenticated user tried to join group chat")
+        logger.info("Unauthenticated join_group_chat", extra={'sid': request.sid})
         return
     
     group_id = data.get('group_id')
     if not group_id:
-        print(" No group_id provided for group chat")
+        logger.info("join_group_chat without group_id", extra={'user_id': session['user_id']})
         return
     
-    room = f"group_{group_id}"
-    join_room(room)
-    print(f"User {session['username']} joined group room: {room}")
+    if not GroupChat.is_member(group_id, session['user_id']):
+        logger.info("Not a group member", extra={'user_id': session['user_id'], 'group_id': group_id})
+        return
+    
+    room = group_room(group_id)
+    join_chat_room(room)
+    logger.debug("Joined room", extra={'user_id': session['user_id'], 'room': room})
+
+@socket_event('get_presence')
+def handle_get_presence():
+    """Ack with the caller's contacts who are online now; changes follow as presence events"""
+    if 'user_id' not in session:
+        logger.info("Unauthenticated get_presence", extra={'sid': request.sid})
+        return {'error': 'Not authenticated'}
+    
+    contacts = presence_contacts([session['user_id']])[session['user_id']]
+    return {'online': sorted(presence.online(contacts))}
+
+@socket_event('typing')
+def handle_typing(data):
+    """Handle a typing indicator ({receiver_id} or {group_id}, typing: false to stop).
 
-@socketio.on('send_private_message')
+    Never stored: only sockets already in the room may signal, so no
+    database check is needed, and throttled repeats are dropped here.
+    """
+    if 'user_id' not in session or not isinstance(data, dict):
+        return
+    
+    user_id = session['user_id']
+    if isinstance(data.get('group_id'), int):
+        room = group_room(data['group_id'])
+        scope = {'group_id': data['group_id']}
+    elif isinstance(data.get('receiver_id'), int):
+        room = private_room(user_id, data['receiver_id'])
+        scope = {'user_ids': sorted([user_id, data['receiver_id']])}
+    else:
+        return
+    if not in_chat_room(room):
+        return
+    
+    if data.get('typing', True):
+        typing_tracker.typing(room, scope, user_id, session['username'])
+    else:
+        typing_tracker.stopped(room, user_id)
+
+@socket_event('send_private_message')
 def handle_send_private_message(data):
     """Handle sending private message via socket"""
     if 'user_id' not in session:
-        print("Unauthenticated user tried to send private message")
+        logger.info("Unauthenticated send_private_message", extra={'sid': request.sid})
         return
     
     receiver_id = data.get('receiver_id')
     content = data.get('content', '').strip()
     
     if not receiver_id or not content:
-        print("Invalid private message data")
+        logger.info("Invalid private message data", extra={'user_id': session['user_id']})
         return
     
-    print(f"User {session['username']} sending private message to user {receiver_id}: {content}")
-    
     # Save message to database
-    message = PrivateChat.send_message(session['user_id'], receiver_id, content)
+    message = PrivateChat.send_message(session['user_id'], receiver_id, content, session['username'])
     
     if message:
         # Broadcast to both users in the private chat room
-        room = f"private_{min(session['user_id'], receiver_id)}_{max(session['user_id'], receiver_id)}"
-        print(f"Broadcasting private message to room: {room}")
-        socketio.emit('receive_private_message', message, room=room)
-        print(f" Private message sent and broadcast successfully")
+        room = private_room(session['user_id'], receiver_id)
+        typing_tracker.stopped(room, session['user_id'])
+        emit_to_room('receive_private_message', message, room)
     else:
-        print("Failed to save private message to database")
+        logger.warning("Failed to save private message", extra={'user_id': session['user_id'], 'receiver_id': receiver_id})
 
-@socketio.on('send_group_message')
+@socket_event('send_group_message')
 def handle_send_group_message(data):
     """Handle sending group message via socket"""
     if 'user_id' not in session:
-        print("Unauthenticated user tried to send group message")
+        logger.info("Unauthenticated send_group_message", extra={'sid': request.sid})
         return
     
     group_id = data.get('group_id')
     content = data.get('content', '').strip()
     
     if not group_id or not content:
-        print("Invalid group message data")
+        logger.info("Invalid group message data", extra={'user_id': session['user_id']})
         return
     
-    print(f"User {session['username']} sending group message to group {group_id}: {content}")
+    if not GroupChat.is_member(group_id, session['user_id']):
+        logger.info("Not a group member", extra={'user_id': session['user_id'], 'group_id': group_id})
+        return
     
     # Save message to database
-    message = GroupChat.send_message(group_id, session['user_id'], content)
+    message = GroupChat.send_message(group_id, session['user_id'], content, session['username'])
     
     if message:
         # Broadcast to all users in the group room
-        room = f"group_{group_id}"
-        print(f"Broadcasting group message to room: {room}")
-        socketio.emit('receive_group_message', message, room=room)
-        print(f" Group message sent and broadcast successfully")
+        room = group_room(group_id)
+        typing_tracker.stopped(room, session['user_id'])
+        emit_to_room('receive_group_message', message, room)
     else:
-        print(" Failed to save group message to database")
+        logger.warning("Failed to save group message", extra={'user_id': session['user_id'], 'group_id': group_id})
+
+@socket_event('send_messages')
+def handle_send_messages(data):
+    """Handle a batch of messages via socket; the ack carries per-message results"""
+    if 'user_id' not in session:
+        logger.info("Unauthenticated send_messages", extra={'sid': request.sid})
+        return {'error': 'Not authenticated'}
+    
+    results, error = send_batch(data.get('messages') if isinstance(data, dict) else None)
+    if error:
+        logger.info("Invalid message batch", extra={'user_id': session['user_id']})
+        return {'error': error}
+    # Acks use the socket's negotiated encoding too
+    return {'results': encodings.encode(results, session.get('encoding', encodings.DEFAULT))}
+
+@socket_event('sync')
+def handle_sync(data):
+    """Handle a reconnect catch-up via socket; the ack carries one page like GET /api/sync"""
+    if 'user_id' not in session:
+        logger.info("Unauthenticated sync", extra={'sid': request.sid})
+        return {'error': 'Not authenticated'}
+    
+    since_id = data.get('since_id') if isinstance(data, dict) else None
+    limit = data.get('limit') if isinstance(data, dict) else None
+    if not isinstance(since_id, int) or since_id < 0:
+        logger.info("sync without since_id", extra={'user_id': session['user_id']})
+        return {'error': 'since_id is required'}
+    
+    messages, next_cursor = Sync.messages(
+        session['user_id'], since_id,
+        limit=limit if isinstance(limit, int) else None
+    )
+    # Acks use the socket's negotiated encoding too
+    encoding = session.get('encoding', encodings.DEFAULT)
+    return {'messages': encodings.encode(messages, encoding), 'next_cursor': next_cursor}
+
+@app.route('/api/search', methods=['GET'])
+def search_messages():
+    """Search the caller's private threads and groups (?q=&cursor=&limit=)"""
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Query is required'}), 400
+        
+        cursor = request.args.get('cursor')
+        try:
+            after = tuple(decode_cursor(cursor, 2)) if cursor else None
+            if after and not (isinstance(after[0], (int, float)) and isinstance(after[1], int)):
+                raise ValueError("Invalid cursor")
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        results, next_cursor = Search.messages(
+            session['user_id'],
+            query,
+            after=after,
+            limit=request.args.get('limit', type=int)
+        )
+        return jsonify({'results': results, 'next_cursor': next_cursor}), 200
+        
+    except Exception as e:
+        logger.error("Search error: %s", e)
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text-format metrics for this worker"""
+    if not config.METRICS_ENABLED:
+        return jsonify({'error': 'Endpoint not found'}), 404
+
+    pool = get_pool_stats()
+    for state in ('in_use', 'idle', 'overflow'):
+        metrics.db_pool_connections.set(state, value=pool[state])
+    caches = {'users': User.cache_stats(), 'recent_messages': recent_messages.stats()}
+    caches.update(GroupChat.cache_stats())
+    for cache, stats in caches.items():
+        metrics.cache_lookups.set_total(cache, 'hit', value=stats['hits'])
+        metrics.cache_lookups.set_total(cache, 'miss', value=stats['misses'])
+
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
 
 #error handlers
 
@@ -475,4 +959,4 @@ def internal_error(error):
 #to start the backend 
 
 if __name__ == '__main__':
-    socketio.run(app)
+    socketio.run(app, host=config.HOST, port=config.PORT)
@@ -0,0 +1,369 @@
+"""Load-test / benchmark harness for the chat server.
+
+Starts `python -m backend.app` on a free port (or targets --server), signs
+up simulated users, connects one Socket.IO client per user, joins every
+client to a private room with a partner and to the benchmark's groups, and
+sends at a fixed per-client rate while a REST worker polls the history and
+listing endpoints. Prints one JSON document with throughput and
+send-to-receive latency percentiles, so runs can be diffed across commits:
+
+    python -m backend.bench --clients 50 --rate 2 --duration 30 --output before.json
+
+The spawned server runs against a fresh SQLite file unless --database (or
+DATABASE_URL) names another database; it refuses the shared MySQL server the
+app falls back to without configuration. Needs the packages in
+backend/requirements-bench.txt.
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+import tempfile
+import subprocess
+from urllib.parse import urljoin, urlsplit
+
+import requests
+import socketio
+
+from backend.config import DEFAULT_MYSQL_HOST
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'bench-password'
+
+def percentiles(samples):
+    """count / mean / p50 / p95 / p99 / max of samples (seconds) in milliseconds"""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean': sum(ordered) / len(ordered) * 1000,
+        'p50': rank(50),
+        'p95': rank(95),
+        'p99': rank(99),
+        'max': ordered[-1] * 1000,
+    }
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+def start_server(database, timeout):
+    """Run backend.app against database in a subprocess and wait until it answers HTTP"""
+    port = _free_port()
+    env = dict(os.environ, HOST='127.0.0.1', PORT=str(port), DATABASE_URL=database)
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'backend.app'],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited during startup:\n{process.stderr.read().decode(errors='replace')}")
+        try:
+            requests.get(urljoin(url, '/api/check_auth'), timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Server did not start within {timeout}s")
+
+class Recorder:
+    """Send timestamps and delivery latencies shared by every client"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sent_at = {}
+        self.expected = 0
+        self.sent = 0
+        self.latencies = {'private': [], 'group': []}
+        self.rest = {}
+
+    def sent_message(self, token, recipients):
+        with self.lock:
+            self.sent_at[token] = time.perf_counter()
+            self.sent += 1
+            self.expected += recipients
+
+    def received(self, kind, token):
+        now = time.perf_counter()
+        with self.lock:
+            sent_at = self.sent_at.get(token)
+            if sent_at is not None:
+                self.latencies[kind].append(now - sent_at)
+
+    def rest_call(self, endpoint, elapsed, ok):
+        with self.lock:
+            stats = self.rest.setdefault(endpoint, {'latencies': [], 'errors': 0})
+            stats['latencies'].append(elapsed)
+            if not ok:
+                stats['errors'] += 1
+
+class BenchClient:
+    """One simulated user: an HTTP session plus a Socket.IO connection"""
+
+    def __init__(self, url, username, recorder):
+        self.url = url
+        self.username = username
+        self.recorder = recorder
+        self.http = requests.Session()
+        self.user_id = None
+        self.partner_id = None
+        # Users whose private room this client joins: its partner, plus
+        # anyone else who sends to it
+        self.peer_ids = set()
+        self.group_ids = []
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('receive_private_message', self._on_private)
+        self.sio.on('receive_group_message', self._on_group)
+
+    def post(self, path, payload=None):
+        response = self.http.post(urljoin(self.url, path), json=payload or {}, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def sign_up(self):
+        self.post('/api/register', {'username': self.username, 'email': f'{self.username}@bench.local', 'password': PASSWORD})
+        self.user_id = self.post('/api/login', {'username': self.username, 'password': PASSWORD})['user']['id']
+
+    def connect(self, transports, encoding):
+        cookie = '; '.join(f'{name}={value}' for name, value in self.http.cookies.items())
+        self.sio.connect(
+            self.url, headers={'Cookie': cookie}, auth={'encoding': encoding},
+            transports=transports, wait_timeout=30
+        )
+        for peer_id in sorted(self.peer_ids):
+            self.sio.call('join_private_chat', {'other_user_id': peer_id}, timeout=30)
+        for group_id in self.group_ids:
+            self.sio.call('join_group_chat', {'group_id': group_id}, timeout=30)
+
+    @staticmethod
+    def _decode(payload):
+        # msgpack payloads arrive as one binary attachment
+        return msgpack.unpackb(payload) if isinstance(payload, bytes) else payload
+
+    def _on_private(self, message):
+        message = self._decode(message)
+        if message['sender_id'] != self.user_id:
+            self.recorder.received('private', message['content'])
+
+    def _on_group(self, message):
+        message = self._decode(message)
+        if message['sender_id'] != self.user_id:
+            self.recorder.received('group', message['content'])
+
+    def run_sender(self, rate, duration, group_share, group_recipients, stop):
+        """Send rate messages per second until duration elapses"""
+        interval = 1.0 / rate
+        started = time.monotonic() + random.uniform(0, interval)
+        sequence = 0
+        while not stop.is_set():
+            due = started + sequence * interval
+            if due - started > duration:
+                return
+            delay = due - time.monotonic()
+            if delay > 0:
+                stop.wait(delay)
+            token = f'bench:{self.user_id}:{sequence}'
+            if self.group_ids and random.random() < group_share:
+                self.recorder.sent_message(token, group_recipients)
+                self.sio.emit('send_group_message', {'group_id': random.choice(self.group_ids), 'content': token})
+            else:
+                self.recorder.sent_message(token, 1)
+                self.sio.emit('send_private_message', {'receiver_id': self.partner_id, 'content': token})
+            sequence += 1
+
+def run_rest(clients, rate, recorder, stop):
+    """Poll history and listing endpoints at rate requests per second"""
+    endpoints = [
+        ('/api/private/messages/<id>', lambda c: f'/api/private/messages/{c.partner_id}'),
+        ('/api/groups/<id>/messages', lambda c: f'/api/groups/{random.choice(c.group_ids)}/messages' if c.group_ids else None),
+        ('/api/private/chats', lambda c: '/api/private/chats'),
+        ('/api/groups/my', lambda c: '/api/groups/my'),
+        ('/api/groups', lambda c: '/api/groups'),
+    ]
+    interval = 1.0 / rate
+    next_due = time.monotonic()
+    while not stop.is_set():
+        client = random.choice(clients)
+        endpoint, build = random.choice(endpoints)
+        path = build(client)
+        if path:
+            started = time.perf_counter()
+            try:
+                ok = client.http.get(urljoin(client.url, path), timeout=30).ok
+            except requests.RequestException:
+                ok = False
+            recorder.rest_call(endpoint, time.perf_counter() - started, ok)
+        next_due += interval
+        stop.wait(max(0.0, next_due - time.monotonic()))
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args):
+    process = None
+    url = args.server
+    if url is None:
+        database = args.database
+        if database is None:
+            database = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='chat-bench-'), 'bench.db')}"
+        process, url = start_server(database, args.startup_timeout)
+    try:
+        recorder = Recorder()
+        run_id = f'{int(time.time()) % 100000}{random.randint(0, 999):03d}'
+        clients = [BenchClient(url, f'b{run_id}u{i}', recorder) for i in range(args.clients)]
+        for client in clients:
+            client.sign_up()
+
+        # Partners: 0<->1, 2<->3, ...; an odd last client talks to client 0,
+        # which then also joins that room so every send has a listener
+        for i, client in enumerate(clients):
+            partner = clients[i ^ 1] if (i ^ 1) < len(clients) else clients[0]
+            client.partner_id = partner.user_id
+            client.peer_ids.add(partner.user_id)
+            partner.peer_ids.add(client.user_id)
+        group_ids = [
+            clients[0].post('/api/groups/create', {'name': f'bench-{run_id}-{g}'})['group_id']
+            for g in range(args.groups)
+        ]
+        for client in clients:
+            for group_id in group_ids:
+                client.post(f'/api/groups/{group_id}/join')
+            client.group_ids = group_ids
+
+        transports = ['websocket'] if args.transport == 'websocket' else ['polling', 'websocket']
+        for client in clients:
+            client.connect(transports, args.encoding)
+
+        stop = threading.Event()
+        workers = [
+            threading.Thread(
+                target=client.run_sender,
+                args=(args.rate, args.duration, args.group_share, len(clients) - 1, stop),
+                daemon=True
+            )
+            for client in clients
+        ]
+        if args.rest_rate > 0:
+            workers.append(threading.Thread(target=run_rest, args=(clients, args.rest_rate, recorder, stop), daemon=True))
+
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        time.sleep(args.duration)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+        # Let in-flight deliveries land before counting losses
+        deadline = time.monotonic() + args.drain
+        while time.monotonic() < deadline:
+            with recorder.lock:
+                delivered = sum(len(samples) for samples in recorder.latencies.values())
+            if delivered >= recorder.expected:
+                break
+            time.sleep(0.1)
+
+        for client in clients:
+            client.sio.disconnect()
+
+        with recorder.lock:
+            all_latencies = recorder.latencies['private'] + recorder.latencies['group']
+            return {
+                'commit': _git_commit(),
+                'config': {
+                    'clients': args.clients,
+                    'groups': args.groups,
+                    'rate_per_client': args.rate,
+                    'duration_s': args.duration,
+                    'group_share': args.group_share,
+                    'rest_rate': args.rest_rate,
+                    'transport': args.transport,
+                    'encoding': args.encoding,
+                },
+                'elapsed_s': elapsed,
+                'messages_sent': recorder.sent,
+                'send_throughput': recorder.sent / elapsed,
+                'deliveries_expected': recorder.expected,
+                'deliveries_received': len(all_latencies),
+                'delivery_throughput': len(all_latencies) / elapsed,
+                'latency_ms': {
+                    'all': percentiles(all_latencies),
+                    'private': percentiles(recorder.latencies['private']),
+                    'group': percentiles(recorder.latencies['group']),
+                },
+                'rest': {
+                    endpoint: dict(
+                        percentiles(stats['latencies']),
+                        errors=stats['errors'],
+                        throughput=len(stats['latencies']) / elapsed
+                    )
+                    for endpoint, stats in sorted(recorder.rest.items())
+                },
+            }
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the chat server with simulated Socket.IO clients")
+    parser.add_argument('--clients', type=int, default=20, help="simulated users, one socket each")
+    parser.add_argument('--groups', type=int, default=2, help="groups every client joins")
+    parser.add_argument('--rate', type=float, default=1.0, help="messages per second per client")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds of sending")
+    parser.add_argument('--group-share', type=float, default=0.5, help="fraction of sends that go to a group")
+    parser.add_argument('--rest-rate', type=float, default=10.0, help="REST requests per second (0 disables)")
+    parser.add_argument('--drain', type=float, default=5.0, help="seconds to wait for in-flight deliveries")
+    parser.add_argument('--transport', choices=('websocket', 'polling'), default='websocket')
+    parser.add_argument('--encoding', choices=('json', 'compact', 'msgpack'), default='json',
+                        help="payload encoding the clients negotiate")
+    parser.add_argument('--database', help="DATABASE_URL for the spawned server (default: a fresh SQLite file)")
+    parser.add_argument('--server', help="benchmark a running server at this URL instead of starting one")
+    parser.add_argument('--startup-timeout', type=float, default=60.0)
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    if args.clients < 2:
+        parser.error("--clients must be at least 2")
+    if args.encoding == 'msgpack' and msgpack is None:
+        parser.error("--encoding msgpack needs `pip install msgpack`")
+    if args.server is None:
+        args.database = args.database or os.environ.get('DATABASE_URL') or None
+        # Simulated users and messages must never land in the shared database
+        if args.database and urlsplit(args.database).hostname == DEFAULT_MYSQL_HOST:
+            parser.error(f"refusing to benchmark against the shared database at {DEFAULT_MYSQL_HOST}; "
+                         "pass --database with a database of your own")
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,125 @@
+import os
+
+# The shared hosted MySQL server used when nothing else is configured
+DEFAULT_MYSQL_HOST = 'sql3.freesqldatabase.com'
+
 class Config:
     SECRET_KEY = 'your-secret-key-123-change-in-production'
-    
-    MYSQL_HOST = 'sql3.freesqldatabase.com'
-    MYSQL_USER = 'sql3809573'
-    MYSQL_PASSWORD = 'bFEecYYM5f'  
-    MYSQL_DB = 'sql3809573'
-    MYSQL_PORT = 3306
+
+    MYSQL_HOST = os.environ.get('MYSQL_HOST', DEFAULT_MYSQL_HOST)
+    MYSQL_USER = os.environ.get('MYSQL_USER', 'sql3809573')
+    MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD', 'bFEecYYM5f')
+    MYSQL_DB = os.environ.get('MYSQL_DB', 'sql3809573')
+    MYSQL_PORT = int(os.environ.get('MYSQL_PORT', 3306))
+
+    # SQLAlchemy database URL. Unset means MySQL from the MYSQL_* settings
+    # above; sqlite:///chat.db (file) or sqlite:// (in-memory) run without a
+    # MySQL server, for local benchmarks and CI.
+    DATABASE_URL = os.environ.get('DATABASE_URL') or None
+
+    # Connection pool sizing (see get_pool_stats() in database.py)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 3600))
+    # Idle connections older than this many seconds are pinged before reuse
+    DB_POOL_PING_INTERVAL = int(os.environ.get('DB_POOL_PING_INTERVAL', 30))
+
+    # Apply pending schema migrations when the web app starts. Set to 0 when
+    # migrations are run separately with `python -m backend.migrations`.
+    DB_AUTO_MIGRATE = os.environ.get('DB_AUTO_MIGRATE', '1') == '1'
+
+    # Address for `python -m backend.app` (gunicorn takes --bind instead)
+    HOST = os.environ.get('HOST', '127.0.0.1')
+    PORT = int(os.environ.get('PORT', 5000))
+
+    # Socket.IO fan-out between workers / hosts: redis://host:6379/0 (or any
+    # URL Flask-SocketIO accepts), memory:// for the in-process stand-in used
+    # in tests. Unset means a single process, as before.
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE') or None
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'flask-socketio')
+    # Accept only the websocket transport. Each client then talks to one
+    # worker for its whole connection, so no sticky sessions are needed.
+    SOCKETIO_WEBSOCKET_ONLY = os.environ.get('SOCKETIO_WEBSOCKET_ONLY', '0') == '1'
+    # Payload encodings clients may ask for besides json (compact, msgpack).
+    # With a message queue every enabled encoding is emitted for every event,
+    # so list only the ones your clients use.
+    SOCKETIO_ENCODINGS = os.environ.get('SOCKETIO_ENCODINGS', 'compact,msgpack')
+
+    # bcrypt work factor; existing hashes are upgraded on the next login
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    # Native threads available for hashing off the eventlet hub
+    PASSWORD_HASH_THREADS = int(os.environ.get('PASSWORD_HASH_THREADS', 4))
+
+    # In-process identity caches (entries expire so other workers' writes
+    # become visible within the TTL)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
+    GROUP_CACHE_SIZE = int(os.environ.get('GROUP_CACHE_SIZE', 10000))
+    GROUP_CACHE_TTL = int(os.environ.get('GROUP_CACHE_TTL', 3600))
+    # Group membership sets used to authorize every group socket event
+    MEMBERSHIP_CACHE_SIZE = int(os.environ.get('MEMBERSHIP_CACHE_SIZE', 10000))
+    MEMBERSHIP_CACHE_TTL = int(os.environ.get('MEMBERSHIP_CACHE_TTL', 300))
+    # How long a failed membership check is remembered, so a non-member's
+    # events don't each query the database; joins on other workers are
+    # seen within this many seconds
+    MEMBERSHIP_NEGATIVE_TTL = int(os.environ.get('MEMBERSHIP_NEGATIVE_TTL', 10))
+
+    # Newest messages per room kept in memory for history reads. Off by
+    # default with a message queue: sends handled by other workers would not
+    # reach this process's cache.
+    RECENT_MESSAGES_PER_ROOM = int(os.environ.get(
+        'RECENT_MESSAGES_PER_ROOM', 0 if os.environ.get('SOCKETIO_MESSAGE_QUEUE') else 100))
+    RECENT_MESSAGES_MAX_TOTAL = int(os.environ.get('RECENT_MESSAGES_MAX_TOTAL', 100000))
+
+    # Message history page sizes (?limit= is clamped to MESSAGE_PAGE_MAX)
+    MESSAGE_PAGE_SIZE = int(os.environ.get('MESSAGE_PAGE_SIZE', 50))
+    MESSAGE_PAGE_MAX = int(os.environ.get('MESSAGE_PAGE_MAX', 200))
+    # Most messages accepted by one batch send
+    MESSAGE_BATCH_MAX = int(os.environ.get('MESSAGE_BATCH_MAX', 100))
+    # Messages per reconnect catch-up page (?limit= is clamped to SYNC_PAGE_MAX)
+    SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 200))
+    SYNC_PAGE_MAX = int(os.environ.get('SYNC_PAGE_MAX', 1000))
+    # Group / user directory page sizes
+    DIRECTORY_PAGE_SIZE = int(os.environ.get('DIRECTORY_PAGE_SIZE', 50))
+    DIRECTORY_PAGE_MAX = int(os.environ.get('DIRECTORY_PAGE_MAX', 200))
+    # Most recent private-chat partners listed by /api/users/recent
+    RECENT_CONTACTS_LIMIT = int(os.environ.get('RECENT_CONTACTS_LIMIT', 10))
+
+    # Presence: seconds a user stays online after their last socket closes
+    # (absorbs reconnects), and how often status changes are sent out
+    PRESENCE_GRACE_PERIOD = float(os.environ.get('PRESENCE_GRACE_PERIOD', 5))
+    PRESENCE_INTERVAL = float(os.environ.get('PRESENCE_INTERVAL', 2))
+
+    # Typing indicators: at most one accepted typing event per user per room
+    # every TYPING_THROTTLE seconds, dropped TYPING_TTL seconds after the
+    # last one, and sent to each room at most every TYPING_INTERVAL seconds
+    TYPING_THROTTLE = float(os.environ.get('TYPING_THROTTLE', 1))
+    TYPING_TTL = float(os.environ.get('TYPING_TTL', 5))
+    TYPING_INTERVAL = float(os.environ.get('TYPING_INTERVAL', 0.5))
+
+    # Listing ETags come from in-process change counters. With a message
+    # queue (several workers) they also roll over every ETAG_WINDOW seconds,
+    # so writes handled by other workers show up within the window.
+    ETAG_WINDOW = int(os.environ.get(
+        'ETAG_WINDOW', 5 if os.environ.get('SOCKETIO_MESSAGE_QUEUE') else 0))
+
+    # Logging: default level, per-logger overrides ("name=LEVEL,..."),
+    # "text" or "json" lines, and how many records may wait to be written
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+    # Socket.IO / Engine.IO protocol logging formats every packet; debug only
+    SOCKETIO_LOGGER = os.environ.get('SOCKETIO_LOGGER', '0') == '1'
+    ENGINEIO_LOGGER = os.environ.get('ENGINEIO_LOGGER', '0') == '1'
+
+    # Message search: page sizes and snippet length in characters
+    SEARCH_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE', 20))
+    SEARCH_PAGE_MAX = int(os.environ.get('SEARCH_PAGE_MAX', 100))
+    SEARCH_SNIPPET_LENGTH = int(os.environ.get('SEARCH_SNIPPET_LENGTH', 160))
+
+    # Prometheus-format /metrics endpoint (collection itself is always on)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
 
 config = Config()
@@ -1,108 +1,357 @@
+import re
+import sys
+import time
+import sqlite3
+import logging
+from datetime import datetime, timezone
+import threading
+from functools import lru_cache
+from contextlib import contextmanager
 import pymysql
-import pymysql.cursors
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.pool import QueuePool
+from flask import g, has_app_context
 from backend.config import config
+from backend.metrics import db_acquire_seconds, db_query_seconds
+
+logger = logging.getLogger(__name__)
+
+def database_url():
+    """DATABASE_URL if set, otherwise the MySQL database from the MYSQL_* settings"""
+    if config.DATABASE_URL:
+        return make_url(config.DATABASE_URL)
+    return URL.create(
+        'mysql+pymysql',
+        username=config.MYSQL_USER,
+        password=config.MYSQL_PASSWORD,
+        host=config.MYSQL_HOST,
+        port=config.MYSQL_PORT,
+        database=config.MYSQL_DB,
+        query={'charset': 'utf8mb4'}
+    )
+
+def _create_engine(url):
+    # Bound parameters carry message content and password hashes; keep
+    # them out of the exception text the models log
+    if url.get_backend_name() == 'sqlite':
+        # SQLite takes one writer at a time and waits for its file lock
+        # inside the C library, which would stall the eventlet hub. A single
+        # pooled connection makes green threads queue in the pool instead;
+        # it also keeps an in-memory database alive between checkouts.
+        return create_engine(
+            url,
+            poolclass=QueuePool,
+            hide_parameters=True,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            connect_args={
+                'check_same_thread': False,
+                # TIMESTAMP columns come back as datetimes, as from MySQL
+                'detect_types': sqlite3.PARSE_DECLTYPES,
+            }
+        )
+    # QueuePool waits on threading primitives, which eventlet's monkey
+    # patching turns into green ones, so a checkout blocks only the waiting
+    # green thread.
+    return create_engine(
+        url,
+        hide_parameters=True,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_POOL_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        connect_args={
+            # TIMESTAMPs are read and written in UTC so timestamps the app
+            # generates itself (see send_message) match what MySQL stores
+            'init_command': "SET time_zone = '+00:00'"
+        }
+    )
+
+engine = _create_engine(database_url())
+
+def dialect_name():
+    """'mysql' or 'sqlite'"""
+    return engine.dialect.name
+
+_stats_lock = threading.Lock()
+_stats = {
+    'checkouts': 0,
+    'timeouts': 0,
+    'wait_time_total': 0.0,
+    'wait_time_max': 0.0,
+}
+
+if dialect_name() == 'sqlite':
+    @event.listens_for(engine, 'connect')
+    def _enable_foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute('PRAGMA foreign_keys = ON')
+else:
+    @event.listens_for(engine, 'checkin')
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info['last_used'] = time.monotonic()
+
+    @event.listens_for(engine, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        """Ping connections that sat idle long enough for the server to drop them"""
+        last_used = connection_record.info.get('last_used')
+        if last_used is None or time.monotonic() - last_used < config.DB_POOL_PING_INTERVAL:
+            return
+        try:
+            dbapi_connection.ping(reconnect=False)
+        except pymysql.err.Error:
+            # The pool discards this connection and retries with a fresh one
+            raise exc.DisconnectionError("Stale pooled connection")
 
 def get_db_connection():
-    """Create and return a database connection"""
+    """Check out a pooled SQLAlchemy connection; close() returns it to the pool"""
+    started = time.monotonic()
     try:
-        connection = pymysql.connect(
-            host=config.MYSQL_HOST,
-            user=config.MYSQL_USER,
-            password=config.MYSQL_PASSWORD,
-            database=config.MYSQL_DB,
-            port=config.MYSQL_PORT,
-            cursorclass=pymysql.cursors.DictCursor,
-            charset='utf8mb4',
-            autocommit=False
-        )
-        print("Database connection successful!")
-        return connection
-    except pymysql.err.OperationalError as e:
-        print(f"Database connection failed: {e}")
-        print("Please check your MySQL credentials in config.py")
+        connection = engine.connect()
+    except exc.TimeoutError:
+        with _stats_lock:
+            _stats['timeouts'] += 1
+        logger.warning("Timed out waiting for a database connection", extra={'timeout_s': config.DB_POOL_TIMEOUT})
+        raise
+    except exc.OperationalError as e:
+        logger.error("Database connection failed: %s (check DATABASE_URL / the MYSQL_* settings)", e.orig)
         raise
+    waited = time.monotonic() - started
+    db_acquire_seconds.observe(value=waited)
+    with _stats_lock:
+        _stats['checkouts'] += 1
+        _stats['wait_time_total'] += waited
+        _stats['wait_time_max'] = max(_stats['wait_time_max'], waited)
+    return connection
 
-def init_db():
-    """Initialize database and create all tables"""
-    connection = get_db_connection()
+def get_pool_stats():
+    """Return a snapshot of connection pool usage for sizing the pool"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['wait_time_avg'] = stats['wait_time_total'] / stats['checkouts'] if stats['checkouts'] else 0.0
+    pool = engine.pool
+    stats.update({
+        'pool_size': pool.size(),
+        'max_overflow': 0 if dialect_name() == 'sqlite' else config.DB_POOL_MAX_OVERFLOW,
+        'in_use': pool.checkedout(),
+        'idle': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+    })
+    return stats
+
+# A format-style placeholder (%s) or an escaped literal percent (%%)
+_FORMAT_TOKEN = re.compile(r'%([s%])')
+
+@lru_cache(maxsize=1024)
+def _convert_paramstyle(query, paramstyle):
+    """Rewrite a query written with format placeholders for the driver's paramstyle"""
+    if paramstyle in ('format', 'pyformat'):
+        return query
+    if paramstyle == 'qmark':
+        return _FORMAT_TOKEN.sub(lambda token: '?' if token.group(1) == 's' else '%', query)
+    raise ValueError(f"Unsupported paramstyle {paramstyle!r}")
+
+def insert_ignore(table):
+    """INSERT into a backend.schema table that skips rows clashing with a
+    unique key (INSERT IGNORE on MySQL, INSERT OR IGNORE on SQLite).
+    Execute it with a dict of column values, or a list of them."""
+    return table.insert().prefix_with('IGNORE', dialect='mysql').prefix_with('OR IGNORE', dialect='sqlite')
+
+# Code object -> "module.function" label for db_query_seconds
+_query_labels = {}
+
+def _query_label(frame):
+    """The metric label for a statement run from frame, e.g. user.get_by_username"""
+    code = frame.f_code
+    label = _query_labels.get(code)
+    if label is None:
+        module = frame.f_globals.get('__name__', '').rpartition('.')[2]
+        label = _query_labels[code] = f'{module}.{code.co_name}'
+    return label
+
+class Cursor:
+    """DB-API style cursor over a SQLAlchemy connection.
+
+    Models write portable SQL with %s placeholders (%% for a literal
+    percent), or pass a SQLAlchemy Core statement such as insert_ignore()
+    for what differs between dialects, and get rows back as dicts whatever
+    the backend. Statement latency is recorded under the calling model
+    method.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._sqlite = connection.dialect.name == 'sqlite'
+        self._paramstyle = connection.dialect.paramstyle
+        self._result = None
+        self._rows = None
+
+    def _run(self, query, params):
+        label = _query_label(sys._getframe(2))
+        started = time.perf_counter()
+        try:
+            if isinstance(query, str):
+                query = _convert_paramstyle(query, self._paramstyle)
+                self._result = self.connection.exec_driver_sql(query, params)
+            else:
+                self._result = self.connection.execute(query, params)
+        finally:
+            db_query_seconds.observe(label, value=time.perf_counter() - started)
+        self._rows = self._result.mappings() if self._result.returns_rows else None
+
+    def execute(self, query, args=None):
+        if isinstance(query, str):
+            args = tuple(args or ())
+        self._run(query, args)
+
+    def executemany(self, query, args):
+        if isinstance(query, str):
+            args = [tuple(row) for row in args]
+        else:
+            args = list(args)
+        if args:
+            self._run(query, args)
+
+    def fetchone(self):
+        row = self._rows.fetchone()
+        return dict(row) if row is not None else None
+
+    def fetchall(self):
+        return [dict(row) for row in self._rows.fetchall()]
+
+    @property
+    def lastrowid(self):
+        return self._result.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._result.rowcount
+
+    def inserted_ids(self, count):
+        """Ids of the count rows the last multi-row INSERT added, in order.
+
+        Both backends allocate one statement's ids consecutively, but MySQL
+        reports the first as lastrowid and SQLite the last.
+        """
+        if self._sqlite:
+            return list(range(self.lastrowid - count + 1, self.lastrowid + 1))
+        return list(range(self.lastrowid, self.lastrowid + count))
+
+class _Session:
+    """One pooled connection shared by every model call in a unit of work"""
+
+    def __init__(self, scoped):
+        self.scoped = scoped
+        self.connection = None
+        self.depth = 0
+        # Callbacks waiting for the outermost transaction to commit
+        self.pending = []
+        # Set when an exception left a nested block; the outermost block
+        # then rolls back instead of committing
+        self.rollback_only = False
+        # Transaction blocks that failed, even if a model caught the error
+        self.failures = 0
+
+    def release(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+_local = threading.local()
+
+def _current_session():
+    """Return the session bound to this request / socket event, if any"""
+    if has_app_context():
+        if '_db_session' not in g:
+            g._db_session = _Session(scoped=True)
+        return g._db_session
+    # Outside Flask (CLI, scripts) each outermost transaction gets its own
+    # connection; threading.local is green-local under eventlet
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = _Session(scoped=False)
+    return session
+
+class TransactionAborted(Exception):
+    """A nested transaction() block failed, so the whole transaction was rolled back"""
+
+@contextmanager
+def transaction():
+    """Yield a cursor on the scoped connection and commit once at the end.
+
+    Nested transaction() blocks join the outermost one, so a model method
+    that calls another model method still issues a single commit. The
+    outermost block rolls back if an exception escapes it, or if one
+    escaped a nested block even though a model method caught it; it then
+    raises TransactionAborted rather than report success.
+    """
+    session = _current_session()
+    if session.connection is None:
+        try:
+            session.connection = get_db_connection()
+        except BaseException:
+            session.failures += 1
+            raise
+    session.depth += 1
     try:
-        with connection.cursor() as cursor:
-            
-            # First, check if tables exist and drop them if they do (for clean setup)
-            cursor.execute("DROP TABLE IF EXISTS messages")
-            cursor.execute("DROP TABLE IF EXISTS group_members")
-            cursor.execute("DROP TABLE IF EXISTS private_chats")
-            cursor.execute("DROP TABLE IF EXISTS group_chats")
-            cursor.execute("DROP TABLE IF EXISTS users")
-            
-            # Users table - FIXED: Using password instead of password_hash
-            cursor.execute('''
-                CREATE TABLE users (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(80) UNIQUE NOT NULL,
-                    email VARCHAR(120) UNIQUE NOT NULL,
-                    password VARCHAR(255) NOT NULL,  -- Changed from password_hash to password
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            print(" Users table created")
-            
-            # Group chats table
-            cursor.execute('''
-                CREATE TABLE group_chats (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(100) NOT NULL,
-                    description TEXT,
-                    created_by INT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            print("Group chats table created")
-            
-            # Group members table
-            cursor.execute('''
-                CREATE TABLE group_members (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    group_id INT,
-                    user_id INT,
-                    joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE KEY unique_member (group_id, user_id)
-                )
-            ''')
-            print("Group members table created")
-            
-           #privatechat table
-            cursor.execute('''
-                CREATE TABLE private_chats (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    user1_id INT,
-                    user2_id INT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE KEY unique_private_chat (user1_id, user2_id)
-                )
-            ''')
-            print(" Private chats table created")
-            
-          #message table
-            cursor.execute('''
-                CREATE TABLE messages (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    sender_id INT,
-                    receiver_id INT,
-                    group_id INT,
-                    message_type ENUM('private', 'group') NOT NULL,
-                    content TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            print("Msg table created")
-            
-        connection.commit()
-        print("database tables created successfully")
-        
-    except Exception as e:
-        print(f" Error on creating database TABLE: {e}")
-        connection.rollback()
+        yield Cursor(session.connection)
+        if session.depth == 1:
+            if session.rollback_only:
+                raise TransactionAborted("A nested transaction block failed")
+            session.connection.commit()
+            pending, session.pending = session.pending, []
+            for callback in pending:
+                callback()
+    except BaseException:
+        session.failures += 1
+        if session.depth == 1:
+            session.pending = []
+            session.rollback_only = False
+            session.connection.rollback()
+        else:
+            session.rollback_only = True
         raise
     finally:
-        connection.close()
\ No newline at end of file
+        session.depth -= 1
+        if session.depth == 0 and not session.scoped:
+            session.release()
+
+def failure_count():
+    """How many transaction blocks have failed in this request / socket event.
+
+    Models log errors and return an empty result, so callers that must not
+    mistake a failure for "nothing there" compare this before and after.
+    """
+    return _current_session().failures
+
+def on_commit(callback):
+    """Run callback once the current transaction commits (right away outside
+    one); it is dropped if the transaction rolls back"""
+    session = _current_session()
+    if session.depth == 0:
+        callback()
+    else:
+        session.pending.append(callback)
+
+def release_connection():
+    """Return this request's pooled connection before slow non-database
+    work (e.g. bcrypt); the next transaction() checks out another"""
+    session = _current_session()
+    if session.depth == 0:
+        session.release()
+
+def close_db_session(exception=None):
+    """Return the request's connection to the pool (teardown_appcontext hook)"""
+    session = g.pop('_db_session', None)
+    if session is not None:
+        session.release()
+
+def utc_now():
+    """Current UTC time at the resolution of a TIMESTAMP column"""
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+def init_db():
+    """Bring the schema up to date by applying pending migrations (never drops data)"""
+    from backend.migrations import migrate
+    migrate()
@@ -0,0 +1,64 @@
+"""Payload encodings a Socket.IO client can negotiate when it connects.
+
+json     full message dicts, as the React frontend expects (the default)
+compact  trimmed JSON: null fields, message_type and conversation_id are
+         dropped and datetimes become integer epoch seconds
+msgpack  the compact form packed with MessagePack and sent as one binary
+         attachment (needs `pip install msgpack`)
+
+Sockets using anything but json join a per-encoding twin of each room (see
+room_name), so a broadcast is encoded once per encoding in use rather than
+once per recipient.
+"""
+import calendar
+from datetime import datetime
+from backend.config import config
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+DEFAULT = 'json'
+
+# Derivable from what is left: the type from whichever of receiver_id /
+# group_id is set, the conversation from the two user ids
+_REDUNDANT_FIELDS = frozenset(('message_type', 'conversation_id'))
+
+def _enabled():
+    names = [name.strip() for name in config.SOCKETIO_ENCODINGS.split(',') if name.strip()]
+    if msgpack is None and 'msgpack' in names:
+        names.remove('msgpack')
+    return (DEFAULT,) + tuple(name for name in names if name in ('compact', 'msgpack'))
+
+ENCODINGS = _enabled()
+
+def negotiate(requested):
+    """The encoding for a client that asked for requested; json unless it is enabled"""
+    return requested if requested in ENCODINGS else DEFAULT
+
+def room_name(room, encoding):
+    """The room a socket using encoding joins in place of room"""
+    return room if encoding == DEFAULT else f'{room}~{encoding}'
+
+def trim(data):
+    """The compact form of a payload (a message dict, or a list of them)"""
+    if isinstance(data, list):
+        return [trim(item) for item in data]
+    if isinstance(data, dict):
+        return {
+            key: trim(value) for key, value in data.items()
+            if value is not None and key not in _REDUNDANT_FIELDS
+        }
+    if isinstance(data, datetime):
+        # Stored datetimes are naive UTC
+        return calendar.timegm(data.utctimetuple())
+    return data
+
+def encode(data, encoding):
+    """data as sockets using encoding receive it"""
+    if encoding == 'compact':
+        return trim(data)
+    if encoding == 'msgpack':
+        return msgpack.packb(trim(data), use_bin_type=True)
+    return data
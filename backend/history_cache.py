@@ -0,0 +1,139 @@
+import bisect
+import threading
+from collections import OrderedDict
+from backend.config import config
+
+class _Room:
+    __slots__ = ('ids', 'messages', 'floor')
+
+    def __init__(self, floor):
+        self.ids = []
+        self.messages = []
+        # Every message in the room with id >= floor is cached (0 = all of them)
+        self.floor = floor
+
+class RecentMessageCache:
+    """Newest messages of recently active rooms, kept in memory.
+
+    Each room holds at most per_room messages sorted by id, and the whole
+    cache at most max_messages; past that the least recently used rooms
+    are dropped. A page is only served when the window it covers lies
+    entirely inside a room's cached suffix, so reads never miss messages.
+    """
+
+    def __init__(self, per_room, max_messages):
+        self.per_room = per_room
+        self.max_messages = max_messages
+        self._rooms = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.per_room > 0
+
+    def _insert(self, room, message):
+        index = bisect.bisect_left(room.ids, message['id'])
+        if index < len(room.ids) and room.ids[index] == message['id']:
+            return
+        room.ids.insert(index, message['id'])
+        room.messages.insert(index, message)
+        self._total += 1
+        if len(room.ids) > self.per_room:
+            del room.ids[0]
+            del room.messages[0]
+            room.floor = room.ids[0]
+            self._total -= 1
+
+    def _evict(self):
+        while self._total > self.max_messages and len(self._rooms) > 1:
+            _, room = self._rooms.popitem(last=False)
+            self._total -= len(room.ids)
+            self.evictions += 1
+
+    def fill(self, key, messages, complete):
+        """Merge the newest page read from the database (oldest first) into a room.
+
+        complete means the page is the room's entire history.
+        """
+        if not self.enabled or not (messages or complete):
+            return
+        floor = 0 if complete else messages[0]['id']
+        with self._lock:
+            room = self._rooms.get(key)
+            if room is None:
+                room = self._rooms[key] = _Room(floor)
+            else:
+                room.floor = min(room.floor, floor)
+            for message in messages:
+                self._insert(room, dict(message))
+            self._evict()
+
+    def append(self, key, message):
+        """Add a just-sent message to its room"""
+        if not self.enabled:
+            return
+        with self._lock:
+            room = self._rooms.get(key)
+            if room is None:
+                # Nothing older is known, but everything from here on will be
+                room = self._rooms[key] = _Room(message['id'])
+            self._rooms.move_to_end(key)
+            self._insert(room, dict(message))
+            self._evict()
+
+    def get_page(self, key, before_id=None, after_id=None, limit=50):
+        """Return (messages, next_cursor) like the models do, or None on a miss"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            room = self._rooms.get(key)
+            page = self._page(room, before_id, after_id, limit) if room else None
+            if page is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._rooms.move_to_end(key)
+        messages, next_cursor = page
+        return [dict(message) for message in messages], next_cursor
+
+    def _page(self, room, before_id, after_id, limit):
+        if after_id is not None:
+            if after_id + 1 < room.floor:
+                return None
+            start = bisect.bisect_right(room.ids, after_id)
+            newer = room.messages[start:]
+            return newer[:limit], (newer[limit - 1]['id'] if len(newer) > limit else None)
+
+        end = len(room.ids) if before_id is None else bisect.bisect_left(room.ids, before_id)
+        older = room.messages[:end]
+        if len(older) > limit:
+            page = older[-limit:]
+            return page, page[0]['id']
+        if room.floor == 0:
+            return older, None
+        # Can't tell whether older messages exist below the cached suffix
+        return None
+
+    def invalidate(self, key):
+        with self._lock:
+            room = self._rooms.pop(key, None)
+            if room is not None:
+                self._total -= len(room.ids)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'rooms': len(self._rooms),
+                'messages': self._total,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+recent_messages = RecentMessageCache(config.RECENT_MESSAGES_PER_ROOM, config.RECENT_MESSAGES_MAX_TOTAL)
@@ -0,0 +1,105 @@
+import sys
+import json
+import atexit
+import logging
+from logging.handlers import QueueHandler
+from eventlet.patcher import original
+from backend.config import config
+
+# Real OS threads and queues even after eventlet.monkey_patch(), so writing
+# log lines never blocks the hub
+_threading = original('threading')
+_queue = original('queue')
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+def _fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+class KeyValueFormatter(logging.Formatter):
+    """`time level logger message key=value ...` lines"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s %(message)s')
+
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        fields = _fields(record)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, extra fields at the top level"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(_fields(record))
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class _Writer:
+    """Drains the log queue into the real handler on a native thread"""
+
+    def __init__(self, records, handler):
+        self.records = records
+        self.handler = handler
+        self.thread = _threading.Thread(target=self._run, name='log-writer', daemon=True)
+
+    def _run(self):
+        while True:
+            record = self.records.get()
+            if record is None:
+                return
+            self.handler.handle(record)
+
+    def stop(self):
+        """Write out what is queued before the process exits"""
+        self.records.put(None)
+        self.thread.join(timeout=5)
+
+class _DroppingQueueHandler(QueueHandler):
+    """Hand records to the writer without formatting or blocking the caller"""
+
+    def prepare(self, record):
+        # Formatting happens on the writer thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except _queue.Full:
+            pass  # drop rather than stall the hub when the writer falls behind
+
+_writer = None
+
+def configure_logging():
+    """Route all logging through a queue drained by a background writer.
+
+    Levels come from LOG_LEVEL and per-logger LOG_LEVELS overrides such as
+    `backend.database=DEBUG,engineio=WARNING`. Safe to call more than once.
+    """
+    global _writer
+    if _writer is not None:
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JSONFormatter() if config.LOG_FORMAT == 'json' else KeyValueFormatter())
+    records = _queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+    _writer = _Writer(records, handler)
+    _writer.thread.start()
+    atexit.register(_writer.stop)
+
+    root = logging.getLogger()
+    root.handlers[:] = [_DroppingQueueHandler(records)]
+    root.setLevel(config.LOG_LEVEL.upper())
+    for entry in filter(None, config.LOG_LEVELS.split(',')):
+        name, _, level = entry.partition('=')
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
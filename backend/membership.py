@@ -0,0 +1,53 @@
+from backend.cache import TTLCache
+from backend.config import config
+
+class MembershipIndex:
+    """In-memory group -> member ids and user -> group ids.
+
+    Entries are loaded lazily by the GroupChat model and patched in place
+    when a user joins a group in this process. Sets are replaced rather than
+    mutated, so readers never see one half-updated.
+    """
+
+    def __init__(self, maxsize, ttl, negative_ttl):
+        self._members = TTLCache(maxsize, ttl)
+        self._groups = TTLCache(maxsize, ttl)
+        # (group id, user id) pairs the database said are not members
+        self._non_members = TTLCache(maxsize, negative_ttl)
+
+    def members(self, group_id):
+        return self._members.get(group_id)
+
+    def groups(self, user_id):
+        return self._groups.get(user_id)
+
+    def is_non_member(self, group_id, user_id):
+        return self._non_members.get((group_id, user_id)) is not None
+
+    def set_non_member(self, group_id, user_id):
+        self._non_members.set((group_id, user_id), True)
+
+    def set_members(self, group_id, user_ids):
+        self._members.set(group_id, frozenset(user_ids))
+
+    def set_groups(self, user_id, group_ids):
+        self._groups.set(user_id, frozenset(group_ids))
+
+    def added(self, group_id, user_id):
+        self._non_members.invalidate((group_id, user_id))
+        members = self._members.get(group_id)
+        if members is not None:
+            self._members.set(group_id, members | {user_id})
+        groups = self._groups.get(user_id)
+        if groups is not None:
+            self._groups.set(user_id, groups | {group_id})
+
+    def stats(self):
+        return {
+            'members': self._members.stats(),
+            'groups': self._groups.stats(),
+            'non_members': self._non_members.stats(),
+        }
+
+membership = MembershipIndex(
+    config.MEMBERSHIP_CACHE_SIZE, config.MEMBERSHIP_CACHE_TTL, config.MEMBERSHIP_NEGATIVE_TTL)
@@ -0,0 +1,14 @@
+def build_message_row(message_id, sender_id, sender_username, content, created_at,
+                      receiver_id=None, group_id=None, conversation_id=None):
+    """A just-inserted message in the same shape as a history row, without re-reading it"""
+    return {
+        'id': message_id,
+        'sender_id': sender_id,
+        'receiver_id': receiver_id,
+        'group_id': group_id,
+        'conversation_id': conversation_id,
+        'message_type': 'group' if group_id is not None else 'private',
+        'content': content,
+        'created_at': created_at,
+        'sender_username': sender_username
+    }
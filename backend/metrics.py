@@ -0,0 +1,153 @@
+import threading
+from bisect import bisect_left
+
+# Seconds; spans a sub-millisecond cache hit up to a pool timeout
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Recipients per emit
+FANOUT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        lines = self._header()
+        for labels, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set_total(self, *labels, value):
+        """Mirror a running total that is counted elsewhere (it only grows)"""
+        with self._lock:
+            self._values[labels] = value
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, *labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; observe() is a bisect and a few additions"""
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # [per-bucket counts (last is +Inf), sum, count]
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self._lock:
+            values = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._values.items()}
+        lines = self._header()
+        for labels, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, labels, ('le', _format_value(bound)))
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+class Registry:
+    """Process-local metrics rendered in the Prometheus text format.
+
+    Each worker process keeps its own numbers; scrape every worker and let
+    Prometheus aggregate them.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    'chat_http_requests_total', 'HTTP requests by route, method and status',
+    ('route', 'method', 'status')))
+http_request_seconds = registry.register(Histogram(
+    'chat_http_request_seconds', 'HTTP request latency by route',
+    ('route', 'method')))
+socket_event_seconds = registry.register(Histogram(
+    'chat_socket_event_seconds', 'Socket.IO event handler latency by event',
+    ('event',)))
+socket_connections = registry.register(Gauge(
+    'chat_socket_connections', 'Socket.IO connections currently open on this worker'))
+emit_fanout = registry.register(Histogram(
+    'chat_emit_fanout', 'Sockets in the target room on this worker per emit',
+    ('event',), buckets=FANOUT_BUCKETS))
+db_query_seconds = registry.register(Histogram(
+    'chat_db_query_seconds', 'Database statement latency by model method',
+    ('method',)))
+db_acquire_seconds = registry.register(Histogram(
+    'chat_db_connection_acquire_seconds', 'Time spent waiting to check out a pooled connection'))
+db_pool_connections = registry.register(Gauge(
+    'chat_db_pool_connections', 'Pooled database connections by state',
+    ('state',)))
+cache_lookups = registry.register(Counter(
+    'chat_cache_lookups_total', 'Lookups served by each in-memory cache',
+    ('cache', 'result')))
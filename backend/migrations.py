@@ -0,0 +1,374 @@
+"""Versioned schema migrations.
+
+Applied versions are recorded in the schema_migrations table, so running
+the migrations again only applies what is pending. MySQL commits DDL
+implicitly, so every step also checks whether its index / constraint
+already exists. A migration that failed halfway can then simply be re-run.
+
+SQLite databases are created from backend.schema instead (see
+_create_sqlite_schema).
+
+Apply pending migrations outside the web process with:
+
+    python -m backend.migrations            # upgrade
+    python -m backend.migrations --status   # list applied / pending
+"""
+import logging
+import argparse
+from backend.database import get_db_connection, Cursor
+from backend.schema import metadata
+from backend.logs import configure_logging
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+# Named advisory lock so two processes starting at once don't race
+MIGRATION_LOCK = 'chat_schema_migrations'
+
+# Rows per batch when backfilling large tables
+BACKFILL_BATCH_SIZE = 10000
+
+def migration(version, description):
+    """Register a migration step; versions must be unique and increasing"""
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+def _column_exists(cursor, table, column):
+    cursor.execute('''
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    ''', (table, column))
+    return cursor.fetchone() is not None
+
+def _index_exists(cursor, table, name):
+    cursor.execute('''
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+    ''', (table, name))
+    return cursor.fetchone() is not None
+
+def _foreign_key_exists(cursor, table, name):
+    cursor.execute('''
+        SELECT 1 FROM information_schema.table_constraints
+        WHERE table_schema = DATABASE() AND table_name = %s
+          AND constraint_name = %s AND constraint_type = 'FOREIGN KEY'
+    ''', (table, name))
+    return cursor.fetchone() is not None
+
+def _add_index(cursor, table, name, columns):
+    if not _index_exists(cursor, table, name):
+        cursor.execute(f'CREATE INDEX {name} ON {table} ({columns})')
+
+def _add_foreign_key(cursor, table, name, column, references, on_delete='CASCADE'):
+    if not _foreign_key_exists(cursor, table, name):
+        cursor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {name} '
+            f'FOREIGN KEY ({column}) REFERENCES {references} ON DELETE {on_delete}'
+        )
+
+@migration(1, 'Create base tables')
+def _create_base_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(80) UNIQUE NOT NULL,
+            email VARCHAR(120) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS group_chats (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            description TEXT,
+            created_by INT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS group_members (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            group_id INT,
+            user_id INT,
+            joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY unique_member (group_id, user_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS private_chats (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user1_id INT,
+            user2_id INT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY unique_private_chat (user1_id, user2_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS messages (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            sender_id INT,
+            receiver_id INT,
+            group_id INT,
+            message_type ENUM('private', 'group') NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+@migration(2, 'Index message history and membership lookups')
+def _add_history_indexes(cursor):
+    # Group history: WHERE group_id = ? ORDER BY id
+    _add_index(cursor, 'messages', 'idx_messages_group', 'group_id, id')
+    # Private threads: WHERE sender_id = ? AND receiver_id = ? ORDER BY id
+    _add_index(cursor, 'messages', 'idx_messages_private', 'sender_id, receiver_id, id')
+    # "My groups": WHERE user_id = ? (the unique key leads with group_id)
+    _add_index(cursor, 'group_members', 'idx_group_members_user', 'user_id')
+
+@migration(3, 'Add foreign keys')
+def _add_foreign_keys(cursor):
+    # Rows pointing at users / groups that no longer exist were already
+    # invisible (every read joins them) and would block the constraints
+    cursor.execute('''
+        DELETE gm FROM group_members gm
+        LEFT JOIN users u ON gm.user_id = u.id
+        LEFT JOIN group_chats g ON gm.group_id = g.id
+        WHERE u.id IS NULL OR g.id IS NULL
+    ''')
+    cursor.execute('''
+        DELETE pc FROM private_chats pc
+        LEFT JOIN users u1 ON pc.user1_id = u1.id
+        LEFT JOIN users u2 ON pc.user2_id = u2.id
+        WHERE u1.id IS NULL OR u2.id IS NULL
+    ''')
+    cursor.execute('''
+        DELETE m FROM messages m
+        LEFT JOIN users s ON m.sender_id = s.id
+        LEFT JOIN users r ON m.receiver_id = r.id
+        LEFT JOIN group_chats g ON m.group_id = g.id
+        WHERE s.id IS NULL
+           OR (m.receiver_id IS NOT NULL AND r.id IS NULL)
+           OR (m.group_id IS NOT NULL AND g.id IS NULL)
+    ''')
+    cursor.execute('''
+        UPDATE group_chats gc
+        LEFT JOIN users u ON gc.created_by = u.id
+        SET gc.created_by = NULL
+        WHERE gc.created_by IS NOT NULL AND u.id IS NULL
+    ''')
+
+    _add_foreign_key(cursor, 'group_chats', 'fk_group_chats_created_by', 'created_by', 'users (id)', on_delete='SET NULL')
+    _add_foreign_key(cursor, 'group_members', 'fk_group_members_group', 'group_id', 'group_chats (id)')
+    _add_foreign_key(cursor, 'group_members', 'fk_group_members_user', 'user_id', 'users (id)')
+    _add_foreign_key(cursor, 'private_chats', 'fk_private_chats_user1', 'user1_id', 'users (id)')
+    _add_foreign_key(cursor, 'private_chats', 'fk_private_chats_user2', 'user2_id', 'users (id)')
+    _add_foreign_key(cursor, 'messages', 'fk_messages_sender', 'sender_id', 'users (id)')
+    _add_foreign_key(cursor, 'messages', 'fk_messages_receiver', 'receiver_id', 'users (id)')
+    _add_foreign_key(cursor, 'messages', 'fk_messages_group', 'group_id', 'group_chats (id)')
+
+@migration(4, 'Key private messages by conversation')
+def _add_message_conversation(cursor):
+    if not _column_exists(cursor, 'messages', 'conversation_id'):
+        cursor.execute('ALTER TABLE messages ADD COLUMN conversation_id INT NULL AFTER group_id')
+
+    # Threads that predate private_chats rows still need a conversation
+    cursor.execute('''
+        INSERT IGNORE INTO private_chats (user1_id, user2_id)
+        SELECT DISTINCT LEAST(sender_id, receiver_id), GREATEST(sender_id, receiver_id)
+        FROM messages
+        WHERE message_type = 'private' AND receiver_id IS NOT NULL
+    ''')
+
+    # Backfill in id ranges so each batch commits with a small undo log
+    cursor.execute("SELECT MAX(id) AS max_id FROM messages WHERE message_type = 'private'")
+    max_id = cursor.fetchone()['max_id'] or 0
+    for start in range(0, max_id, BACKFILL_BATCH_SIZE):
+        cursor.execute('''
+            UPDATE messages m
+            JOIN private_chats pc
+              ON pc.user1_id = LEAST(m.sender_id, m.receiver_id)
+             AND pc.user2_id = GREATEST(m.sender_id, m.receiver_id)
+            SET m.conversation_id = pc.id
+            WHERE m.id > %s AND m.id <= %s
+              AND m.message_type = 'private' AND m.conversation_id IS NULL
+        ''', (start, start + BACKFILL_BATCH_SIZE))
+        cursor.connection.commit()
+
+    # Thread history: WHERE conversation_id = ? ORDER BY id
+    _add_index(cursor, 'messages', 'idx_messages_conversation', 'conversation_id, id')
+    _add_foreign_key(cursor, 'messages', 'fk_messages_conversation', 'conversation_id', 'private_chats (id)')
+
+@migration(5, 'Add per-user conversation summaries')
+def _add_conversation_summaries(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            user_id INT NOT NULL,
+            chat_type ENUM('private', 'group') NOT NULL,
+            chat_id INT NOT NULL,
+            last_message_id INT NULL,
+            last_message_preview VARCHAR(255) NULL,
+            last_message_at TIMESTAMP NULL DEFAULT NULL,
+            unread_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, chat_type, chat_id),
+            KEY idx_summaries_chat (chat_type, chat_id),
+            KEY idx_summaries_inbox (user_id, chat_type, last_message_id),
+            CONSTRAINT fk_summaries_user FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )
+    ''')
+
+    # One row per participant of every existing conversation
+    cursor.execute('''
+        INSERT IGNORE INTO conversation_summaries (user_id, chat_type, chat_id)
+        SELECT user1_id, 'private', id FROM private_chats
+        UNION ALL
+        SELECT user2_id, 'private', id FROM private_chats
+        UNION ALL
+        SELECT user_id, 'group', group_id FROM group_members
+    ''')
+    cursor.connection.commit()
+
+    # Start everyone at zero unread, pointing at the latest message
+    cursor.execute('''
+        UPDATE conversation_summaries cs
+        JOIN (
+            SELECT conversation_id AS chat_id, MAX(id) AS last_id
+            FROM messages WHERE conversation_id IS NOT NULL
+            GROUP BY conversation_id
+        ) latest ON cs.chat_type = 'private' AND cs.chat_id = latest.chat_id
+        JOIN messages m ON m.id = latest.last_id
+        SET cs.last_message_id = m.id,
+            cs.last_message_preview = LEFT(m.content, 120),
+            cs.last_message_at = m.created_at
+    ''')
+    cursor.execute('''
+        UPDATE conversation_summaries cs
+        JOIN (
+            SELECT group_id AS chat_id, MAX(id) AS last_id
+            FROM messages WHERE group_id IS NOT NULL
+            GROUP BY group_id
+        ) latest ON cs.chat_type = 'group' AND cs.chat_id = latest.chat_id
+        JOIN messages m ON m.id = latest.last_id
+        SET cs.last_message_id = m.id,
+            cs.last_message_preview = LEFT(m.content, 120),
+            cs.last_message_at = m.created_at
+    ''')
+
+@migration(6, 'Denormalize group member counts and index group names')
+def _add_group_member_count(cursor):
+    if not _column_exists(cursor, 'group_chats', 'member_count'):
+        cursor.execute('ALTER TABLE group_chats ADD COLUMN member_count INT NOT NULL DEFAULT 0')
+    cursor.execute('''
+        UPDATE group_chats gc
+        JOIN (SELECT group_id, COUNT(*) AS members FROM group_members GROUP BY group_id) counts
+          ON counts.group_id = gc.id
+        SET gc.member_count = counts.members
+    ''')
+    # Directory name-prefix search ordered by (name, id)
+    _add_index(cursor, 'group_chats', 'idx_group_chats_name', 'name, id')
+
+@migration(7, 'Add a full-text index on message content')
+def _add_message_fulltext(cursor):
+    # Backs /api/search; SQLite databases use the in-process index instead
+    if not _index_exists(cursor, 'messages', 'ft_messages_content'):
+        cursor.execute('ALTER TABLE messages ADD FULLTEXT INDEX ft_messages_content (content)')
+
+def _ensure_version_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def _applied_versions(cursor):
+    cursor.execute('SELECT version FROM schema_migrations')
+    return {row['version'] for row in cursor.fetchall()}
+
+def _create_sqlite_schema(cursor):
+    """SQLite lacks the information_schema / ALTER TABLE support the steps
+    above rely on, so its (disposable) databases get the current schema
+    straight from backend.schema and every migration is marked applied"""
+    metadata.create_all(cursor.connection)
+    applied = _applied_versions(cursor)
+    pending = [(version, description) for version, description, _ in MIGRATIONS if version not in applied]
+    cursor.executemany('INSERT INTO schema_migrations (version, description) VALUES (%s, %s)', pending)
+    cursor.connection.commit()
+    return sorted(version for version, _ in pending)
+
+def migrate(connection=None):
+    """Apply every pending migration in version order; returns the versions applied.
+
+    Runs on a pooled connection unless one is passed in (used by tests that
+    migrate a scratch MySQL database).
+    """
+    owned = connection is None
+    if owned:
+        connection = get_db_connection()
+    applied_now = []
+    try:
+        cursor = Cursor(connection)
+        if connection.dialect.name == 'sqlite':
+            return _create_sqlite_schema(cursor)
+
+        cursor.execute('SELECT GET_LOCK(%s, 60) AS acquired', (MIGRATION_LOCK,))
+        if not cursor.fetchone()['acquired']:
+            raise RuntimeError("Timed out waiting for another process to finish migrating")
+        try:
+            _ensure_version_table(cursor)
+            applied = _applied_versions(cursor)
+            for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+                if version in applied:
+                    continue
+                logger.info("Applying migration %s: %s", version, description)
+                fn(cursor)
+                cursor.execute(
+                    'INSERT INTO schema_migrations (version, description) VALUES (%s, %s)',
+                    (version, description)
+                )
+                connection.commit()
+                applied_now.append(version)
+        finally:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', (MIGRATION_LOCK,))
+        return applied_now
+    except Exception as e:
+        logger.error("Migration failed: %s", e)
+        connection.rollback()
+        raise
+    finally:
+        if owned:
+            connection.close()
+
+def status():
+    """Return (version, description, applied) for every known migration"""
+    connection = get_db_connection()
+    try:
+        cursor = Cursor(connection)
+        _ensure_version_table(cursor)
+        applied = _applied_versions(cursor)
+        connection.commit()
+        return [(version, description, version in applied)
+                for version, description, _ in sorted(MIGRATIONS, key=lambda m: m[0])]
+    finally:
+        connection.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply chat database schema migrations")
+    parser.add_argument('--status', action='store_true', help="list migrations without applying them")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if args.status:
+        for version, description, applied in status():
+            print(f"{version:>4}  {'applied' if applied else 'pending':<8} {description}")
+        return
+
+    applied = migrate()
+    print(f"Applied {len(applied)} migration(s)" if applied else "Database schema is up to date")
+
+if __name__ == '__main__':
+    main()
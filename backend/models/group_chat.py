@@ -1,155 +1,288 @@
-from backend.database import get_db_connection
+import logging
+from backend.cache import TTLCache
+from backend.config import config
+from backend.database import transaction, on_commit, utc_now, insert_ignore
+from backend.schema import group_members
+from backend.pagination import clamp_limit, keyset_clause, finish_page, encode_cursor, like_prefix
+from backend.models.user import User
+from backend.models.inbox import Inbox
+from backend.history_cache import recent_messages
+from backend.search_index import search_index
+from backend.rooms import group_room
+from backend.messages import build_message_row
+from backend.membership import membership
+from backend.versions import versions
+
+logger = logging.getLogger(__name__)
+
+# group id -> name; filled by get_name() and create()
+_group_names = TTLCache(config.GROUP_CACHE_SIZE, config.GROUP_CACHE_TTL)
 
 class GroupChat:
     @staticmethod
     def create(name, description, created_by):
         """Create a new group chat"""
-        connection = get_db_connection()
         try:
-            with connection.cursor() as cursor:
+            with transaction() as cursor:
                 cursor.execute(
                     'INSERT INTO group_chats (name, description, created_by) VALUES (%s, %s, %s)',
                     (name, description, created_by)
                 )
                 group_id = cursor.lastrowid
-                
-                # Add creator as member
+
+                # Add creator as member (joins this transaction)
                 GroupChat.add_member(group_id, created_by)
-                
-                connection.commit()
-                return group_id
+                on_commit(lambda: _group_names.set(group_id, name))
+
+            return group_id
         except Exception as e:
-            print(f"Error creating group: {e}")
-            connection.rollback()
+            logger.error("Error creating group: %s", e)
             return None
-        finally:
-            connection.close()
 
     @staticmethod
     def add_member(group_id, user_id):
         """Add user to group"""
-        connection = get_db_connection()
         try:
-            with connection.cursor() as cursor:
+            with transaction() as cursor:
                 cursor.execute(
-                    'INSERT IGNORE INTO group_members (group_id, user_id) VALUES (%s, %s)',
-                    (group_id, user_id)
+                    insert_ignore(group_members),
+                    {'group_id': group_id, 'user_id': user_id}
                 )
-                connection.commit()
-                return True
+                if cursor.rowcount == 0:
+                    return False
+
+                cursor.execute(
+                    'UPDATE group_chats SET member_count = member_count + 1 WHERE id = %s',
+                    (group_id,)
+                )
+                versions.bump('groups', ('members', group_id))
+                Inbox.add_participants('group', group_id, (user_id,))
+                # Only once committed: inside create() a rollback would
+                # leave a member of a group that doesn't exist
+                on_commit(lambda: membership.added(group_id, user_id))
+
+            return True
         except Exception as e:
-            print(f"Error adding member to group: {e}")
-            connection.rollback()
+            logger.error("Error adding member to group: %s", e)
             return False
-        finally:
-            connection.close()
 
     @staticmethod
-    def send_message(group_id, sender_id, content):
-        """Send message to group"""
-        connection = get_db_connection()
+    def get_name(group_id):
+        """Get a group's name, cached in-process since groups are never renamed"""
+        name = _group_names.get(group_id)
+        if name is not None:
+            return name
+        try:
+            with transaction() as cursor:
+                cursor.execute('SELECT name FROM group_chats WHERE id = %s', (group_id,))
+                group = cursor.fetchone()
+        except Exception as e:
+            logger.error("Error getting group name: %s", e)
+            return None
+        if group:
+            _group_names.set(group_id, group['name'])
+            return group['name']
+        return None
+
+    @staticmethod
+    def send_message(group_id, sender_id, content, sender_username=None):
+        """Send message to group and return the stored message"""
         try:
-            with connection.cursor() as cursor:
+            if sender_username is None:
+                sender_username = User.get_username(sender_id)
+            created_at = utc_now()
+            with transaction() as cursor:
+                group_name = GroupChat.get_name(group_id)
+                if group_name is None:
+                    return None
+
                 cursor.execute(
-                    '''INSERT INTO messages (sender_id, group_id, message_type, content) 
-                       VALUES (%s, %s, 'group', %s)''',
-                    (sender_id, group_id, content)
+                    '''INSERT INTO messages (sender_id, group_id, message_type, content, created_at)
+                       VALUES (%s, %s, 'group', %s, %s)''',
+                    (sender_id, group_id, content, created_at)
                 )
-                message_id = cursor.lastrowid
-                connection.commit()
-                
-                # Get message with sender info
-                cursor.execute('''
-                    SELECT m.*, u.username as sender_username, g.name as group_name
-                    FROM messages m 
-                    JOIN users u ON m.sender_id = u.id 
-                    JOIN group_chats g ON m.group_id = g.id
-                    WHERE m.id = %s
-                ''', (message_id,))
-                return cursor.fetchone()
+
+                message = build_message_row(
+                    cursor.lastrowid, sender_id, sender_username, content, created_at,
+                    group_id=group_id
+                )
+                Inbox.record_message('group', group_id, message)
+
+            recent_messages.append(group_room(group_id), message)
+            search_index.add(message['id'], ('group', group_id), content)
+            return dict(message, group_name=group_name)
         except Exception as e:
-            print(f"Error sending group message: {e}")
-            connection.rollback()
+            logger.error("Error sending group message: %s", e)
             return None
-        finally:
-            connection.close()
 
     @staticmethod
-    def get_messages(group_id):
-        """Get all messages in a group"""
-        connection = get_db_connection()
+    def get_messages(group_id, before_id=None, after_id=None, limit=None):
+        """Get one page of messages in a group as (messages, next_cursor)"""
         try:
-            with connection.cursor() as cursor:
-                cursor.execute('''
-                    SELECT m.*, u.username as sender_username
-                    FROM messages m 
-                    JOIN users u ON m.sender_id = u.id 
-                    WHERE m.group_id = %s 
-                    ORDER BY m.created_at ASC
-                ''', (group_id,))
-                return cursor.fetchall()
+            limit = clamp_limit(limit)
+            room = group_room(group_id)
+            cached = recent_messages.get_page(room, before_id, after_id, limit)
+            if cached is not None:
+                return cached
+
+            cursor_sql, cursor_params, order = keyset_clause(before_id, after_id)
+            with transaction() as cursor:
+                cursor.execute(f'''
+                    SELECT m.*
+                    FROM messages m
+                    WHERE m.group_id = %s{cursor_sql}
+                    ORDER BY m.id {order}
+                    LIMIT %s
+                ''', (group_id, *cursor_params, limit + 1))
+                messages, next_cursor = finish_page(cursor.fetchall(), limit, after_id)
+                User.attach_usernames(messages)
+
+            if before_id is None and after_id is None:
+                recent_messages.fill(room, messages, complete=next_cursor is None)
+            return messages, next_cursor
         except Exception as e:
-            print(f"Error getting group messages: {e}")
-            return []
-        finally:
-            connection.close()
+            logger.error("Error getting group messages: %s", e)
+            return [], None
 
     @staticmethod
-    def get_all_groups():
-        """Get all group chats"""
-        connection = get_db_connection()
+    def get_all_groups(after=None, limit=None, name_prefix=None):
+        """Get one page of the group directory as (groups, next_cursor).
+
+        Newest groups come first; with name_prefix, matching groups are
+        listed by name. after is the decoded next_cursor of the previous
+        page: [id], or [name, id] when filtering by name.
+        """
         try:
-            with connection.cursor() as cursor:
-                cursor.execute('''
-                    SELECT gc.*, u.username as created_by_username,
-                           (SELECT COUNT(*) FROM group_members gm WHERE gm.group_id = gc.id) as member_count
-                    FROM group_chats gc
-                    JOIN users u ON gc.created_by = u.id
-                    ORDER BY gc.created_at DESC
-                ''')
-                return cursor.fetchall()
+            limit = clamp_limit(limit, config.DIRECTORY_PAGE_SIZE, config.DIRECTORY_PAGE_MAX)
+            with transaction() as cursor:
+                if name_prefix:
+                    params = [like_prefix(name_prefix)]
+                    keyset = ''
+                    if after:
+                        keyset = ' AND (gc.name > %s OR (gc.name = %s AND gc.id > %s))'
+                        params += [after[0], after[0], after[1]]
+                    cursor.execute(f'''
+                        SELECT gc.* FROM group_chats gc
+                        WHERE gc.name LIKE %s ESCAPE '!'{keyset}
+                        ORDER BY gc.name, gc.id
+                        LIMIT %s
+                    ''', (*params, limit + 1))
+                else:
+                    keyset, params = (' WHERE gc.id < %s', [after[0]]) if after else ('', [])
+                    cursor.execute(f'''
+                        SELECT gc.* FROM group_chats gc{keyset}
+                        ORDER BY gc.id DESC
+                        LIMIT %s
+                    ''', (*params, limit + 1))
+                groups = list(cursor.fetchall())
+
+            next_cursor = None
+            if len(groups) > limit:
+                groups = groups[:limit]
+                last = groups[-1]
+                next_cursor = encode_cursor(last['name'], last['id']) if name_prefix else encode_cursor(last['id'])
+            return User.attach_usernames(groups, 'created_by', 'created_by_username'), next_cursor
         except Exception as e:
-            print(f"Error getting all groups: {e}")
-            return []
-        finally:
-            connection.close()
+            logger.error("Error getting all groups: %s", e)
+            return [], None
 
     @staticmethod
     def get_user_groups(user_id):
-        """Get all groups a user is member of"""
-        connection = get_db_connection()
+        """Get all groups a user is member of, most recently active first, with
+        the last message and unread count"""
         try:
-            with connection.cursor() as cursor:
+            with transaction() as cursor:
                 cursor.execute('''
-                    SELECT gc.*, u.username as created_by_username
-                    FROM group_chats gc
-                    JOIN group_members gm ON gc.id = gm.group_id
-                    JOIN users u ON gc.created_by = u.id
-                    WHERE gm.user_id = %s
-                    ORDER BY gc.name
+                    SELECT gc.*,
+                           cs.last_message_id, cs.last_message_preview,
+                           cs.last_message_at, cs.unread_count
+                    FROM conversation_summaries cs
+                    JOIN group_chats gc ON gc.id = cs.chat_id
+                    WHERE cs.user_id = %s AND cs.chat_type = 'group'
+                    ORDER BY cs.last_message_id DESC
                 ''', (user_id,))
-                return cursor.fetchall()
+                groups = cursor.fetchall()
+                return User.attach_usernames(groups, 'created_by', 'created_by_username')
         except Exception as e:
-            print(f"Error getting user groups: {e}")
+            logger.error("Error getting user groups: %s", e)
             return []
-        finally:
-            connection.close()
 
     @staticmethod
-    def get_group_members(group_id):
-        """Get all members of a group"""
-        connection = get_db_connection()
+    def mark_read(group_id, user_id):
+        """Reset the user's unread counter for a group"""
+        return Inbox.mark_read(user_id, 'group', group_id)
+
+    @staticmethod
+    def get_member_ids(group_id):
+        """Get the set of user ids in a group (from the membership index)"""
+        members = membership.members(group_id)
+        if members is not None:
+            return members
         try:
-            with connection.cursor() as cursor:
-                cursor.execute('''
-                    SELECT u.id, u.username, u.email
-                    FROM group_members gm
-                    JOIN users u ON gm.user_id = u.id
-                    WHERE gm.group_id = %s
-                ''', (group_id,))
-                return cursor.fetchall()
+            with transaction() as cursor:
+                cursor.execute('SELECT user_id FROM group_members WHERE group_id = %s', (group_id,))
+                user_ids = [row['user_id'] for row in cursor.fetchall()]
+            membership.set_members(group_id, user_ids)
+            return frozenset(user_ids)
         except Exception as e:
-            print(f"Error getting group members: {e}")
-            return []
-        finally:
-            connection.close()
\ No newline at end of file
+            logger.error("Error getting group member ids: %s", e)
+            return frozenset()
+
+    @staticmethod
+    def get_user_group_ids(user_id):
+        """Get the set of group ids a user belongs to (from the membership index)"""
+        groups = membership.groups(user_id)
+        if groups is not None:
+            return groups
+        try:
+            with transaction() as cursor:
+                cursor.execute('SELECT group_id FROM group_members WHERE user_id = %s', (user_id,))
+                group_ids = [row['group_id'] for row in cursor.fetchall()]
+            membership.set_groups(user_id, group_ids)
+            return frozenset(group_ids)
+        except Exception as e:
+            logger.error("Error getting user group ids: %s", e)
+            return frozenset()
+
+    @staticmethod
+    def is_member(group_id, user_id):
+        """Check membership; a set lookup for members on every group event"""
+        if user_id in GroupChat.get_member_ids(group_id):
+            return True
+        if membership.is_non_member(group_id, user_id):
+            return False
+        # Not in the cached set: re-check the row so a join handled by
+        # another worker is picked up without waiting for the TTL, then
+        # remember a miss briefly so repeated events stay off the database
+        try:
+            with transaction() as cursor:
+                cursor.execute(
+                    'SELECT 1 FROM group_members WHERE group_id = %s AND user_id = %s',
+                    (group_id, user_id)
+                )
+                found = cursor.fetchone() is not None
+        except Exception as e:
+            logger.error("Error checking group membership: %s", e)
+            return False
+        if found:
+            membership.added(group_id, user_id)
+        else:
+            membership.set_non_member(group_id, user_id)
+        return found
+
+    @staticmethod
+    def get_group_members(group_id):
+        """Get all members of a group"""
+        members = User.get_many(GroupChat.get_member_ids(group_id)).values()
+        return sorted(
+            ({'id': user['id'], 'username': user['username'], 'email': user['email']} for user in members),
+            key=lambda user: user['username']
+        )
+
+    @staticmethod
+    def cache_stats():
+        """Hit-rate stats for the group name cache and membership index"""
+        stats = {'group_names': _group_names.stats()}
+        for name, index_stats in membership.stats().items():
+            stats[f'group_{name}'] = index_stats
+        return stats
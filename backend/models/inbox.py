@@ -0,0 +1,76 @@
+import logging
+from backend.database import transaction, insert_ignore
+from backend.schema import conversation_summaries
+from backend.versions import versions
+
+logger = logging.getLogger(__name__)
+
+# Characters of the last message kept for inbox previews
+PREVIEW_LENGTH = 120
+
+class Inbox:
+    """Per-user conversation summaries, kept current by the send path"""
+
+    @staticmethod
+    def add_participants(chat_type, chat_id, user_ids):
+        """Create empty summary rows for users who just joined a conversation"""
+        with transaction() as cursor:
+            cursor.executemany(
+                insert_ignore(conversation_summaries),
+                [{'user_id': user_id, 'chat_type': chat_type, 'chat_id': chat_id} for user_id in user_ids]
+            )
+            versions.bump(*(('inbox', user_id, chat_type) for user_id in user_ids))
+
+    @staticmethod
+    def record_message(chat_type, chat_id, message, count=1):
+        """Point every participant's summary at message and bump unread for all
+        but the sender (by count when message is the last of a batch)"""
+        # Concurrent sends can commit out of order, so the last-message
+        # columns only ever move forward. MySQL applies SET assignments left
+        # to right, so last_message_id must be the last one compared and set.
+        newer = 'last_message_id IS NULL OR last_message_id < %s'
+        with transaction() as cursor:
+            cursor.execute(
+                f'''UPDATE conversation_summaries
+                   SET last_message_preview = CASE WHEN {newer} THEN %s ELSE last_message_preview END,
+                       last_message_at = CASE WHEN {newer} THEN %s ELSE last_message_at END,
+                       unread_count = unread_count + %s * (user_id != %s),
+                       last_message_id = CASE WHEN {newer} THEN %s ELSE last_message_id END
+                   WHERE chat_type = %s AND chat_id = %s''',
+                (message['id'], message['content'][:PREVIEW_LENGTH],
+                 message['id'], message['created_at'],
+                 count, message['sender_id'],
+                 message['id'], message['id'],
+                 chat_type, chat_id)
+            )
+            # Group summaries are versioned per group rather than per member
+            if chat_type == 'group':
+                versions.bump(('group', chat_id))
+            else:
+                versions.bump(('inbox', message['sender_id'], 'private'), ('inbox', message['receiver_id'], 'private'))
+
+    @staticmethod
+    def mark_read(user_id, chat_type, chat_id):
+        """Reset a user's unread counter for one conversation"""
+        try:
+            with transaction() as cursor:
+                cursor.execute(
+                    '''UPDATE conversation_summaries SET unread_count = 0
+                       WHERE user_id = %s AND chat_type = %s AND chat_id = %s''',
+                    (user_id, chat_type, chat_id)
+                )
+                versions.bump(('inbox', user_id, chat_type))
+                return cursor.rowcount > 0 or Inbox._exists(cursor, user_id, chat_type, chat_id)
+        except Exception as e:
+            logger.error("Error marking conversation read: %s", e)
+            return False
+
+    @staticmethod
+    def _exists(cursor, user_id, chat_type, chat_id):
+        # UPDATE reports 0 rows when the counter was already 0
+        cursor.execute(
+            '''SELECT 1 FROM conversation_summaries
+               WHERE user_id = %s AND chat_type = %s AND chat_id = %s''',
+            (user_id, chat_type, chat_id)
+        )
+        return cursor.fetchone() is not None
@@ -0,0 +1,125 @@
+import logging
+from backend.database import transaction, utc_now
+from backend.models.user import User
+from backend.models.inbox import Inbox
+from backend.models.private_chat import PrivateChat
+from backend.models.group_chat import GroupChat
+from backend.history_cache import recent_messages
+from backend.search_index import search_index
+from backend.rooms import private_room, group_room
+from backend.messages import build_message_row
+
+logger = logging.getLogger(__name__)
+
+class MessageBatch:
+    """Several private and group messages from one sender, stored together"""
+
+    @staticmethod
+    def _validate(sender_id, item):
+        """(row fields, None) for a sendable item, or (None, error)"""
+        if not isinstance(item, dict):
+            return None, 'Invalid message'
+        content = item.get('content')
+        content = content.strip() if isinstance(content, str) else ''
+        if not content:
+            return None, 'Content is required'
+        if item.get('type') == 'private':
+            receiver_id = item.get('receiver_id')
+            if not isinstance(receiver_id, int) or receiver_id == sender_id:
+                return None, 'Receiver ID is required'
+            return {'message_type': 'private', 'receiver_id': receiver_id, 'group_id': None, 'content': content}, None
+        if item.get('type') == 'group':
+            group_id = item.get('group_id')
+            if not isinstance(group_id, int):
+                return None, 'Group ID is required'
+            if not GroupChat.is_member(group_id, sender_id):
+                return None, 'Not a member of this group'
+            return {'message_type': 'group', 'receiver_id': None, 'group_id': group_id, 'content': content}, None
+        return None, "Type must be 'private' or 'group'"
+
+    @staticmethod
+    def send(sender_id, items, sender_username=None):
+        """Store items in one multi-row INSERT and transaction.
+
+        Returns (results, rooms): one {'message': ...} or {'error': ...} per
+        item, in order, and room -> stored messages (oldest first) for the
+        caller to broadcast.
+        """
+        if sender_username is None:
+            sender_username = User.get_username(sender_id)
+        results = [None] * len(items)
+        rows = []
+        for index, item in enumerate(items):
+            row, error = MessageBatch._validate(sender_id, item)
+            if error:
+                results[index] = {'error': error}
+            else:
+                rows.append((index, row))
+
+        receivers = User.get_many({row['receiver_id'] for _, row in rows if row['receiver_id']})
+        for index, row in rows:
+            if row['receiver_id'] and row['receiver_id'] not in receivers:
+                results[index] = {'error': 'Unknown receiver'}
+        rows = [(index, row) for index, row in rows if results[index] is None]
+        if not rows:
+            return results, {}
+
+        try:
+            created_at = utc_now()
+            with transaction() as cursor:
+                # One chat row per receiver, created if needed (joins this transaction)
+                chats = {}
+                for _, row in rows:
+                    receiver_id = row['receiver_id']
+                    if receiver_id and receiver_id not in chats:
+                        chat = PrivateChat.get_or_create(sender_id, receiver_id)
+                        if not chat:
+                            raise RuntimeError(f"No private chat with user {receiver_id}")
+                        chats[receiver_id] = chat['id']
+                    row['conversation_id'] = chats.get(receiver_id)
+
+                cursor.execute(
+                    '''INSERT INTO messages
+                       (sender_id, receiver_id, group_id, conversation_id, message_type, content, created_at)
+                       VALUES ''' + ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(rows)),
+                    [value for _, row in rows for value in (
+                        sender_id, row['receiver_id'], row['group_id'], row['conversation_id'],
+                        row['message_type'], row['content'], created_at
+                    )]
+                )
+
+                conversations = {}
+                for message_id, (index, row) in zip(cursor.inserted_ids(len(rows)), rows):
+                    message = build_message_row(
+                        message_id, sender_id, sender_username, row['content'], created_at,
+                        receiver_id=row['receiver_id'], group_id=row['group_id'],
+                        conversation_id=row['conversation_id']
+                    )
+                    key = ('private', row['conversation_id']) if row['conversation_id'] else ('group', row['group_id'])
+                    conversations.setdefault(key, []).append((index, message))
+
+                # One summary update per conversation, pointing at its last message
+                for (chat_type, chat_id), sent in conversations.items():
+                    Inbox.record_message(chat_type, chat_id, sent[-1][1], count=len(sent))
+        except Exception as e:
+            logger.error("Error sending message batch: %s", e)
+            for index, _ in rows:
+                results[index] = {'error': 'Failed to send message'}
+            return results, {}
+
+        rooms = {}
+        for (chat_type, chat_id), sent in conversations.items():
+            if chat_type == 'private':
+                room = private_room(sender_id, sent[0][1]['receiver_id'])
+                extra = {}
+            else:
+                room = group_room(chat_id)
+                extra = {'group_name': GroupChat.get_name(chat_id)}
+            rooms[room] = []
+            for index, message in sent:
+                recent_messages.append(room, message)
+                search_index.add(message['id'], (chat_type, chat_id), message['content'])
+                payload = dict(message, **extra)
+                results[index] = {'message': payload}
+                rooms[room].append(payload)
+        return results, rooms
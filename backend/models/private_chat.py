@@ -1,122 +1,175 @@
-from backend.database import get_db_connection
+import logging
+from backend.database import transaction, utc_now, insert_ignore
+from backend.schema import private_chats
+from backend.pagination import clamp_limit, keyset_clause, finish_page
+from backend.models.user import User
+from backend.models.inbox import Inbox
+from backend.history_cache import recent_messages
+from backend.search_index import search_index
+from backend.rooms import private_room
+from backend.messages import build_message_row
+
+logger = logging.getLogger(__name__)
 
 class PrivateChat:
     @staticmethod
     def get_or_create(user1_id, user2_id):
         """Get existing private chat or create new one"""
-        connection = get_db_connection()
         try:
             # Ensure consistent ordering
             sorted_users = sorted([user1_id, user2_id])
             user1_id, user2_id = sorted_users[0], sorted_users[1]
-            
-            with connection.cursor() as cursor:
+
+            with transaction() as cursor:
                 # Check if chat exists
                 cursor.execute(
                     'SELECT * FROM private_chats WHERE user1_id = %s AND user2_id = %s',
                     (user1_id, user2_id)
                 )
                 chat = cursor.fetchone()
-                
+
                 if not chat:
-                    # Create new chat
+                    # Create new chat; IGNORE covers a concurrent creator
+                    cursor.execute(
+                        insert_ignore(private_chats),
+                        {'user1_id': user1_id, 'user2_id': user2_id}
+                    )
                     cursor.execute(
-                        'INSERT INTO private_chats (user1_id, user2_id) VALUES (%s, %s)',
+                        'SELECT * FROM private_chats WHERE user1_id = %s AND user2_id = %s',
                         (user1_id, user2_id)
                     )
-                    connection.commit()
-                    chat_id = cursor.lastrowid
-                    
-                    # Get the created chat
-                    cursor.execute('SELECT * FROM private_chats WHERE id = %s', (chat_id,))
                     chat = cursor.fetchone()
-                
+                    Inbox.add_participants('private', chat['id'], (user1_id, user2_id))
+
                 return chat
         except Exception as e:
-            print(f"Error in get_or_create private chat: {e}")
-            connection.rollback()
+            logger.error("Error in get_or_create private chat: %s", e)
             return None
-        finally:
-            connection.close()
 
     @staticmethod
-    def send_message(sender_id, receiver_id, content):
-        """Send private message"""
-        connection = get_db_connection()
+    def send_message(sender_id, receiver_id, content, sender_username=None):
+        """Send private message and return the stored message"""
         try:
-            # Ensure chat exists
-            PrivateChat.get_or_create(sender_id, receiver_id)
-            
-            with connection.cursor() as cursor:
+            if sender_username is None:
+                sender_username = User.get_username(sender_id)
+            created_at = utc_now()
+            with transaction() as cursor:
+                # Ensure chat exists (joins this transaction)
+                chat = PrivateChat.get_or_create(sender_id, receiver_id)
+                if not chat:
+                    return None
+
                 cursor.execute(
-                    '''INSERT INTO messages (sender_id, receiver_id, message_type, content) 
-                       VALUES (%s, %s, 'private', %s)''',
-                    (sender_id, receiver_id, content)
+                    '''INSERT INTO messages (sender_id, receiver_id, conversation_id, message_type, content, created_at)
+                       VALUES (%s, %s, %s, 'private', %s, %s)''',
+                    (sender_id, receiver_id, chat['id'], content, created_at)
                 )
-                message_id = cursor.lastrowid
-                connection.commit()
-                
-                # Get message with sender info
-                cursor.execute('''
-                    SELECT m.*, u.username as sender_username 
-                    FROM messages m 
-                    JOIN users u ON m.sender_id = u.id 
-                    WHERE m.id = %s
-                ''', (message_id,))
-                return cursor.fetchone()
+
+                message = build_message_row(
+                    cursor.lastrowid, sender_id, sender_username, content, created_at,
+                    receiver_id=receiver_id, conversation_id=chat['id']
+                )
+                Inbox.record_message('private', chat['id'], message)
+
+            recent_messages.append(private_room(sender_id, receiver_id), message)
+            search_index.add(message['id'], ('private', chat['id']), content)
+            return message
         except Exception as e:
-            print(f"Error sending private message: {e}")
-            connection.rollback()
+            logger.error("Error sending private message: %s", e)
             return None
-        finally:
-            connection.close()
 
     @staticmethod
-    def get_messages(user1_id, user2_id):
-        """Get all messages between two users"""
-        connection = get_db_connection()
+    def get_messages(user1_id, user2_id, before_id=None, after_id=None, limit=None):
+        """Get one page of messages between two users as (messages, next_cursor)"""
         try:
-            with connection.cursor() as cursor:
-                cursor.execute('''
-                    SELECT m.*, u.username as sender_username 
-                    FROM messages m 
-                    JOIN users u ON m.sender_id = u.id 
-                    WHERE ((m.sender_id = %s AND m.receiver_id = %s) 
-                           OR (m.sender_id = %s AND m.receiver_id = %s))
-                    AND m.message_type = 'private'
-                    ORDER BY m.created_at ASC
-                ''', (user1_id, user2_id, user2_id, user1_id))
-                return cursor.fetchall()
+            limit = clamp_limit(limit)
+            room = private_room(user1_id, user2_id)
+            cached = recent_messages.get_page(room, before_id, after_id, limit)
+            if cached is not None:
+                return cached
+
+            cursor_sql, cursor_params, order = keyset_clause(before_id, after_id)
+            user1_id, user2_id = sorted([user1_id, user2_id])
+            with transaction() as cursor:
+                # The chat row is a unique-key lookup; messages are then one
+                # range scan of idx_messages_conversation
+                cursor.execute(f'''
+                    SELECT m.*
+                    FROM private_chats pc
+                    JOIN messages m ON m.conversation_id = pc.id
+                    WHERE pc.user1_id = %s AND pc.user2_id = %s{cursor_sql}
+                    ORDER BY m.id {order}
+                    LIMIT %s
+                ''', (user1_id, user2_id, *cursor_params, limit + 1))
+                messages, next_cursor = finish_page(cursor.fetchall(), limit, after_id)
+                User.attach_usernames(messages)
+
+            if before_id is None and after_id is None:
+                recent_messages.fill(room, messages, complete=next_cursor is None)
+            return messages, next_cursor
         except Exception as e:
-            print(f"Error getting private messages: {e}")
-            return []
-        finally:
-            connection.close()
+            logger.error("Error getting private messages: %s", e)
+            return [], None
+
+    @staticmethod
+    def get_partner_ids(user_ids):
+        """Map each user id to the ids of users they have a private chat with"""
+        partners = {user_id: set() for user_id in user_ids}
+        if not partners:
+            return partners
+        try:
+            placeholders = ', '.join(['%s'] * len(partners))
+            with transaction() as cursor:
+                cursor.execute(f'''
+                    SELECT user1_id, user2_id FROM private_chats
+                    WHERE user1_id IN ({placeholders}) OR user2_id IN ({placeholders})
+                ''', (*partners, *partners))
+                for row in cursor.fetchall():
+                    if row['user1_id'] in partners:
+                        partners[row['user1_id']].add(row['user2_id'])
+                    if row['user2_id'] in partners:
+                        partners[row['user2_id']].add(row['user1_id'])
+        except Exception as e:
+            logger.error("Error getting chat partners: %s", e)
+        return partners
 
     @staticmethod
     def get_user_chats(user_id):
-        """Get all private chats for a user"""
-        connection = get_db_connection()
+        """Get all private chats for a user, most recently active first, with
+        the last message and unread count"""
         try:
-            with connection.cursor() as cursor:
+            with transaction() as cursor:
                 cursor.execute('''
-                    SELECT pc.*, 
-                           CASE 
-                               WHEN pc.user1_id = %s THEN u2.username 
-                               ELSE u1.username 
-                           END as other_user_username,
-                           CASE 
-                               WHEN pc.user1_id = %s THEN u2.id 
-                               ELSE u1.id 
-                           END as other_user_id
-                    FROM private_chats pc
-                    JOIN users u1 ON pc.user1_id = u1.id
-                    JOIN users u2 ON pc.user2_id = u2.id
-                    WHERE pc.user1_id = %s OR pc.user2_id = %s
-                ''', (user_id, user_id, user_id, user_id))
-                return cursor.fetchall()
+                    SELECT pc.*,
+                           CASE
+                               WHEN pc.user1_id = %s THEN pc.user2_id
+                               ELSE pc.user1_id
+                           END as other_user_id,
+                           cs.last_message_id, cs.last_message_preview,
+                           cs.last_message_at, cs.unread_count
+                    FROM conversation_summaries cs
+                    JOIN private_chats pc ON pc.id = cs.chat_id
+                    WHERE cs.user_id = %s AND cs.chat_type = 'private'
+                    ORDER BY cs.last_message_id DESC
+                ''', (user_id, user_id))
+                chats = cursor.fetchall()
+                return User.attach_usernames(chats, 'other_user_id', 'other_user_username')
         except Exception as e:
-            print(f"Error getting user chats: {e}")
+            logger.error("Error getting user chats: %s", e)
             return []
-        finally:
-            connection.close()
\ No newline at end of file
+
+    @staticmethod
+    def mark_read(user_id, other_user_id):
+        """Reset the user's unread counter for the chat with other_user_id"""
+        try:
+            user1_id, user2_id = sorted([user_id, other_user_id])
+            with transaction() as cursor:
+                cursor.execute(
+                    'SELECT id FROM private_chats WHERE user1_id = %s AND user2_id = %s',
+                    (user1_id, user2_id)
+                )
+                chat = cursor.fetchone()
+                return bool(chat) and Inbox.mark_read(user_id, 'private', chat['id'])
+        except Exception as e:
+            logger.error("Error marking private chat read: %s", e)
+            return False
@@ -0,0 +1,140 @@
+import logging
+from backend.config import config
+from backend.database import transaction, dialect_name
+from backend.pagination import clamp_limit, encode_cursor
+from backend.search_index import search_index, tokenize
+from backend.models.user import User
+from backend.models.group_chat import GroupChat
+
+logger = logging.getLogger(__name__)
+
+# Messages read per query while loading the in-process index
+INDEX_LOAD_BATCH_SIZE = 5000
+
+def _snippet(content, terms):
+    """About SEARCH_SNIPPET_LENGTH characters of content around the first matching term"""
+    size = config.SEARCH_SNIPPET_LENGTH
+    if len(content) <= size:
+        return content
+    lowered = content.lower()
+    positions = [position for position in (lowered.find(term) for term in terms) if position >= 0]
+    start = max(0, min(positions, default=0) - size // 4)
+    end = min(len(content), start + size)
+    start = max(0, end - size)
+    return ('…' if start else '') + content[start:end].strip() + ('…' if end < len(content) else '')
+
+class Search:
+    """Full-text search over the messages a user can read"""
+
+    @staticmethod
+    def _scopes(cursor, user_id):
+        # Every private thread and joined group has a summary row for the user
+        cursor.execute(
+            'SELECT chat_type, chat_id FROM conversation_summaries WHERE user_id = %s',
+            (user_id,)
+        )
+        return {(row['chat_type'], row['chat_id']) for row in cursor.fetchall()}
+
+    @staticmethod
+    def _mysql_matches(cursor, query, scopes, after, count):
+        # FULLTEXT index ft_messages_content; every term is required. The
+        # scope predicate narrows the matches before they are sorted, and
+        # later pages start below the last (score, id) instead of skipping
+        # an OFFSET of rows
+        boolean_query = ' '.join(f'+{term}' for term in tokenize(query))
+        private_ids = [chat_id for chat_type, chat_id in scopes if chat_type == 'private']
+        group_ids = [chat_id for chat_type, chat_id in scopes if chat_type == 'group']
+        clauses, params = [], []
+        if private_ids:
+            clauses.append(f"m.conversation_id IN ({', '.join(['%s'] * len(private_ids))})")
+            params += private_ids
+        if group_ids:
+            clauses.append(f"m.group_id IN ({', '.join(['%s'] * len(group_ids))})")
+            params += group_ids
+        keyset = ''
+        if after:
+            keyset = 'HAVING score < %s OR (score = %s AND id < %s)'
+            params += [after[0], after[0], after[1]]
+        cursor.execute(f'''
+            SELECT m.*, MATCH(m.content) AGAINST (%s IN BOOLEAN MODE) AS score
+            FROM messages m
+            WHERE MATCH(m.content) AGAINST (%s IN BOOLEAN MODE)
+              AND ({' OR '.join(clauses)})
+            {keyset}
+            ORDER BY score DESC, m.id DESC
+            LIMIT %s
+        ''', (boolean_query, boolean_query, *params, count))
+        return cursor.fetchall()
+
+    @staticmethod
+    def _load_index(cursor):
+        """Index the messages stored since the last load (all of them the
+        first time), including ones sent through other processes"""
+        through_id = search_index.loaded_through or 0
+        while True:
+            cursor.execute('''
+                SELECT id, message_type, conversation_id, group_id, content
+                FROM messages WHERE id > %s ORDER BY id LIMIT %s
+            ''', (through_id, INDEX_LOAD_BATCH_SIZE))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            through_id = rows[-1]['id']
+            search_index.load(
+                ((row['id'],
+                  ('private', row['conversation_id']) if row['message_type'] == 'private' else ('group', row['group_id']),
+                  row['content'])
+                 for row in rows),
+                through_id
+            )
+        if not search_index.loaded:
+            search_index.load((), 0)
+
+    @staticmethod
+    def _indexed_matches(cursor, query, scopes, after, count):
+        Search._load_index(cursor)
+        hits = search_index.search(query, scopes, count, after)
+        if not hits:
+            return []
+        placeholders = ', '.join(['%s'] * len(hits))
+        cursor.execute(
+            f'SELECT m.* FROM messages m WHERE m.id IN ({placeholders})',
+            [message_id for _, message_id in hits]
+        )
+        rows = {row['id']: row for row in cursor.fetchall()}
+        return [dict(rows[message_id], score=score) for score, message_id in hits if message_id in rows]
+
+    @staticmethod
+    def messages(user_id, query, after=None, limit=None):
+        """One page of the user's messages matching query, best match first,
+        as (results, next_cursor); after is the (score, id) a cursor holds"""
+        try:
+            limit = clamp_limit(limit, config.SEARCH_PAGE_SIZE, config.SEARCH_PAGE_MAX)
+            count = limit + 1
+            terms = tokenize(query)
+            if not terms:
+                return [], None
+
+            with transaction() as cursor:
+                scopes = Search._scopes(cursor, user_id)
+                if not scopes:
+                    return [], None
+                if dialect_name() == 'mysql':
+                    results = Search._mysql_matches(cursor, query, scopes, after, count)
+                else:
+                    results = Search._indexed_matches(cursor, query, scopes, after, count)
+
+            next_cursor = None
+            for result in results:
+                result['score'] = float(result['score'])
+            if len(results) > limit:
+                results = results[:limit]
+                next_cursor = encode_cursor(results[-1]['score'], results[-1]['id'])
+            for result in results:
+                result['snippet'] = _snippet(result['content'], terms)
+                if result['group_id'] is not None:
+                    result['group_name'] = GroupChat.get_name(result['group_id'])
+            return User.attach_usernames(results), next_cursor
+        except Exception as e:
+            logger.error("Error searching messages: %s", e)
+            return [], None
@@ -0,0 +1,63 @@
+import logging
+from backend.config import config
+from backend.database import transaction
+from backend.pagination import clamp_limit
+from backend.models.user import User
+from backend.models.group_chat import GroupChat
+
+logger = logging.getLogger(__name__)
+
+class Sync:
+    """Catch-up reads for clients coming back from a dropped connection"""
+
+    @staticmethod
+    def messages(user_id, since_id, limit=None):
+        """Messages newer than since_id across the user's private threads and
+        joined groups, oldest first, as (messages, next_cursor).
+
+        next_cursor is the since_id for the next page, or None once caught up.
+        """
+        try:
+            limit = clamp_limit(limit, config.SYNC_PAGE_SIZE, config.SYNC_PAGE_MAX)
+            with transaction() as cursor:
+                # Summaries whose last message is past since_id name exactly
+                # the conversations with something new (idx_summaries_inbox);
+                # each is then a range scan of its message index. Each branch
+                # stops at the page size before the two are merged (derived
+                # tables, since SQLite rejects parenthesized UNION operands).
+                cursor.execute('''
+                    SELECT * FROM (
+                        SELECT m.*
+                        FROM conversation_summaries cs
+                        JOIN messages m ON m.conversation_id = cs.chat_id AND m.id > %s
+                        WHERE cs.user_id = %s AND cs.chat_type = 'private' AND cs.last_message_id > %s
+                        ORDER BY m.id
+                        LIMIT %s
+                    ) private_messages
+                    UNION ALL
+                    SELECT * FROM (
+                        SELECT m.*
+                        FROM conversation_summaries cs
+                        JOIN messages m ON m.group_id = cs.chat_id AND m.id > %s
+                        WHERE cs.user_id = %s AND cs.chat_type = 'group' AND cs.last_message_id > %s
+                        ORDER BY m.id
+                        LIMIT %s
+                    ) group_messages
+                    ORDER BY id
+                    LIMIT %s
+                ''', (since_id, user_id, since_id, limit + 1,
+                      since_id, user_id, since_id, limit + 1,
+                      limit + 1))
+                messages = cursor.fetchall()
+
+            next_cursor = None
+            if len(messages) > limit:
+                messages = messages[:limit]
+                next_cursor = messages[-1]['id']
+            for message in messages:
+                if message['group_id'] is not None:
+                    message['group_name'] = GroupChat.get_name(message['group_id'])
+            return User.attach_usernames(messages), next_cursor
+        except Exception as e:
+            logger.error("Error syncing messages: %s", e)
+            return [], None
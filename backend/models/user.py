@@ -1,84 +1,237 @@
-import bcrypt
-from backend.database import get_db_connection
+import logging
+from sqlalchemy.exc import IntegrityError
+from backend.cache import TTLCache
+from backend.config import config
+from backend.database import transaction, release_connection
+from backend.pagination import clamp_limit, encode_cursor, like_prefix, like_substring
+from backend.passwords import hash_password, check_password, needs_rehash
+from backend.versions import versions
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_COLUMNS = 'id, username, email, created_at'
+
+# user id -> {id, username, email, created_at}; never holds password hashes
+_identities = TTLCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL)
+
+def _remember(user):
+    identity = {
+        'id': user['id'],
+        'username': user['username'],
+        'email': user['email'],
+        'created_at': user['created_at']
+    }
+    _identities.set(user['id'], identity)
+    return dict(identity)
 
 class User:
     @staticmethod
     def create(username, email, password):
         """Create a new user"""
-        connection = get_db_connection()
         try:
-            # Hash the password
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            
-            with connection.cursor() as cursor:
+            # Hash the password (off the eventlet hub)
+            password_hash = hash_password(password)
+
+            with transaction() as cursor:
                 cursor.execute(
                     'INSERT INTO users (username, email, password) VALUES (%s, %s, %s)',  # Changed to 'password'
                     (username, email, password_hash)
                 )
                 user_id = cursor.lastrowid
-                connection.commit()
-                return user_id, None
-                
+                versions.bump('users')
+
+            User.invalidate(user_id)
+            return user_id, None
+
+        except IntegrityError:
+            return None, "Username or email already exists"
         except Exception as e:
-            connection.rollback()
-            if "Duplicate entry" in str(e):
-                return None, "Username or email already exists"
             return None, f"Error creating user: {str(e)}"
-        finally:
-            connection.close()
+
+    @staticmethod
+    def invalidate(user_id):
+        """Drop the cached identity after a user row is written"""
+        _identities.invalidate(user_id)
 
     @staticmethod
     def get_by_username(username):
-        """Get user by username"""
-        connection = get_db_connection()
+        """Get user by username (including the password hash, so never cached)"""
         try:
-            with connection.cursor() as cursor:
+            with transaction() as cursor:
                 cursor.execute('SELECT * FROM users WHERE username = %s', (username,))
-                return cursor.fetchone()
+                user = cursor.fetchone()
+            if user:
+                _remember(user)
+            return user
         except Exception as e:
-            print(f"Error getting user by username: {e}")
+            logger.error("Error getting user by username: %s", e)
             return None
-        finally:
-            connection.close()
 
     @staticmethod
     def verify_password(username, password):
         """Verify user password"""
         user = User.get_by_username(username)
-        if user and bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):  # Changed to 'password'
+        # Don't hold a pooled connection through the hashing below
+        release_connection()
+        if user and check_password(password, user['password']):  # Changed to 'password'
+            if needs_rehash(user['password']):
+                User.update_password(user['id'], password)
             return user
         return None
 
+    @staticmethod
+    def update_password(user_id, password):
+        """Store a fresh hash of password using the current work factor"""
+        try:
+            password_hash = hash_password(password)
+            with transaction() as cursor:
+                cursor.execute('UPDATE users SET password = %s WHERE id = %s', (password_hash, user_id))
+            User.invalidate(user_id)
+            return True
+        except Exception as e:
+            logger.error("Error updating password: %s", e)
+            return False
+
     @staticmethod
     def get_all(exclude_user_id=None):
         """Get all users"""
-        connection = get_db_connection()
         try:
-            with connection.cursor() as cursor:
+            with transaction() as cursor:
                 if exclude_user_id:
                     cursor.execute(
-                        'SELECT id, username, email, created_at FROM users WHERE id != %s ORDER BY username',
+                        f'SELECT {IDENTITY_COLUMNS} FROM users WHERE id != %s ORDER BY username',
                         (exclude_user_id,)
                     )
                 else:
-                    cursor.execute('SELECT id, username, email, created_at FROM users ORDER BY username')
+                    cursor.execute(f'SELECT {IDENTITY_COLUMNS} FROM users ORDER BY username')
                 return cursor.fetchall()
         except Exception as e:
-            print(f"Error getting all users: {e}")
+            logger.error("Error getting all users: %s", e)
+            return []
+
+    @staticmethod
+    def search(exclude_user_id=None, query=None, match='prefix', after=None, limit=None):
+        """Get one page of the user directory by username as (users, next_cursor).
+
+        query narrows it to usernames starting with it (match='prefix', a
+        range scan of the unique username index reading about limit rows)
+        or, as an explicit opt-in, containing it (match='contains'). A
+        substring LIKE can't seek the index: it walks it in order from the
+        keyset until limit rows match, which for a rare substring means the
+        whole table. after is the decoded next_cursor of the previous page:
+        [username].
+        """
+        try:
+            limit = clamp_limit(limit, config.DIRECTORY_PAGE_SIZE, config.DIRECTORY_PAGE_MAX)
+            clauses, params = [], []
+            if query:
+                clauses.append("username LIKE %s ESCAPE '!'")
+                params.append(like_substring(query) if match == 'contains' else like_prefix(query))
+            if after:
+                clauses.append('username > %s')
+                params.append(after[0])
+            if exclude_user_id:
+                clauses.append('id != %s')
+                params.append(exclude_user_id)
+            where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+            with transaction() as cursor:
+                cursor.execute(
+                    f'SELECT {IDENTITY_COLUMNS} FROM users{where} ORDER BY username LIMIT %s',
+                    (*params, limit + 1)
+                )
+                users = list(cursor.fetchall())
+
+            next_cursor = None
+            if len(users) > limit:
+                users = users[:limit]
+                next_cursor = encode_cursor(users[-1]['username'])
+            return users, next_cursor
+        except Exception as e:
+            logger.error("Error searching users: %s", e)
+            return [], None
+
+    @staticmethod
+    def get_recent_contacts(user_id, limit=None):
+        """Get the users a user most recently had private messages with"""
+        try:
+            limit = clamp_limit(limit, config.RECENT_CONTACTS_LIMIT, config.RECENT_CONTACTS_LIMIT)
+            with transaction() as cursor:
+                # Newest summaries first straight off idx_summaries_inbox
+                cursor.execute('''
+                    SELECT CASE WHEN pc.user1_id = %s THEN pc.user2_id ELSE pc.user1_id END AS other_user_id
+                    FROM conversation_summaries cs
+                    JOIN private_chats pc ON pc.id = cs.chat_id
+                    WHERE cs.user_id = %s AND cs.chat_type = 'private'
+                    ORDER BY cs.last_message_id DESC
+                    LIMIT %s
+                ''', (user_id, user_id, limit))
+                contact_ids = [row['other_user_id'] for row in cursor.fetchall()]
+            identities = User.get_many(contact_ids)
+            return [identities[contact_id] for contact_id in contact_ids if contact_id in identities]
+        except Exception as e:
+            logger.error("Error getting recent contacts: %s", e)
             return []
-        finally:
-            connection.close()
 
     @staticmethod
     def get_by_id(user_id):
         """Get user by ID"""
-        connection = get_db_connection()
+        identity = _identities.get(user_id)
+        if identity:
+            return dict(identity)
         try:
-            with connection.cursor() as cursor:
-                cursor.execute('SELECT id, username, email, created_at FROM users WHERE id = %s', (user_id,))
-                return cursor.fetchone()
+            with transaction() as cursor:
+                cursor.execute(f'SELECT {IDENTITY_COLUMNS} FROM users WHERE id = %s', (user_id,))
+                user = cursor.fetchone()
+            return _remember(user) if user else None
         except Exception as e:
-            print(f"Error getting user by ID: {e}")
+            logger.error("Error getting user by ID: %s", e)
             return None
-        finally:
-            connection.close()
\ No newline at end of file
+
+    @staticmethod
+    def get_many(user_ids):
+        """Map user ids to identities, loading every cache miss in one query"""
+        identities = {}
+        missing = []
+        for user_id in set(user_ids) - {None}:
+            identity = _identities.get(user_id)
+            if identity:
+                identities[user_id] = dict(identity)
+            else:
+                missing.append(user_id)
+        if not missing:
+            return identities
+        try:
+            with transaction() as cursor:
+                placeholders = ', '.join(['%s'] * len(missing))
+                cursor.execute(
+                    f'SELECT {IDENTITY_COLUMNS} FROM users WHERE id IN ({placeholders})',
+                    missing
+                )
+                for user in cursor.fetchall():
+                    identities[user['id']] = _remember(user)
+        except Exception as e:
+            logger.error("Error getting users: %s", e)
+        return identities
+
+    @staticmethod
+    def get_usernames(user_ids):
+        """Map user ids to usernames"""
+        return {user_id: identity['username'] for user_id, identity in User.get_many(user_ids).items()}
+
+    @staticmethod
+    def get_username(user_id):
+        """Get a single user's username"""
+        return User.get_usernames([user_id]).get(user_id)
+
+    @staticmethod
+    def attach_usernames(rows, id_key='sender_id', name_key='sender_username'):
+        """Add name_key to each row from the cache instead of joining users"""
+        usernames = User.get_usernames(row[id_key] for row in rows)
+        for row in rows:
+            row[name_key] = usernames.get(row[id_key])
+        return rows
+
+    @staticmethod
+    def cache_stats():
+        """Hit-rate stats for the identity cache"""
+        return _identities.stats()
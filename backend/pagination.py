@@ -0,0 +1,69 @@
+import base64
+import json
+from backend.config import config
+
+def clamp_limit(limit, default=None, maximum=None):
+    """Clamp a requested page size to the configured bounds (message pages by default)"""
+    default = default or config.MESSAGE_PAGE_SIZE
+    maximum = maximum or config.MESSAGE_PAGE_MAX
+    if not limit or limit < 1:
+        return default
+    return min(limit, maximum)
+
+def encode_cursor(*values):
+    """Pack the sort key of the last row on a page into an opaque cursor string"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+def decode_cursor(token, size):
+    """Unpack a cursor from encode_cursor; ValueError if it isn't one of size values"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+def like_prefix(prefix):
+    """LIKE pattern matching strings that start with prefix literally.
+
+    Use it with ESCAPE '!' (a backslash escape isn't portable across SQL
+    string literal rules).
+    """
+    return _like_escape(prefix) + '%'
+
+def like_substring(text):
+    """LIKE pattern matching strings that contain text literally (ESCAPE '!')"""
+    return '%' + _like_escape(text) + '%'
+
+def _like_escape(text):
+    return text.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+def keyset_clause(before_id=None, after_id=None, column='m.id'):
+    """Return the WHERE fragment, its params and the ORDER BY direction for a page.
+
+    Without a cursor the newest page is returned. after_id pages forward
+    (ascending), before_id pages back into older history (descending).
+    """
+    if after_id is not None:
+        return f' AND {column} > %s', [after_id], 'ASC'
+    if before_id is not None:
+        return f' AND {column} < %s', [before_id], 'DESC'
+    return '', [], 'DESC'
+
+def finish_page(rows, limit, after_id=None):
+    """Drop the look-ahead row and return (rows oldest first, next_cursor).
+
+    Queries fetch limit + 1 rows so we know whether another page exists.
+    next_cursor is the id to pass back as the same before_id / after_id
+    parameter, or None once the end of the history is reached.
+    """
+    rows = list(rows)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after_id is None:
+        rows.reverse()
+        next_cursor = rows[0]['id'] if has_more else None
+    else:
+        next_cursor = rows[-1]['id'] if has_more else None
+    return rows, next_cursor
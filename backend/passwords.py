@@ -0,0 +1,42 @@
+import bcrypt
+from backend.config import config
+
+try:
+    from eventlet import patcher, tpool
+except ImportError:
+    patcher = tpool = None
+
+if tpool is not None:
+    # Takes effect when tpool starts its threads on first use
+    tpool.set_num_threads(config.PASSWORD_HASH_THREADS)
+
+def _offload(fn, *args):
+    """Run fn on eventlet's native thread pool when the hub owns this thread.
+
+    bcrypt releases the GIL while hashing, so the hub keeps serving every
+    other socket while a login is being verified.
+    """
+    if tpool is not None and patcher.is_monkey_patched('thread'):
+        return tpool.execute(fn, *args)
+    return fn(*args)
+
+def hash_password(password):
+    """Hash a password with the configured bcrypt work factor"""
+    salt = bcrypt.gensalt(rounds=config.BCRYPT_ROUNDS)
+    return _offload(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+def check_password(password, password_hash):
+    """Check a password against a stored bcrypt hash; False when it isn't one"""
+    try:
+        return _offload(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        # bcrypt rejects anything that isn't a $2a$/$2b$/$2y$ hash ("Invalid salt")
+        return False
+
+def needs_rehash(password_hash):
+    """True when password_hash was made with a different work factor than configured"""
+    # bcrypt hashes look like $2b$<cost>$<salt+hash>
+    try:
+        return int(password_hash.split('$')[2]) != config.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
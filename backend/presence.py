@@ -0,0 +1,76 @@
+import time
+import threading
+from backend.config import config
+
+class PresenceRegistry:
+    """In-memory user id -> connected Socket.IO sids for this worker.
+
+    A user is online while any of their sockets (tabs, devices) is
+    connected. When the last one goes, they stay online for grace_period
+    seconds so a reconnect does not flap their status. Changes are only
+    collected here; flush() hands the net changes since the last flush to
+    the caller to publish, so one user connecting and disconnecting many
+    times between flushes costs at most one update.
+    """
+
+    def __init__(self, grace_period):
+        self.grace_period = grace_period
+        self._sids = {}
+        # user id -> monotonic time their grace period ends
+        self._leaving = {}
+        # Users whose status may have changed since the last flush
+        self._dirty = set()
+        # Statuses as last published
+        self._published = set()
+        self._lock = threading.Lock()
+
+    def connect(self, user_id, sid):
+        with self._lock:
+            self._sids.setdefault(user_id, set()).add(sid)
+            self._leaving.pop(user_id, None)
+            self._dirty.add(user_id)
+
+    def disconnect(self, user_id, sid):
+        with self._lock:
+            sids = self._sids.get(user_id)
+            if sids is None:
+                return
+            sids.discard(sid)
+            if not sids:
+                del self._sids[user_id]
+                self._leaving[user_id] = time.monotonic() + self.grace_period
+
+    def is_online(self, user_id):
+        with self._lock:
+            return user_id in self._sids or user_id in self._leaving
+
+    def online(self, user_ids):
+        """The subset of user_ids that are online"""
+        with self._lock:
+            return {user_id for user_id in user_ids if user_id in self._sids or user_id in self._leaving}
+
+    def flush(self):
+        """Net status changes since the last flush as {user id: online}"""
+        now = time.monotonic()
+        with self._lock:
+            for user_id, leaves_at in list(self._leaving.items()):
+                if leaves_at <= now:
+                    del self._leaving[user_id]
+                    self._dirty.add(user_id)
+            changes = {}
+            for user_id in self._dirty:
+                online = user_id in self._sids or user_id in self._leaving
+                if online != (user_id in self._published):
+                    changes[user_id] = online
+                    if online:
+                        self._published.add(user_id)
+                    else:
+                        self._published.discard(user_id)
+            self._dirty = set()
+            return changes
+
+    def stats(self):
+        with self._lock:
+            return {'users': len(self._sids) + len(self._leaving), 'sockets': sum(len(sids) for sids in self._sids.values())}
+
+presence = PresenceRegistry(config.PRESENCE_GRACE_PERIOD)
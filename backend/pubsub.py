@@ -0,0 +1,34 @@
+import queue
+import threading
+import socketio
+
+class InProcessManager(socketio.PubSubManager):
+    """Socket.IO pub/sub client manager backed by in-memory queues.
+
+    Every SocketIO server in this process created with the same channel
+    receives each publish, the way separate workers do through Redis.
+    Selected with SOCKETIO_MESSAGE_QUEUE=memory:// so multi-server fan-out
+    can be exercised in tests and local runs without a broker. It does not
+    cross process boundaries.
+    """
+    name = 'memory'
+
+    _subscribers = {}
+    _subscribers_lock = threading.Lock()
+
+    def __init__(self, url='memory://', channel='socketio', write_only=False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self._queue = queue.Queue()
+        if not write_only:
+            with self._subscribers_lock:
+                self._subscribers.setdefault(channel, []).append(self._queue)
+
+    def _publish(self, data):
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers.get(self.channel, []))
+        for subscriber in subscribers:
+            subscriber.put(data)
+
+    def _listen(self):
+        while True:
+            yield self._queue.get()
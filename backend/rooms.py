@@ -0,0 +1,11 @@
+def private_room(user1_id, user2_id):
+    """Socket.IO room (and cache key) shared by the two users of a private chat"""
+    return f"private_{min(user1_id, user2_id)}_{max(user1_id, user2_id)}"
+
+def group_room(group_id):
+    """Socket.IO room (and cache key) for a group chat"""
+    return f"group_{group_id}"
+
+def user_room(user_id):
+    """Socket.IO room holding every socket of one user"""
+    return f"user_{user_id}"
@@ -0,0 +1,92 @@
+"""The current schema as SQLAlchemy Core tables.
+
+MySQL databases are built and upgraded step by step by backend.migrations;
+SQLite databases (local runs, benchmarks, CI) are created from these
+definitions in one go. Keep both in step when adding a migration;
+backend/tests/test_schema.py fails when they drift apart.
+"""
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, Text, TIMESTAMP, Enum,
+    ForeignKey, Index, UniqueConstraint, PrimaryKeyConstraint, func
+)
+
+metadata = MetaData()
+
+CHAT_TYPES = ('private', 'group')
+
+users = Table(
+    'users', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('username', String(80), unique=True, nullable=False),
+    Column('email', String(120), unique=True, nullable=False),
+    Column('password', String(255), nullable=False),
+    Column('created_at', TIMESTAMP, server_default=func.current_timestamp()),
+)
+
+group_chats = Table(
+    'group_chats', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('description', Text),
+    Column('created_by', Integer, ForeignKey('users.id', ondelete='SET NULL', name='fk_group_chats_created_by')),
+    Column('member_count', Integer, nullable=False, server_default='0'),
+    Column('created_at', TIMESTAMP, server_default=func.current_timestamp()),
+    Index('idx_group_chats_name', 'name', 'id'),
+)
+
+group_members = Table(
+    'group_members', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('group_id', Integer, ForeignKey('group_chats.id', ondelete='CASCADE', name='fk_group_members_group')),
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE', name='fk_group_members_user')),
+    Column('joined_at', TIMESTAMP, server_default=func.current_timestamp()),
+    UniqueConstraint('group_id', 'user_id', name='unique_member'),
+    Index('idx_group_members_user', 'user_id'),
+)
+
+private_chats = Table(
+    'private_chats', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user1_id', Integer, ForeignKey('users.id', ondelete='CASCADE', name='fk_private_chats_user1')),
+    Column('user2_id', Integer, ForeignKey('users.id', ondelete='CASCADE', name='fk_private_chats_user2')),
+    Column('created_at', TIMESTAMP, server_default=func.current_timestamp()),
+    UniqueConstraint('user1_id', 'user2_id', name='unique_private_chat'),
+)
+
+messages = Table(
+    'messages', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('sender_id', Integer, ForeignKey('users.id', ondelete='CASCADE', name='fk_messages_sender')),
+    Column('receiver_id', Integer, ForeignKey('users.id', ondelete='CASCADE', name='fk_messages_receiver')),
+    Column('group_id', Integer, ForeignKey('group_chats.id', ondelete='CASCADE', name='fk_messages_group')),
+    Column('conversation_id', Integer, ForeignKey('private_chats.id', ondelete='CASCADE', name='fk_messages_conversation')),
+    Column('message_type', Enum(*CHAT_TYPES, name='message_type'), nullable=False),
+    Column('content', Text, nullable=False),
+    Column('created_at', TIMESTAMP, server_default=func.current_timestamp()),
+    Index('idx_messages_group', 'group_id', 'id'),
+    Index('idx_messages_private', 'sender_id', 'receiver_id', 'id'),
+    Index('idx_messages_conversation', 'conversation_id', 'id'),
+    # MySQL also has FULLTEXT ft_messages_content (migration 7); SQLite
+    # searches through backend/search_index.py instead
+)
+
+conversation_summaries = Table(
+    'conversation_summaries', metadata,
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE', name='fk_summaries_user'), nullable=False),
+    Column('chat_type', Enum(*CHAT_TYPES, name='chat_type'), nullable=False),
+    Column('chat_id', Integer, nullable=False),
+    Column('last_message_id', Integer),
+    Column('last_message_preview', String(255)),
+    Column('last_message_at', TIMESTAMP),
+    Column('unread_count', Integer, nullable=False, server_default='0'),
+    PrimaryKeyConstraint('user_id', 'chat_type', 'chat_id'),
+    Index('idx_summaries_chat', 'chat_type', 'chat_id'),
+    Index('idx_summaries_inbox', 'user_id', 'chat_type', 'last_message_id'),
+)
+
+schema_migrations = Table(
+    'schema_migrations', metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('description', String(255), nullable=False),
+    Column('applied_at', TIMESTAMP, server_default=func.current_timestamp()),
+)
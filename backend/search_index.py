@@ -0,0 +1,101 @@
+import re
+import math
+import heapq
+import threading
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+def tokenize(text):
+    """Lowercased word tokens of text"""
+    return _TOKEN.findall(text.lower())
+
+class InvertedIndex:
+    """term -> conversation -> {message id: term count}, kept in memory.
+
+    Used for search when the database has no full-text index (SQLite).
+    Filled from the messages table by load(), which the caller repeats
+    before each search to pick up messages stored since, and kept current
+    by add() on this process's send path. Postings are split by
+    conversation, so a search only walks the conversations the caller can
+    read.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        # term -> number of messages containing it (for idf)
+        self._document_counts = {}
+        self._scopes = {}
+        self._lock = threading.Lock()
+        # Highest message id loaded from the database; None until loaded
+        self.loaded_through = None
+
+    @property
+    def loaded(self):
+        return self.loaded_through is not None
+
+    def _add(self, message_id, scope, content):
+        if message_id in self._scopes:
+            return
+        self._scopes[message_id] = scope
+        counts = {}
+        for term in tokenize(content):
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            self._postings.setdefault(term, {}).setdefault(scope, {})[message_id] = count
+            self._document_counts[term] = self._document_counts.get(term, 0) + 1
+
+    def load(self, rows, through_id):
+        """Index rows of (id, scope, content) read from the database up to through_id"""
+        with self._lock:
+            for message_id, scope, content in rows:
+                self._add(message_id, scope, content)
+            self.loaded_through = max(self.loaded_through or 0, through_id)
+
+    def add(self, message_id, scope, content):
+        """Index a message just stored; ignored until the index is loaded"""
+        with self._lock:
+            if self.loaded:
+                self._add(message_id, scope, content)
+
+    def search(self, query, scopes, limit, after=None):
+        """Best limit (score, message id) pairs in scopes containing every
+        query term, highest first, starting below the pair after.
+
+        Only conversations in scopes that contain every term are visited,
+        and within each the rarest term's postings drive the scan.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            by_scope = [self._postings.get(term) for term in terms]
+            if not all(by_scope):
+                return []
+            total = len(self._scopes)
+            weights = [math.log(1 + total / self._document_counts[term]) for term in terms]
+            narrowest = min(by_scope, key=len)
+            candidates = scopes if len(scopes) <= len(narrowest) else [scope for scope in narrowest if scope in scopes]
+            hits = []
+            for scope in candidates:
+                postings = [(term_scopes.get(scope), weight) for term_scopes, weight in zip(by_scope, weights)]
+                if not all(posting for posting, _ in postings):
+                    continue
+                postings.sort(key=lambda entry: len(entry[0]))
+                (first, first_weight), rest = postings[0], postings[1:]
+                for message_id, count in first.items():
+                    score = count * first_weight
+                    for posting, weight in rest:
+                        other = posting.get(message_id)
+                        if other is None:
+                            break
+                        score += other * weight
+                    else:
+                        if after is None or (score, message_id) < after:
+                            hits.append((score, message_id))
+        return heapq.nlargest(limit, hits)
+
+    def stats(self):
+        with self._lock:
+            return {'documents': len(self._scopes), 'terms': len(self._postings)}
+
+search_index = InvertedIndex()
@@ -0,0 +1,68 @@
+"""Fixtures for the backend test suite.
+
+Tests run against an in-memory SQLite database (no MySQL server needed) and
+Flask / Flask-SocketIO test clients, from the repository root:
+
+    python -m pytest backend/tests
+"""
+import os
+import itertools
+
+# Settings are read when backend.config is first imported
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+# Tests call flush_presence() / flush_typing() themselves
+os.environ.setdefault('PRESENCE_INTERVAL', '3600')
+os.environ.setdefault('TYPING_INTERVAL', '3600')
+
+import pytest
+from backend.app import app as flask_app, socketio
+
+_usernames = itertools.count(1)
+
+@pytest.fixture
+def app():
+    return flask_app
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+
+@pytest.fixture
+def login(app):
+    """Register a fresh user and return (test client logged in as them, user)"""
+    def login(username=None):
+        username = username or f'user{next(_usernames)}'
+        client = app.test_client()
+        response = client.post('/api/register', json={
+            'username': username, 'email': f'{username}@example.com', 'password': 'secret123'
+        })
+        assert response.status_code == 201, response.get_json()
+        response = client.post('/api/login', json={'username': username, 'password': 'secret123'})
+        assert response.status_code == 200, response.get_json()
+        return client, response.get_json()['user']
+    return login
+
+@pytest.fixture
+def connect(app):
+    """Open a Socket.IO test client sharing a logged-in test client's session"""
+    sockets = []
+
+    def connect(client, **kwargs):
+        sock = socketio.test_client(app, flask_test_client=client, **kwargs)
+        sockets.append(sock)
+        return sock
+
+    yield connect
+    for sock in sockets:
+        if sock.is_connected():
+            sock.disconnect()
+
+@pytest.fixture
+def received():
+    """Payloads of the events named event a socket received since the last call"""
+    def received(sock, event):
+        return [packet['args'][0] for packet in sock.get_received() if packet['name'] == event]
+    return received
@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+from backend import cache, database
+from backend.cache import TTLCache
+from backend.history_cache import recent_messages
+from backend.models import user as user_model
+from backend.models.user import User
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = SimpleNamespace(monotonic=lambda: 100.0)
+    monkeypatch.setattr(cache, 'time', clock)
+    ttl_cache = TTLCache(maxsize=10, ttl=5)
+    ttl_cache.set('a', 1)
+    assert ttl_cache.get('a') == 1
+
+    clock.monotonic = lambda: 105.0
+    assert ttl_cache.get('a') is None
+    assert ttl_cache.stats()['size'] == 0
+
+def test_least_recently_used_entries_are_evicted():
+    ttl_cache = TTLCache(maxsize=2, ttl=60)
+    ttl_cache.set('a', 1)
+    ttl_cache.set('b', 2)
+    ttl_cache.get('a')
+    ttl_cache.set('c', 3)
+    assert ttl_cache.get('b') is None
+    assert (ttl_cache.get('a'), ttl_cache.get('c')) == (1, 3)
+    assert ttl_cache.stats()['evictions'] == 1
+
+def test_stats_count_hits_and_misses():
+    ttl_cache = TTLCache(maxsize=10, ttl=60)
+    ttl_cache.set('a', 1)
+    ttl_cache.get('a')
+    ttl_cache.get('a')
+    ttl_cache.get('b')
+    stats = ttl_cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (2, 1, 1)
+    assert stats['hit_rate'] == 2 / 3
+
+def test_a_zero_size_cache_stores_nothing():
+    ttl_cache = TTLCache(maxsize=0, ttl=60)
+    ttl_cache.set('a', 1)
+    assert ttl_cache.get('a') is None
+
+def test_user_writes_invalidate_the_cached_identity(login, app_context):
+    _, user = login()
+    assert User.get_by_id(user['id'])['username'] == user['username']
+    assert user_model._identities.get(user['id']) is not None
+
+    User.update_password(user['id'], 'another-secret')
+    assert user_model._identities.get(user['id']) is None
+
+def count_user_queries(monkeypatch):
+    queries = []
+    execute = database.Cursor.execute
+    def counting_execute(self, query, args=None):
+        if 'users' in str(query):
+            queries.append(str(query))
+        return execute(self, query, args)
+    monkeypatch.setattr(database.Cursor, 'execute', counting_execute)
+    return queries
+
+def test_sends_and_history_do_not_query_users_per_message(login, monkeypatch):
+    alice, _ = login()
+    bob, bob_user = login()
+    group_id = alice.post('/api/groups/create', json={'name': 'no user lookups'}).get_json()['group_id']
+    bob.post(f'/api/groups/{group_id}/join')
+    queries = count_user_queries(monkeypatch)
+
+    for i in range(3):
+        alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': f'p{i}'})
+        alice.post(f'/api/groups/{group_id}/send-message', json={'content': f'a{i}'})
+        bob.post(f'/api/groups/{group_id}/send-message', json={'content': f'b{i}'})
+    assert queries == []
+
+    # Read history from the database with a cold identity cache: one
+    # batched lookup for all the senders on the page
+    monkeypatch.setattr(recent_messages, 'per_room', 0)
+    user_model._identities.clear()
+    history = bob.get(f'/api/groups/{group_id}/messages').get_json()['messages']
+    assert len(history) == 6
+    assert all(m['sender_username'] for m in history)
+    assert len(queries) == 1
+
+    queries.clear()
+    assert len(bob.get(f"/api/private/messages/{history[0]['sender_id']}").get_json()['messages']) == 3
+    assert queries == []
@@ -0,0 +1,60 @@
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+import msgpack
+import pytest
+from backend import encodings
+
+def decode(payload, encoding):
+    return msgpack.unpackb(payload, raw=False) if encoding == 'msgpack' else payload
+
+def test_trim_drops_nulls_and_derivable_fields():
+    message = {
+        'id': 1, 'sender_id': 2, 'receiver_id': 3, 'group_id': None, 'conversation_id': 9,
+        'message_type': 'private', 'content': 'hi', 'created_at': datetime(2024, 1, 2, 3, 4, 5),
+    }
+    assert encodings.trim([message]) == [
+        {'id': 1, 'sender_id': 2, 'receiver_id': 3, 'content': 'hi', 'created_at': 1704164645}
+    ]
+
+def test_unknown_encodings_fall_back_to_json():
+    assert encodings.negotiate('xml') == 'json'
+    assert encodings.negotiate('compact') == 'compact'
+
+@pytest.mark.parametrize('encoding', ['json', 'compact', 'msgpack'])
+def test_broadcasts_round_trip(login, connect, received, encoding):
+    alice, alice_user = login()
+    bob, bob_user = login()
+    reference = connect(bob)
+    sock = connect(bob, auth={'encoding': encoding})
+    assert received(sock, 'encoding') == [{'encoding': encoding}]
+    for s in (reference, sock):
+        s.emit('join_private_chat', {'other_user_id': alice_user['id']})
+        s.get_received()
+
+    connect(alice).emit('send_private_message', {'receiver_id': bob_user['id'], 'content': 'hi'})
+
+    [expected] = received(reference, 'receive_private_message')
+    [payload] = received(sock, 'receive_private_message')
+    assert 'message_type' in expected
+    if encoding != 'json':
+        # The json payload went through JSON, which writes datetimes as HTTP dates
+        expected = dict(encodings.trim(expected), created_at=int(parsedate_to_datetime(expected['created_at']).timestamp()))
+    assert decode(payload, encoding) == expected
+
+@pytest.mark.parametrize('encoding', ['json', 'compact', 'msgpack'])
+def test_acks_follow_the_socket_encoding(login, connect, encoding):
+    alice, _ = login()
+    _, bob_user = login()
+    sock = connect(alice, auth={'encoding': encoding})
+
+    ack = sock.emit('send_messages', {'messages': [
+        {'type': 'private', 'receiver_id': bob_user['id'], 'content': 'batched'}
+    ]}, callback=True)
+    [result] = decode(ack['results'], encoding)
+    message = result['message']
+    assert message['content'] == 'batched'
+    assert ('message_type' in message) == (encoding == 'json')
+    assert isinstance(message['created_at'], int) == (encoding != 'json')
+
+    ack = sock.emit('sync', {'since_id': message['id'] - 1}, callback=True)
+    assert decode(ack['messages'], encoding) == [message]
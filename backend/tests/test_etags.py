@@ -0,0 +1,66 @@
+from backend import database
+
+def revalidate(client, path, etag):
+    return client.get(path, headers={'If-None-Match': etag}).status_code
+
+def test_unchanged_listing_is_not_modified(login):
+    alice, _ = login()
+    response = alice.get('/api/private/chats')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    assert revalidate(alice, '/api/private/chats', response.headers['ETag']) == 304
+
+def test_new_message_changes_both_inboxes(login):
+    alice, alice_user = login()
+    bob, bob_user = login()
+    carol, _ = login()
+    etags = {
+        name: client.get('/api/private/chats').headers['ETag']
+        for name, client in (('alice', alice), ('bob', bob), ('carol', carol))
+    }
+    alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': 'hi'})
+    assert revalidate(alice, '/api/private/chats', etags['alice']) == 200
+    assert revalidate(bob, '/api/private/chats', etags['bob']) == 200
+    assert revalidate(carol, '/api/private/chats', etags['carol']) == 304
+
+    etag = bob.get('/api/private/chats').headers['ETag']
+    bob.post(f"/api/private/chats/{alice_user['id']}/read")
+    assert revalidate(bob, '/api/private/chats', etag) == 200
+
+def test_group_listings_change_on_join_and_message(login):
+    alice, _ = login()
+    bob, _ = login()
+    group_id = alice.post('/api/groups/create', json={'name': 'etag group'}).get_json()['group_id']
+    paths = ['/api/groups', '/api/groups/my', f'/api/groups/{group_id}/members']
+
+    etags = {path: bob.get(path).headers['ETag'] for path in paths}
+    bob.post(f'/api/groups/{group_id}/join')
+    assert {path: revalidate(bob, path, etags[path]) for path in paths} == dict.fromkeys(paths, 200)
+
+    etags = {path: bob.get(path).headers['ETag'] for path in paths}
+    alice.post(f'/api/groups/{group_id}/send-message', json={'content': 'hi'})
+    assert revalidate(bob, '/api/groups/my', etags['/api/groups/my']) == 200
+    assert revalidate(bob, f'/api/groups/{group_id}/members', etags[f'/api/groups/{group_id}/members']) == 304
+
+def test_registration_changes_user_directory(login):
+    alice, _ = login()
+    etag = alice.get('/api/users').headers['ETag']
+    login()
+    assert revalidate(alice, '/api/users', etag) == 200
+
+def test_failed_query_gets_500_without_etag(login, monkeypatch):
+    alice, _ = login()
+
+    def fail(self, query, args=None):
+        raise RuntimeError('database unavailable')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(database.Cursor, 'execute', fail)
+        for path in ('/api/private/chats', '/api/groups/my'):
+            response = alice.get(path)
+            assert response.status_code == 500
+            assert 'ETag' not in response.headers
+
+    response = alice.get('/api/private/chats')
+    assert response.status_code == 200
+    assert response.headers['ETag']
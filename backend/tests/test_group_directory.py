@@ -0,0 +1,14 @@
+def test_group_directory_pages_and_filters_by_prefix(login):
+    alice, user = login()
+    prefix = f"dir{user['id']}"
+    for i in range(5):
+        alice.post('/api/groups/create', json={'name': f'{prefix} {i}'})
+    alice.post('/api/groups/create', json={'name': f'other {prefix}'})
+
+    page = alice.get(f'/api/groups?q={prefix}&limit=2').get_json()
+    names = [g['name'] for g in page['groups']]
+    while page['next_cursor']:
+        page = alice.get(f"/api/groups?q={prefix}&limit=2&cursor={page['next_cursor']}").get_json()
+        names += [g['name'] for g in page['groups']]
+    assert names == [f'{prefix} {i}' for i in range(5)]
+    assert alice.get('/api/groups?cursor=zz').status_code == 400
@@ -0,0 +1,98 @@
+import pytest
+from backend import database
+from backend.history_cache import RecentMessageCache, recent_messages
+
+def message(message_id):
+    return {'id': message_id, 'content': f'm{message_id}'}
+
+def ids(page):
+    messages, next_cursor = page
+    return [m['id'] for m in messages], next_cursor
+
+def test_eviction_raises_the_floor():
+    cache = RecentMessageCache(per_room=3, max_messages=100)
+    cache.fill('room', [message(1), message(2)], complete=True)
+    assert ids(cache.get_page('room', limit=10)) == ([1, 2], None)
+
+    for message_id in (3, 4, 5):
+        cache.append('room', message(message_id))
+    # 1 and 2 were pushed out: the cache no longer knows the start of the room
+    assert cache.get_page('room', limit=10) is None
+    assert ids(cache.get_page('room', limit=2)) == ([4, 5], 4)
+    assert cache.get_page('room', before_id=4, limit=2) is None
+    assert ids(cache.get_page('room', after_id=3)) == ([4, 5], None)
+    # Messages after 1 include 2, which is below the floor
+    assert cache.get_page('room', after_id=1) is None
+
+def test_least_recently_used_rooms_go_first():
+    cache = RecentMessageCache(per_room=10, max_messages=3)
+    cache.fill('old', [message(1), message(2)], complete=True)
+    cache.fill('new', [message(3), message(4)], complete=True)
+    assert cache.get_page('old', limit=10) is None
+    assert ids(cache.get_page('new', limit=10)) == ([3, 4], None)
+    assert cache.stats()['evictions'] == 1
+
+def test_a_room_first_seen_through_a_send_is_not_complete():
+    cache = RecentMessageCache(per_room=10, max_messages=100)
+    cache.append('room', message(7))
+    assert cache.get_page('room', limit=10) is None
+    assert ids(cache.get_page('room', after_id=6)) == ([7], None)
+
+@pytest.fixture
+def small_cache(monkeypatch):
+    monkeypatch.setattr(recent_messages, 'per_room', 3)
+
+def count_queries(monkeypatch):
+    queries = []
+    execute = database.Cursor.execute
+    monkeypatch.setattr(database.Cursor, 'execute', lambda self, *args: queries.append(args) or execute(self, *args))
+    return queries
+
+def history(client, group_id, **params):
+    query = '&'.join(f'{name}={value}' for name, value in params.items())
+    page = client.get(f'/api/groups/{group_id}/messages?{query}').get_json()
+    return [m['id'] for m in page['messages']], page['next_cursor']
+
+def test_cached_pages_match_database_pages(login, monkeypatch, small_cache):
+    alice, _ = login()
+    group_id = alice.post('/api/groups/create', json={'name': 'cached history'}).get_json()['group_id']
+    sent = [
+        alice.post(f'/api/groups/{group_id}/send-message', json={'content': f'm{i}'}).get_json()['id']
+        for i in range(6)
+    ]
+    cursors = [
+        {'limit': 2}, {'limit': 5}, {'limit': 2, 'before_id': sent[5]}, {'limit': 2, 'before_id': sent[3]},
+        {'after_id': sent[3]}, {'after_id': sent[0]}, {'after_id': sent[1], 'limit': 2},
+    ]
+    cached = [history(alice, group_id, **params) for params in cursors]
+    monkeypatch.setattr(recent_messages, 'per_room', 0)
+    assert cached == [history(alice, group_id, **params) for params in cursors]
+
+def test_pages_below_the_floor_fall_through_to_the_database(login, monkeypatch, small_cache):
+    alice, _ = login()
+    group_id = alice.post('/api/groups/create', json={'name': 'floor'}).get_json()['group_id']
+    sent = [
+        alice.post(f'/api/groups/{group_id}/send-message', json={'content': f'm{i}'}).get_json()['id']
+        for i in range(5)
+    ]
+    queries = count_queries(monkeypatch)
+
+    assert history(alice, group_id, after_id=sent[2]) == (sent[3:], None)
+    assert queries == []
+
+    assert history(alice, group_id, after_id=sent[0]) == (sent[1:], None)
+    assert len(queries) > 0
+
+def test_send_after_eviction_keeps_the_full_history(login, monkeypatch, small_cache):
+    alice, _ = login()
+    first = alice.post('/api/groups/create', json={'name': 'evicted'}).get_json()['group_id']
+    second = alice.post('/api/groups/create', json={'name': 'busy'}).get_json()['group_id']
+    sent = [alice.post(f'/api/groups/{first}/send-message', json={'content': f'a{i}'}).get_json()['id'] for i in range(2)]
+    assert history(alice, first) == (sent, None)
+
+    monkeypatch.setattr(recent_messages, 'max_messages', 3)
+    for i in range(3):
+        alice.post(f'/api/groups/{second}/send-message', json={'content': f'b{i}'})
+    sent.append(alice.post(f'/api/groups/{first}/send-message', json={'content': 'a2'}).get_json()['id'])
+
+    assert history(alice, first) == (sent, None)
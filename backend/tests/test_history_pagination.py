@@ -0,0 +1,50 @@
+import pytest
+from backend.pagination import encode_cursor, decode_cursor
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor('abc', 7), 2) == ['abc', 7]
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(7), 2)
+    with pytest.raises(ValueError):
+        decode_cursor('not a cursor', 1)
+
+def test_private_history_pages_back_with_before_id(login):
+    alice, alice_user = login()
+    bob, bob_user = login()
+    sent = [
+        alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': f'm{i}'}).get_json()['id']
+        for i in range(5)
+    ]
+
+    page = bob.get(f"/api/private/messages/{alice_user['id']}?limit=2").get_json()
+    assert [m['id'] for m in page['messages']] == sent[3:]
+    seen = [m['id'] for m in page['messages']]
+    while page['next_cursor']:
+        page = bob.get(f"/api/private/messages/{alice_user['id']}?limit=2&before_id={page['next_cursor']}").get_json()
+        seen = [m['id'] for m in page['messages']] + seen
+    assert seen == sent
+
+def test_private_history_after_id(login):
+    alice, alice_user = login()
+    bob, bob_user = login()
+    sent = [
+        alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': f'm{i}'}).get_json()['id']
+        for i in range(3)
+    ]
+    page = bob.get(f"/api/private/messages/{alice_user['id']}?after_id={sent[0]}").get_json()
+    assert [m['id'] for m in page['messages']] == sent[1:]
+
+def test_group_history_pages_back_with_before_id(login):
+    alice, _ = login()
+    group_id = alice.post('/api/groups/create', json={'name': 'history group'}).get_json()['group_id']
+    sent = [
+        alice.post(f'/api/groups/{group_id}/send-message', json={'content': f'g{i}'}).get_json()['id']
+        for i in range(5)
+    ]
+
+    page = alice.get(f'/api/groups/{group_id}/messages?limit=3').get_json()
+    seen = [m['id'] for m in page['messages']]
+    page = alice.get(f"/api/groups/{group_id}/messages?limit=3&before_id={page['next_cursor']}").get_json()
+    seen = [m['id'] for m in page['messages']] + seen
+    assert seen == sent
+    assert page['next_cursor'] is None
@@ -0,0 +1,45 @@
+from backend.database import utc_now
+from backend.models.inbox import Inbox
+
+def test_unread_counts_and_mark_read(login):
+    alice, alice_user = login()
+    bob, bob_user = login()
+    for content in ('one', 'two'):
+        alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': content})
+
+    [chat] = bob.get('/api/private/chats').get_json()
+    assert chat['unread_count'] == 2
+    assert chat['last_message_preview'] == 'two'
+    assert alice.get('/api/private/chats').get_json()[0]['unread_count'] == 0
+
+    assert bob.post(f"/api/private/chats/{alice_user['id']}/read").status_code == 200
+    assert bob.get('/api/private/chats').get_json()[0]['unread_count'] == 0
+
+def test_group_unread_counts_skip_the_sender(login):
+    alice, _ = login()
+    bob, _ = login()
+    group_id = alice.post('/api/groups/create', json={'name': 'inbox group'}).get_json()['group_id']
+    bob.post(f'/api/groups/{group_id}/join')
+    alice.post(f'/api/groups/{group_id}/send-message', json={'content': 'hello'})
+
+    assert bob.get('/api/groups/my').get_json()[0]['unread_count'] == 1
+    assert alice.get('/api/groups/my').get_json()[0]['unread_count'] == 0
+    bob.post(f'/api/groups/{group_id}/read')
+    assert bob.get('/api/groups/my').get_json()[0]['unread_count'] == 0
+
+def test_summary_never_moves_back_to_an_older_message(login, app):
+    alice, alice_user = login()
+    bob, bob_user = login()
+    newest = alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': 'newest'}).get_json()
+
+    # A concurrent send of an earlier message that commits its summary last
+    with app.app_context():
+        Inbox.record_message('private', newest['conversation_id'], {
+            'id': newest['id'] - 1, 'content': 'older', 'created_at': utc_now(),
+            'sender_id': alice_user['id'], 'receiver_id': bob_user['id'],
+        })
+
+    [chat] = bob.get('/api/private/chats').get_json()
+    assert chat['last_message_preview'] == 'newest'
+    assert chat['last_message_id'] == newest['id']
+    assert chat['unread_count'] == 2
@@ -0,0 +1,8 @@
+import pytest
+from backend.database import transaction
+
+def test_logged_errors_leave_out_bound_parameters(app_context):
+    with pytest.raises(Exception) as error:
+        with transaction() as cursor:
+            cursor.execute('INSERT INTO no_such_table (content) VALUES (%s)', ('private message body',))
+    assert 'private message body' not in str(error.value)
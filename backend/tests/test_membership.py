@@ -0,0 +1,53 @@
+import pytest
+from backend import database
+from backend.database import transaction
+from backend.membership import membership
+from backend.models.group_chat import GroupChat
+
+def count_queries(monkeypatch):
+    queries = []
+    execute = database.Cursor.execute
+    monkeypatch.setattr(database.Cursor, 'execute', lambda self, *args: queries.append(args) or execute(self, *args))
+    return queries
+
+def test_non_member_events_do_not_query_each_time(login, connect, monkeypatch):
+    alice, _ = login()
+    bob, _ = login()
+    group_id = alice.post('/api/groups/create', json={'name': 'members only'}).get_json()['group_id']
+    sock = connect(bob)
+
+    queries = count_queries(monkeypatch)
+    for _ in range(10):
+        sock.emit('send_group_message', {'group_id': group_id, 'content': 'let me in'})
+    assert len(queries) <= 2
+    assert alice.get(f'/api/groups/{group_id}/messages').get_json()['messages'] == []
+
+def test_joining_clears_a_cached_non_member(login, connect, received):
+    alice, _ = login()
+    bob, bob_user = login()
+    group_id = alice.post('/api/groups/create', json={'name': 'join later'}).get_json()['group_id']
+    sock = connect(bob)
+    sock.emit('send_group_message', {'group_id': group_id, 'content': 'rejected'})
+    assert membership.is_non_member(group_id, bob_user['id'])
+
+    bob.post(f'/api/groups/{group_id}/join')
+    assert not membership.is_non_member(group_id, bob_user['id'])
+    sock.emit('join_group_chat', {'group_id': group_id})
+    sock.emit('send_group_message', {'group_id': group_id, 'content': 'accepted'})
+    assert [m['content'] for m in received(sock, 'receive_group_message')] == ['accepted']
+
+def test_membership_is_recorded_only_when_the_join_commits(login, app_context):
+    _, user = login()
+    known_groups = GroupChat.get_user_group_ids(user['id'])
+
+    # create() joined to an outer transaction that then rolls back
+    with pytest.raises(RuntimeError):
+        with transaction():
+            group_id = GroupChat.create('rolled back', '', user['id'])
+            raise RuntimeError('later step failed')
+    assert membership.groups(user['id']) == known_groups
+    assert not GroupChat.is_member(group_id, user['id'])
+
+    group_id = GroupChat.create('committed', '', user['id'])
+    assert membership.groups(user['id']) == known_groups | {group_id}
+    assert GroupChat.is_member(group_id, user['id'])
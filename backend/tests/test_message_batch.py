@@ -0,0 +1,50 @@
+def test_batch_reports_each_message_and_emits_once_per_room(login, connect, received):
+    alice, alice_user = login()
+    bob, bob_user = login()
+    group_id = alice.post('/api/groups/create', json={'name': 'batch group'}).get_json()['group_id']
+    bob_sock = connect(bob)
+    bob_sock.emit('join_private_chat', {'other_user_id': alice_user['id']})
+    alice_sock = connect(alice)
+    alice_sock.emit('join_group_chat', {'group_id': group_id})
+    bob_sock.get_received()
+    alice_sock.get_received()
+
+    results = alice.post('/api/messages/batch', json={'messages': [
+        {'type': 'private', 'receiver_id': bob_user['id'], 'content': 'a'},
+        {'type': 'group', 'group_id': group_id, 'content': 'g'},
+        {'type': 'private', 'receiver_id': 999999, 'content': 'x'},
+        {'type': 'private', 'receiver_id': bob_user['id'], 'content': 'b'},
+        {'type': 'group', 'group_id': 999999, 'content': 'x'},
+        {'type': 'bogus'},
+    ]}).get_json()['results']
+
+    assert [r['message']['content'] for r in results if 'message' in r] == ['a', 'g', 'b']
+    assert [r['error'] for r in results if 'error' in r] == [
+        'Unknown receiver', 'Not a member of this group', 'Content is required'
+    ]
+    assert results[1]['message']['group_name'] == 'batch group'
+    assert [[m['content'] for m in batch] for batch in received(bob_sock, 'receive_private_messages')] == [['a', 'b']]
+    assert [[m['content'] for m in batch] for batch in received(alice_sock, 'receive_group_messages')] == [['g']]
+
+    chats = bob.get('/api/private/chats').get_json()
+    assert chats[0]['unread_count'] == 2
+    assert chats[0]['last_message_id'] == results[3]['message']['id']
+    history = bob.get(f"/api/private/messages/{alice_user['id']}").get_json()['messages']
+    assert [m['content'] for m in history] == ['a', 'b']
+
+def test_batch_rows_match_single_sends(login):
+    alice, _ = login()
+    bob, bob_user = login()
+    single = alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': 'one'}).get_json()
+    batched = alice.post('/api/messages/batch', json={'messages': [
+        {'type': 'private', 'receiver_id': bob_user['id'], 'content': 'two'}
+    ]}).get_json()['results'][0]['message']
+    assert set(batched) == set(single)
+
+def test_batch_socket_event(login, connect):
+    alice, _ = login()
+    bob, bob_user = login()
+    sock = connect(alice)
+    ack = sock.emit('send_messages', {'messages': [{'type': 'private', 'receiver_id': bob_user['id'], 'content': 'hi'}]}, callback=True)
+    assert ack['results'][0]['message']['content'] == 'hi'
+    assert sock.emit('send_messages', {'messages': []}, callback=True) == {'error': 'Messages are required'}
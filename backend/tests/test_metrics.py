@@ -0,0 +1,17 @@
+from backend.metrics import db_query_seconds
+
+def test_query_latency_is_labelled_by_module_and_function(login):
+    client, _ = login()
+    client.get('/api/groups')
+    labels = {labels[0] for labels in db_query_seconds._values}
+    assert 'group_chat.get_all_groups' in labels
+    assert 'user.create' in labels
+
+def test_cache_lookups_are_exported_as_a_counter(login):
+    client, user = login()
+    client.get(f"/api/users/{user['id']}")
+    text = client.get('/metrics').get_data(as_text=True)
+    assert '# TYPE chat_cache_lookups_total counter' in text
+    assert 'chat_cache_lookups_total{cache="users",result="hit"}' in text
+    assert 'chat_cache_lookups_total{cache="users",result="miss"}' in text
+    assert 'chat_cache_lookups{' not in text
@@ -0,0 +1,60 @@
+import bcrypt
+from backend import database, passwords
+from backend.config import config
+from backend.database import transaction
+
+def stored_hash(user_id):
+    with transaction() as cursor:
+        cursor.execute('SELECT password FROM users WHERE id = %s', (user_id,))
+        return cursor.fetchone()['password']
+
+def set_hash(user_id, password_hash):
+    with transaction() as cursor:
+        cursor.execute('UPDATE users SET password = %s WHERE id = %s', (password_hash, user_id))
+
+def cost(password_hash):
+    return int(password_hash.split('$')[2])
+
+def test_login_rehashes_at_the_configured_cost(login, app, app_context, monkeypatch):
+    _, user = login()
+    assert cost(stored_hash(user['id'])) == config.BCRYPT_ROUNDS
+    monkeypatch.setattr(config, 'BCRYPT_ROUNDS', config.BCRYPT_ROUNDS + 1)
+
+    response = app.test_client().post('/api/login', json={'username': user['username'], 'password': 'secret123'})
+    assert response.status_code == 200
+    rehashed = stored_hash(user['id'])
+    assert cost(rehashed) == config.BCRYPT_ROUNDS
+    assert bcrypt.checkpw(b'secret123', rehashed.encode('utf-8'))
+
+    # Already at the configured cost: left alone
+    app.test_client().post('/api/login', json={'username': user['username'], 'password': 'secret123'})
+    assert stored_hash(user['id']) == rehashed
+
+def test_bcrypt_runs_without_a_pooled_connection(login, app, monkeypatch):
+    _, user = login()
+    connections_held = []
+
+    class FakeTpool:
+        @staticmethod
+        def execute(fn, *args):
+            connections_held.append(database._current_session().connection is not None)
+            return fn(*args)
+
+    class FakePatcher:
+        @staticmethod
+        def is_monkey_patched(module):
+            return True
+
+    monkeypatch.setattr(passwords, 'tpool', FakeTpool)
+    monkeypatch.setattr(passwords, 'patcher', FakePatcher)
+    response = app.test_client().post('/api/login', json={'username': user['username'], 'password': 'secret123'})
+    assert response.status_code == 200
+    assert connections_held == [False]
+
+def test_a_stored_value_that_is_not_a_bcrypt_hash_is_rejected(login, app, app_context):
+    _, user = login()
+    set_hash(user['id'], 'plaintext-from-an-old-import')
+
+    response = app.test_client().post('/api/login', json={'username': user['username'], 'password': 'secret123'})
+    assert response.status_code == 401
+    assert response.get_json() == {'error': 'Invalid credentials'}
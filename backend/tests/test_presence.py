@@ -0,0 +1,52 @@
+from backend.app import flush_presence
+from backend.presence import PresenceRegistry, presence
+
+def test_registry_publishes_net_changes_only(monkeypatch):
+    registry = PresenceRegistry(grace_period=5)
+    now = [100.0]
+    monkeypatch.setattr('backend.presence.time.monotonic', lambda: now[0])
+
+    registry.connect(1, 'a')
+    registry.connect(1, 'b')
+    assert registry.flush() == {1: True}
+    registry.disconnect(1, 'a')
+    registry.disconnect(1, 'b')
+    # Within the grace period a reconnect is not a change
+    registry.connect(1, 'c')
+    assert registry.flush() == {}
+    registry.disconnect(1, 'c')
+    assert registry.is_online(1)
+    now[0] += 6
+    assert registry.flush() == {1: False}
+    assert not registry.is_online(1)
+    assert registry.flush() == {}
+
+def test_presence_goes_only_to_online_contacts(login, connect, received, monkeypatch, app_context):
+    monkeypatch.setattr(presence, 'grace_period', 0)
+    alice, alice_user = login()
+    bob, bob_user = login()
+    carol, _ = login()
+    dave, _ = login()
+    alice.post(f"/api/private/start-chat/{bob_user['id']}")
+    group_id = carol.post('/api/groups/create', json={'name': 'presence group'}).get_json()['group_id']
+    alice.post(f'/api/groups/{group_id}/join')
+
+    bob_sock, carol_sock, dave_sock = connect(bob), connect(carol), connect(dave)
+    flush_presence()
+    for sock in (bob_sock, carol_sock, dave_sock):
+        sock.get_received()
+
+    first_tab, second_tab = connect(alice), connect(alice)
+    flush_presence()
+    assert received(bob_sock, 'presence') == [{'online': [alice_user['id']], 'offline': []}]
+    assert received(carol_sock, 'presence') == [{'online': [alice_user['id']], 'offline': []}]
+    assert received(dave_sock, 'presence') == []
+
+    first_tab.disconnect()
+    flush_presence()
+    assert received(bob_sock, 'presence') == []
+
+    second_tab.disconnect()
+    flush_presence()
+    assert received(bob_sock, 'presence') == [{'online': [], 'offline': [alice_user['id']]}]
+    assert bob_sock.emit('get_presence', callback=True) == {'online': []}
@@ -0,0 +1,48 @@
+import itertools
+import eventlet
+import socketio
+from backend.pubsub import InProcessManager
+
+_channels = itertools.count(1)
+
+def make_server(channel, write_only=False):
+    """A Socket.IO server on the memory:// queue that records what it sends"""
+    server = socketio.Server(
+        client_manager=InProcessManager(channel=channel, write_only=write_only), async_mode='eventlet'
+    )
+    sent = []
+    server._send_eio_packet = lambda eio_sid, packet: sent.append((eio_sid, packet.data))
+    server._send_packet = lambda eio_sid, packet: sent.append((eio_sid, packet.encode()))
+    server.manager.initialize()
+    return server, sent
+
+def test_emit_reaches_rooms_on_every_server_on_the_channel():
+    channel = f'test-{next(_channels)}'
+    first, first_sent = make_server(channel)
+    second, second_sent = make_server(channel)
+    other, other_sent = make_server(f'test-{next(_channels)}')
+    for server in (first, second, other):
+        sid = server.manager.connect('eio-1', '/')
+        server.manager.enter_room(sid, '/', 'room')
+
+    first.emit('ping', {'n': 1}, to='room')
+    eventlet.sleep(0.1)
+
+    assert len(first_sent) == 1
+    assert len(second_sent) == 1
+    assert '"ping"' in second_sent[0][1]
+    assert other_sent == []
+
+def test_write_only_manager_publishes_without_listening():
+    channel = f'test-{next(_channels)}'
+    writer, _ = make_server(channel, write_only=True)
+    listener, listener_sent = make_server(channel)
+    sid = listener.manager.connect('eio-1', '/')
+    listener.manager.enter_room(sid, '/', 'room')
+    assert writer.manager._queue.empty()
+
+    writer.emit('ping', {'n': 1}, to='room')
+    eventlet.sleep(0.1)
+
+    assert len(listener_sent) == 1
+    assert writer.manager._queue.empty()
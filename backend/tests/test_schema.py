@@ -0,0 +1,122 @@
+"""backend.schema (how SQLite databases are built) must describe the same
+tables as the MySQL migrations."""
+import os
+import re
+import pytest
+from sqlalchemy import UniqueConstraint, create_engine, inspect
+from backend import migrations
+from backend.schema import metadata
+
+# MySQL-only: SQLite searches through backend/search_index.py instead
+MYSQL_ONLY_INDEXES = {('messages', 'ft_messages_content')}
+
+class RecordingCursor:
+    """Stands in for a cursor on an empty MySQL database: every existence
+    check says "missing", so each migration issues all of its DDL"""
+
+    def __init__(self):
+        self.statements = []
+        self.connection = self
+        self._row = None
+
+    def execute(self, query, args=None):
+        self.statements.append(' '.join(query.split()))
+        self._row = {'max_id': None, 'acquired': 1} if 'MAX(id)' in query else None
+
+    def fetchone(self):
+        return self._row
+
+    def fetchall(self):
+        return []
+
+    def commit(self):
+        pass
+
+def _split_top_level(body):
+    parts, depth, current = [], 0, ''
+    for char in body:
+        depth += char == '('
+        depth -= char == ')'
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+        else:
+            current += char
+    return parts + [current.strip()]
+
+def _migrated_schema():
+    """{table: {'columns', 'indexes', 'foreign_keys'}} from the migrations' DDL"""
+    cursor = RecordingCursor()
+    migrations._ensure_version_table(cursor)
+    for _, _, step in sorted(migrations.MIGRATIONS, key=lambda m: m[0]):
+        step(cursor)
+
+    tables = {}
+    for statement in cursor.statements:
+        create = re.match(r'CREATE TABLE IF NOT EXISTS (\w+) \((.*)\)$', statement)
+        if create:
+            table = tables.setdefault(create.group(1), {'columns': set(), 'indexes': set(), 'foreign_keys': set()})
+            for part in _split_top_level(create.group(2)):
+                words = part.split()
+                if words[0] == 'PRIMARY':
+                    continue
+                if words[0] in ('KEY', 'INDEX'):
+                    table['indexes'].add(words[1])
+                elif words[0] == 'UNIQUE':
+                    table['indexes'].add(words[2])
+                elif words[0] == 'CONSTRAINT':
+                    table['foreign_keys'].add(words[1])
+                else:
+                    table['columns'].add(words[0])
+                    if 'UNIQUE' in words:
+                        table['indexes'].add(f'unique:{words[0]}')
+            continue
+        match = re.match(r'ALTER TABLE (\w+) ADD COLUMN (\w+)', statement)
+        if match:
+            tables[match.group(1)]['columns'].add(match.group(2))
+        match = re.match(r'CREATE INDEX (\w+) ON (\w+)', statement)
+        if match:
+            tables[match.group(2)]['indexes'].add(match.group(1))
+        match = re.match(r'ALTER TABLE (\w+) ADD FULLTEXT INDEX (\w+)', statement)
+        if match:
+            tables[match.group(1)]['indexes'].add(match.group(2))
+        match = re.match(r'ALTER TABLE (\w+) ADD CONSTRAINT (\w+) FOREIGN KEY', statement)
+        if match:
+            tables[match.group(1)]['foreign_keys'].add(match.group(2))
+    return tables
+
+def _declared_schema():
+    """The same shape from backend.schema"""
+    tables = {}
+    for table in metadata.sorted_tables:
+        indexes = {index.name for index in table.indexes}
+        indexes |= {
+            constraint.name for constraint in table.constraints
+            if isinstance(constraint, UniqueConstraint) and constraint.name
+        }
+        indexes |= {f'unique:{column.name}' for column in table.columns if column.unique}
+        indexes |= {index for owner, index in MYSQL_ONLY_INDEXES if owner == table.name}
+        tables[table.name] = {
+            'columns': {column.name for column in table.columns},
+            'indexes': indexes,
+            'foreign_keys': {key.name for key in table.foreign_keys},
+        }
+    return tables
+
+def test_schema_matches_the_migrations():
+    assert _declared_schema() == _migrated_schema()
+
+@pytest.mark.skipif(not os.environ.get('TEST_MYSQL_URL'), reason='set TEST_MYSQL_URL to an empty MySQL database')
+def test_migrations_build_the_schema_on_mysql():
+    engine = create_engine(os.environ['TEST_MYSQL_URL'])
+    with engine.connect() as connection:
+        migrations.migrate(connection)
+        # A second run finds nothing pending
+        assert migrations.migrate(connection) == []
+    reflected = inspect(engine)
+    for table in metadata.sorted_tables:
+        assert {column['name'] for column in reflected.get_columns(table.name)} == {column.name for column in table.columns}
+        indexes = {index['name'] for index in reflected.get_indexes(table.name)}
+        assert {index.name for index in table.indexes} <= indexes
+        foreign_keys = {key['name'] for key in reflected.get_foreign_keys(table.name)}
+        assert foreign_keys == {key.name for key in table.foreign_keys}
@@ -0,0 +1,92 @@
+from backend.config import config
+from backend.database import transaction
+from backend.search_index import InvertedIndex
+
+def test_index_only_visits_the_given_scopes():
+    index = InvertedIndex()
+    index.load([
+        (1, ('private', 1), 'apple pie'),
+        (2, ('private', 2), 'apple tart'),
+        (3, ('group', 1), 'apple apple pie'),
+    ], 3)
+    assert [message_id for _, message_id in index.search('apple pie', {('private', 1), ('group', 1)}, 10)] == [3, 1]
+    assert index.search('apple', {('private', 9)}, 10) == []
+    assert index.search('apple missing', {('private', 1)}, 10) == []
+
+def test_index_pages_by_score_and_id():
+    index = InvertedIndex()
+    index.load([(message_id, ('group', 1), 'same words') for message_id in range(1, 6)], 5)
+    first = index.search('words', {('group', 1)}, 2)
+    second = index.search('words', {('group', 1)}, 2, after=first[-1])
+    third = index.search('words', {('group', 1)}, 2, after=second[-1])
+    assert [message_id for _, message_id in first + second + third] == [5, 4, 3, 2, 1]
+
+def test_search_is_limited_to_the_callers_conversations(login):
+    alice, alice_user = login()
+    bob, bob_user = login()
+    carol, _ = login()
+    word = f"secret{alice_user['id']}"
+    alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': f'{word} plans'})
+    group_id = alice.post('/api/groups/create', json={'name': 'search group'}).get_json()['group_id']
+    alice.post(f'/api/groups/{group_id}/send-message', json={'content': f'{word} in the group'})
+
+    assert len(alice.get(f'/api/search?q={word}').get_json()['results']) == 2
+    [result] = bob.get(f'/api/search?q={word}').get_json()['results']
+    assert result['content'] == f'{word} plans'
+    assert carol.get(f'/api/search?q={word}').get_json() == {'results': [], 'next_cursor': None}
+
+    carol.post(f'/api/groups/{group_id}/join')
+    [result] = carol.get(f'/api/search?q={word}').get_json()['results']
+    assert result['group_name'] == 'search group'
+
+def test_search_pages_with_a_cursor(login):
+    alice, alice_user = login()
+    _, bob_user = login()
+    word = f"paged{alice_user['id']}"
+    sent = [
+        alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': f'{word} {i}'}).get_json()['id']
+        for i in range(5)
+    ]
+
+    page = alice.get(f'/api/search?q={word}&limit=2').get_json()
+    seen = [result['id'] for result in page['results']]
+    while page['next_cursor']:
+        page = alice.get(f"/api/search?q={word}&limit=2&cursor={page['next_cursor']}").get_json()
+        seen += [result['id'] for result in page['results']]
+    assert sorted(seen) == sorted(sent)
+    assert len(seen) == len(set(seen))
+    assert alice.get(f'/api/search?q={word}&cursor=zz').status_code == 400
+    assert alice.get('/api/search').status_code == 400
+
+def test_snippet_is_trimmed_around_the_first_match(login):
+    alice, alice_user = login()
+    _, bob_user = login()
+    word = f"needle{alice_user['id']}"
+    content = 'x' * 500 + f' {word} ' + 'y' * 500
+    alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': content})
+
+    [result] = alice.get(f'/api/search?q={word}').get_json()['results']
+    snippet = result['snippet']
+    assert word in snippet
+    assert snippet.startswith('…') and snippet.endswith('…')
+    assert len(snippet) <= config.SEARCH_SNIPPET_LENGTH + 2
+    assert result['content'] == content
+
+def test_search_finds_messages_stored_after_the_index_loaded(login):
+    alice, alice_user = login()
+    _, bob_user = login()
+    word = f"later{alice_user['id']}"
+    assert alice.get(f'/api/search?q={word}').get_json()['results'] == []
+
+    # Sent through this process, then stored by another one
+    alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': f'{word} one'})
+    chat = alice.get('/api/private/chats').get_json()[0]
+    with transaction() as cursor:
+        cursor.execute(
+            '''INSERT INTO messages (sender_id, receiver_id, conversation_id, message_type, content)
+               VALUES (%s, %s, %s, 'private', %s)''',
+            (bob_user['id'], alice_user['id'], chat['id'], f'{word} two')
+        )
+
+    results = alice.get(f'/api/search?q={word}').get_json()['results']
+    assert sorted(result['content'] for result in results) == [f'{word} one', f'{word} two']
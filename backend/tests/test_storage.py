@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy.dialects import mysql, sqlite
+from backend.database import transaction, insert_ignore, _convert_paramstyle
+from backend.schema import group_members
+
+def test_placeholders_follow_the_driver_paramstyle():
+    query = "SELECT '100%%' AS label FROM t WHERE a = %s AND b = %s"
+    assert _convert_paramstyle(query, 'pyformat') == query
+    assert _convert_paramstyle(query, 'qmark') == "SELECT '100%' AS label FROM t WHERE a = ? AND b = ?"
+    with pytest.raises(ValueError):
+        _convert_paramstyle(query, 'named')
+
+def test_insert_ignore_compiles_per_dialect():
+    statement = insert_ignore(group_members)
+    assert str(statement.compile(dialect=mysql.dialect())).startswith('INSERT IGNORE INTO group_members')
+    assert str(statement.compile(dialect=sqlite.dialect())).startswith('INSERT OR IGNORE INTO group_members')
+
+def test_insert_ignore_skips_duplicates(login, app_context):
+    _, user = login()
+    with transaction() as cursor:
+        cursor.execute('INSERT INTO group_chats (name, created_by) VALUES (%s, %s)', ('dupes', user['id']))
+        group_id = cursor.lastrowid
+        cursor.execute(insert_ignore(group_members), {'group_id': group_id, 'user_id': user['id']})
+        assert cursor.rowcount == 1
+        cursor.execute(insert_ignore(group_members), {'group_id': group_id, 'user_id': user['id']})
+        assert cursor.rowcount == 0
+
+def test_sql_looking_content_is_stored_verbatim(login):
+    alice, _ = login()
+    bob, bob_user = login()
+    content = "100% sure: INSERT IGNORE INTO x VALUES (%s, %%s) -- '?'"
+    sent = alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': content}).get_json()
+    assert sent['content'] == content
+    with transaction() as cursor:
+        cursor.execute('SELECT content FROM messages WHERE id = %s', (sent['id'],))
+        assert cursor.fetchone()['content'] == content
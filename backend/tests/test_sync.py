@@ -0,0 +1,40 @@
+def test_sync_pages_through_every_chat_in_id_order(login):
+    alice, alice_user = login()
+    bob, bob_user = login()
+    carol, _ = login()
+    group_id = alice.post('/api/groups/create', json={'name': 'sync group'}).get_json()['group_id']
+    other_group_id = carol.post('/api/groups/create', json={'name': 'not bob'}).get_json()['group_id']
+    bob.post(f'/api/groups/{group_id}/join')
+
+    first = alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': 'p0'}).get_json()['id']
+    expected = []
+    for i in range(3):
+        expected.append(alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': f'p{i + 1}'}).get_json()['id'])
+        expected.append(alice.post(f'/api/groups/{group_id}/send-message', json={'content': f'g{i}'}).get_json()['id'])
+        carol.post(f'/api/groups/{other_group_id}/send-message', json={'content': 'hidden'})
+        carol.post('/api/private/send-message', json={'receiver_id': alice_user['id'], 'content': 'hidden'})
+
+    page = bob.get(f'/api/sync?since_id={first}&limit=4').get_json()
+    seen = [m['id'] for m in page['messages']]
+    assert len(seen) == 4
+    assert page['messages'][1]['group_name'] == 'sync group'
+    page = bob.get(f"/api/sync?since_id={page['next_cursor']}&limit=4").get_json()
+    seen += [m['id'] for m in page['messages']]
+    assert page['next_cursor'] is None
+    assert seen == expected
+
+def test_sync_requires_since_id(login):
+    alice, _ = login()
+    assert alice.get('/api/sync').status_code == 400
+
+def test_sync_socket_event_acknowledges_with_a_page(login, connect):
+    alice, _ = login()
+    bob, bob_user = login()
+    first = alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': 'a'}).get_json()['id']
+    alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': 'b'})
+    alice.post('/api/private/send-message', json={'receiver_id': bob_user['id'], 'content': 'c'})
+
+    sock = connect(bob)
+    ack = sock.emit('sync', {'since_id': first, 'limit': 1}, callback=True)
+    assert [m['content'] for m in ack['messages']] == ['b']
+    assert ack['next_cursor'] == ack['messages'][0]['id']
@@ -0,0 +1,54 @@
+import pytest
+from backend.database import transaction, failure_count, on_commit, TransactionAborted
+from backend.models.inbox import Inbox
+from backend.models.group_chat import GroupChat
+
+def count(table):
+    with transaction() as cursor:
+        cursor.execute(f'SELECT COUNT(*) AS n FROM {table}')
+        return cursor.fetchone()['n']
+
+def test_nested_blocks_commit_once_and_run_callbacks_after(login, app_context):
+    _, user = login()
+    calls = []
+    with transaction() as cursor:
+        with transaction() as inner:
+            inner.execute('INSERT INTO group_chats (name, created_by) VALUES (%s, %s)', ('nested', user['id']))
+            on_commit(lambda: calls.append('committed'))
+        assert calls == []
+    assert calls == ['committed']
+
+def test_failed_nested_block_rolls_back_the_whole_transaction(login, monkeypatch, app_context):
+    _, user = login()
+    groups, members = count('group_chats'), count('group_members')
+
+    def fail(*args):
+        raise RuntimeError('inbox unavailable')
+
+    # add_participants fails inside create(); the model catches it, but the
+    # group and its first member must not be committed without their inbox
+    monkeypatch.setattr(Inbox, 'add_participants', staticmethod(fail))
+    failures = failure_count()
+    assert GroupChat.create('half made', '', user['id']) is None
+    assert failure_count() > failures
+    assert (count('group_chats'), count('group_members')) == (groups, members)
+
+    monkeypatch.undo()
+    assert GroupChat.create('whole', '', user['id'])
+    assert count('group_chats') == groups + 1
+
+def test_caught_nested_failure_aborts_the_outer_block(app_context):
+    calls = []
+    with pytest.raises(TransactionAborted):
+        with transaction():
+            on_commit(lambda: calls.append('committed'))
+            try:
+                with transaction() as cursor:
+                    cursor.execute('SELECT * FROM no_such_table')
+            except Exception:
+                pass
+    assert calls == []
+    # The session is usable again afterwards
+    with transaction() as cursor:
+        cursor.execute('SELECT 1 AS one')
+        assert cursor.fetchone() == {'one': 1}
@@ -0,0 +1,73 @@
+import pytest
+from backend import database
+from backend.app import flush_typing
+from backend.typing_indicators import TypingTracker, typing_tracker
+
+def test_tracker_throttles_and_reports_changed_rooms_once():
+    tracker = TypingTracker(throttle=60, ttl=60)
+    assert tracker.typing('room', {'group_id': 1}, 1, 'alice')
+    assert not tracker.typing('room', {'group_id': 1}, 1, 'alice')
+    assert tracker.flush() == {'room': {'group_id': 1, 'users': [{'id': 1, 'username': 'alice'}]}}
+    assert tracker.flush() == {}
+    tracker.stopped('room', 1)
+    assert tracker.flush() == {'room': {'group_id': 1, 'users': []}}
+    assert tracker.flush() == {}
+
+def test_tracker_expires_silent_typers(monkeypatch):
+    tracker = TypingTracker(throttle=0, ttl=5)
+    now = [100.0]
+    monkeypatch.setattr('backend.typing_indicators.time.monotonic', lambda: now[0])
+    tracker.typing('room', {'group_id': 1}, 1, 'alice')
+    tracker.flush()
+    now[0] += 6
+    assert tracker.flush() == {'room': {'group_id': 1, 'users': []}}
+
+@pytest.fixture
+def fast_typing(monkeypatch):
+    monkeypatch.setattr(typing_tracker, 'throttle', 0)
+    typing_tracker.flush()
+
+def test_typing_events_are_batched_per_room_without_queries(login, connect, received, monkeypatch, fast_typing):
+    alice, alice_user = login()
+    bob, bob_user = login()
+    carol, _ = login()
+    group_id = alice.post('/api/groups/create', json={'name': 'typing group'}).get_json()['group_id']
+    bob.post(f'/api/groups/{group_id}/join')
+    alice_sock, bob_sock, carol_sock = connect(alice), connect(bob), connect(carol)
+    for sock in (alice_sock, bob_sock):
+        sock.emit('join_group_chat', {'group_id': group_id})
+    alice_sock.emit('join_private_chat', {'other_user_id': bob_user['id']})
+    bob_sock.emit('join_private_chat', {'other_user_id': alice_user['id']})
+    received(alice_sock, 'typing')
+    received(bob_sock, 'typing')
+
+    queries = []
+    execute = database.Cursor.execute
+    monkeypatch.setattr(database.Cursor, 'execute', lambda self, *args: queries.append(args) or execute(self, *args))
+    for _ in range(5):
+        alice_sock.emit('typing', {'group_id': group_id})
+    bob_sock.emit('typing', {'group_id': group_id})
+    # Not a member: ignored
+    carol_sock.emit('typing', {'group_id': group_id})
+    alice_sock.emit('typing', {'receiver_id': bob_user['id']})
+    assert queries == []
+
+    flush_typing()
+    updates = received(bob_sock, 'typing')
+    assert {'group_id': group_id, 'users': [
+        {'id': alice_user['id'], 'username': alice_user['username']},
+        {'id': bob_user['id'], 'username': bob_user['username']},
+    ]} in updates
+    assert {'user_ids': [alice_user['id'], bob_user['id']], 'users': [
+        {'id': alice_user['id'], 'username': alice_user['username']},
+    ]} in updates
+    assert len(updates) == 2
+
+    flush_typing()
+    assert received(bob_sock, 'typing') == []
+
+    alice_sock.emit('typing', {'group_id': group_id, 'typing': False})
+    flush_typing()
+    assert received(bob_sock, 'typing') == [{'group_id': group_id, 'users': [
+        {'id': bob_user['id'], 'username': bob_user['username']},
+    ]}]
@@ -0,0 +1,23 @@
+def test_user_search_matches_prefix_by_default(login):
+    alice, user = login()
+    base = f"srch{user['id']}"
+    for name in (f'{base}ab', f'{base}ac', f'x{base}ab'):
+        login(name)
+
+    page = alice.get(f'/api/users/search?q={base}&limit=1').get_json()
+    names = [u['username'] for u in page['users']]
+    page = alice.get(f"/api/users/search?q={base}&limit=1&cursor={page['next_cursor']}").get_json()
+    names += [u['username'] for u in page['users']]
+    assert names == [f'{base}ab', f'{base}ac']
+    assert page['next_cursor'] is None
+
+    contains = alice.get(f'/api/users/search?q={base}ab&match=contains').get_json()
+    assert [u['username'] for u in contains['users']] == [f'{base}ab', f'x{base}ab']
+    assert alice.get('/api/users/search?match=fuzzy').status_code == 400
+
+def test_user_search_escapes_like_wildcards(login):
+    alice, user = login()
+    login(f"pct{user['id']}%x")
+    login(f"pct{user['id']}yx")
+    found = alice.get(f"/api/users/search?q=pct{user['id']}%25").get_json()['users']
+    assert [u['username'] for u in found] == [f"pct{user['id']}%x"]
@@ -0,0 +1,70 @@
+import time
+import threading
+from backend.config import config
+
+class TypingTracker:
+    """Who is typing in which room, kept only in memory.
+
+    typing() is throttled per user per room: a repeat within throttle
+    seconds is dropped before it touches anything shared. Entries expire
+    ttl seconds after the last accepted typing() unless refreshed, so a
+    client that vanishes mid-sentence stops showing as typing. flush()
+    returns only the rooms whose typers changed, one snapshot each, for
+    the caller to emit.
+    """
+
+    def __init__(self, throttle, ttl):
+        self.throttle = throttle
+        self.ttl = ttl
+        # room -> {'scope': {...}, 'users': {user id: [username, accepted_at]}}
+        self._rooms = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def typing(self, room, scope, user_id, username):
+        """Record that user_id is typing in room; False if throttled"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._rooms.setdefault(room, {'scope': scope, 'users': {}})
+            typer = entry['users'].get(user_id)
+            if typer is not None:
+                if now - typer[1] < self.throttle:
+                    return False
+                typer[1] = now
+                return True
+            entry['users'][user_id] = [username, now]
+            self._dirty.add(room)
+            return True
+
+    def stopped(self, room, user_id):
+        """user_id stopped typing in room (sent, cleared the box, left)"""
+        with self._lock:
+            entry = self._rooms.get(room)
+            if entry is not None and entry['users'].pop(user_id, None) is not None:
+                self._dirty.add(room)
+
+    def flush(self):
+        """Expire stale typers and return {room: payload} for changed rooms"""
+        expired_before = time.monotonic() - self.ttl
+        with self._lock:
+            for room, entry in self._rooms.items():
+                stale = [user_id for user_id, (_, accepted_at) in entry['users'].items() if accepted_at <= expired_before]
+                for user_id in stale:
+                    del entry['users'][user_id]
+                if stale:
+                    self._dirty.add(room)
+            updates = {}
+            for room in self._dirty:
+                entry = self._rooms.get(room)
+                if entry is None:
+                    continue
+                updates[room] = dict(entry['scope'], users=[
+                    {'id': user_id, 'username': username}
+                    for user_id, (username, _) in sorted(entry['users'].items())
+                ])
+                if not entry['users']:
+                    del self._rooms[room]
+            self._dirty = set()
+            return updates
+
+typing_tracker = TypingTracker(config.TYPING_THROTTLE, config.TYPING_TTL)
@@ -0,0 +1,44 @@
+import os
+import time
+import hashlib
+import threading
+from backend.config import config
+from backend.database import on_commit
+
+class VersionCounters:
+    """Per-resource change counters that listing endpoints turn into ETags.
+
+    Writes bump the keys they affect once their transaction commits, so a
+    reader that sees the new count also sees the new rows. Counters live in
+    this process; ETags carry a per-process epoch (and, with ETAG_WINDOW, a
+    time bucket) so another worker's or a restarted process's tags never
+    match and other workers' writes show within the window.
+
+    Keys: 'users', 'groups', ('members', group_id), ('group', group_id) for
+    a group's last message, ('inbox', user_id, chat_type) for a user's
+    summaries of one chat type.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._epoch = os.urandom(8).hex()
+
+    def get(self, key):
+        return self._counts.get(key, 0)
+
+    def _bump(self, keys):
+        with self._lock:
+            for key in keys:
+                self._counts[key] = self._counts.get(key, 0) + 1
+
+    def bump(self, *keys):
+        """Count a change to keys when the current transaction commits"""
+        on_commit(lambda: self._bump(keys))
+
+    def etag(self, *parts):
+        """Strong ETag (unquoted) for a response built from parts"""
+        window = int(time.time() // config.ETAG_WINDOW) if config.ETAG_WINDOW > 0 else 0
+        return hashlib.sha1(repr((self._epoch, window, parts)).encode('utf-8')).hexdigest()[:24]
+
+versions = VersionCounters()
@@ -12,12 +12,32 @@ const Dashboard = ({ user, onLogout }) => {
   const [selectedUser, setSelectedUser] = useState(null);
   const [selectedGroup, setSelectedGroup] = useState(null);
   const [socket, setSocket] = useState(null);
+  const [onlineUsers, setOnlineUsers] = useState(new Set());
 
   useEffect(() => {
-    // Initialize socket connection
-    const newSocket = io();
+    // Initialize socket connection. Multi-worker deployments without sticky
+    // sessions run the server websocket-only (see backend/README.md)
+    const websocketOnly = import.meta.env.VITE_SOCKET_WEBSOCKET_ONLY === 'true';
+    const newSocket = io(websocketOnly ? { transports: ['websocket'] } : {});
     setSocket(newSocket);
 
+    // Snapshot of online contacts on every (re)connect, then diffs
+    newSocket.on('connect', () => {
+      newSocket.emit('get_presence', (response) => {
+        if (response && response.online) {
+          setOnlineUsers(new Set(response.online));
+        }
+      });
+    });
+    newSocket.on('presence', ({ online, offline }) => {
+      setOnlineUsers(prev => {
+        const next = new Set(prev);
+        online.forEach(id => next.add(id));
+        offline.forEach(id => next.delete(id));
+        return next;
+      });
+    });
+
     return () => newSocket.close();
   }, []);
 
@@ -70,6 +90,7 @@ const Dashboard = ({ user, onLogout }) => {
             <UserList 
               onUserSelect={handleUserSelect}
               selectedUser={selectedUser}
+              onlineUsers={onlineUsers}
             />
           )}
           {activeTab === 'groups' && (
@@ -1,43 +1,168 @@
 import React, { useState, useEffect, useRef } from 'react';
-import { groupChatAPI } from '../services/api';
+import { groupChatAPI, messagesAPI } from '../services/api';
 
 const GroupChat = ({ user, group, socket }) => {
   const [messages, setMessages] = useState([]);
   const [newMessage, setNewMessage] = useState('');
   const [loading, setLoading] = useState(true);
   const messagesEndRef = useRef(null);
+  const containerRef = useRef(null);
+  // before_id for the next older page; null once the start is reached
+  const [olderCursor, setOlderCursor] = useState(null);
+  const loadingOlderRef = useRef(false);
+  // Distance from the bottom to keep while older messages are prepended
+  const restoreScrollRef = useRef(null);
+  const [typingUsers, setTypingUsers] = useState([]);
+  const lastTypingSentRef = useRef(0);
+  // Highest server message id shown; reconnect catch-up starts after it
+  const lastIdRef = useRef(0);
+  const markReadTimerRef = useRef(null);
+  // Messages arrived while the window was in the background
+  const unreadWhileAwayRef = useRef(false);
+
+  const trackLastId = (received) => {
+    for (const message of received) {
+      lastIdRef.current = Math.max(lastIdRef.current, message.id);
+    }
+  };
+
+  const sendMarkRead = async () => {
+    try {
+      await groupChatAPI.markRead(group.id);
+    } catch (error) {
+      console.error('Error marking chat read:', error);
+    }
+  };
+
+  // Messages that arrive while the chat is open and the window focused are
+  // read; a burst of them is reported with one request
+  const markRead = () => {
+    if (!document.hasFocus()) {
+      unreadWhileAwayRef.current = true;
+      return;
+    }
+    if (markReadTimerRef.current) return;
+    markReadTimerRef.current = setTimeout(() => {
+      markReadTimerRef.current = null;
+      sendMarkRead();
+    }, 1000);
+  };
+
+  const markReadIfIncoming = (received) => {
+    if (received.some(message => message.sender_id !== user.id)) {
+      markRead();
+    }
+  };
 
   useEffect(() => {
+    lastIdRef.current = 0;
+    unreadWhileAwayRef.current = false;
+    setTypingUsers([]);
     loadMessages();
     
     if (socket && group) {
       // Join group chat room
       socket.emit('join_group_chat', { group_id: group.id });
       
+      const isInGroup = (message) => message.group_id === group.id;
+      
       // Listen for incoming messages
       const handleReceiveMessage = (message) => {
         console.log('Received group message:', message);
-        if (message.group_id === group.id) {
+        if (isInGroup(message)) {
+          trackLastId([message]);
           setMessages(prev => [...prev, message]);
+          markReadIfIncoming([message]);
+        }
+      };
+      
+      // Batched sends arrive as one event per room
+      const handleReceiveMessages = (batch) => {
+        const mine = batch.filter(isInGroup);
+        if (mine.length) {
+          trackLastId(mine);
+          setMessages(prev => [...prev, ...mine]);
+          markReadIfIncoming(mine);
+        }
+      };
+      
+      // After a dropped connection, rejoin the room and fetch only what
+      // was missed instead of reloading the whole history
+      const handleReconnect = async () => {
+        socket.emit('join_group_chat', { group_id: group.id });
+        if (!lastIdRef.current) {
+          // Nothing shown yet: a normal load is cheaper than a full sync
+          loadMessages();
+          return;
+        }
+        try {
+          const missed = (await messagesAPI.syncSince(lastIdRef.current))
+            .filter(message => isInGroup(message) && message.id > lastIdRef.current);
+          if (missed.length) {
+            trackLastId(missed);
+            setMessages(prev => [...prev, ...missed]);
+            markReadIfIncoming(missed);
+          }
+        } catch (error) {
+          console.error('Error syncing group messages:', error);
         }
       };
       
       socket.on('receive_group_message', handleReceiveMessage);
+      socket.on('receive_group_messages', handleReceiveMessages);
+      socket.io.on('reconnect', handleReconnect);
+
+      // Who else is typing here; the server sends a snapshot when it changes
+      const handleTyping = (update) => {
+        if (update.group_id === group.id) {
+          setTypingUsers(update.users.filter(typer => typer.id !== user.id));
+        }
+      };
+      socket.on('typing', handleTyping);
+
+      // Coming back to the window reads whatever arrived while away
+      const handleFocus = () => {
+        if (unreadWhileAwayRef.current) {
+          unreadWhileAwayRef.current = false;
+          markRead();
+        }
+      };
+      window.addEventListener('focus', handleFocus);
 
       return () => {
+        // Report a pending read before switching away from this chat
+        if (markReadTimerRef.current) {
+          clearTimeout(markReadTimerRef.current);
+          markReadTimerRef.current = null;
+          sendMarkRead();
+        }
+        window.removeEventListener('focus', handleFocus);
         socket.off('receive_group_message', handleReceiveMessage);
+        socket.off('receive_group_messages', handleReceiveMessages);
+        socket.io.off('reconnect', handleReconnect);
+        socket.off('typing', handleTyping);
       };
     }
   }, [socket, group]);
 
   useEffect(() => {
+    if (restoreScrollRef.current !== null) {
+      const container = containerRef.current;
+      container.scrollTop = container.scrollHeight - restoreScrollRef.current;
+      restoreScrollRef.current = null;
+      return;
+    }
     scrollToBottom();
   }, [messages]);
 
   const loadMessages = async () => {
     try {
       const response = await groupChatAPI.getMessages(group.id);
-      setMessages(response.data);
+      trackLastId(response.data.messages);
+      setMessages(response.data.messages);
+      setOlderCursor(response.data.next_cursor);
+      // Opening the chat shows its newest messages
+      sendMarkRead();
     } catch (error) {
       console.error('Error loading group messages:', error);
     } finally {
@@ -45,10 +170,47 @@ const GroupChat = ({ user, group, socket }) => {
     }
   };
 
+  const loadOlderMessages = async () => {
+    if (!olderCursor || loadingOlderRef.current) return;
+    loadingOlderRef.current = true;
+    try {
+      const response = await groupChatAPI.getMessages(group.id, { before_id: olderCursor });
+      const container = containerRef.current;
+      restoreScrollRef.current = container.scrollHeight - container.scrollTop;
+      setMessages(prev => [...response.data.messages, ...prev]);
+      setOlderCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Error loading older group messages:', error);
+    } finally {
+      loadingOlderRef.current = false;
+    }
+  };
+
+  const handleScroll = (e) => {
+    // Reaching the top pages back into older history
+    if (e.target.scrollTop < 50) {
+      loadOlderMessages();
+    }
+  };
+
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   };
 
+  const handleInputChange = (e) => {
+    setNewMessage(e.target.value);
+    // The server keeps an indicator alive for a few seconds per signal
+    const now = Date.now();
+    if (socket && e.target.value && now - lastTypingSentRef.current > 1000) {
+      lastTypingSentRef.current = now;
+      socket.emit('typing', { group_id: group.id });
+    } else if (socket && !e.target.value && lastTypingSentRef.current) {
+      // Cleared the box: drop the indicator now rather than on expiry
+      lastTypingSentRef.current = 0;
+      socket.emit('typing', { group_id: group.id, typing: false });
+    }
+  };
+
   const handleSendMessage = async (e) => {
     e.preventDefault();
     if (!newMessage.trim()) return;
@@ -75,6 +237,7 @@ const GroupChat = ({ user, group, socket }) => {
       
       setMessages(prev => [...prev, optimisticMessage]);
       setNewMessage('');
+      lastTypingSentRef.current = 0;
       
     } catch (error) {
       console.error('Error sending group message:', error);
@@ -100,7 +263,7 @@ const GroupChat = ({ user, group, socket }) => {
         </div>
       </div>
 
-      <div className="messages-container">
+      <div className="messages-container" ref={containerRef} onScroll={handleScroll}>
         {messages.map((message) => (
           <div
             key={message.id}
@@ -118,12 +281,18 @@ const GroupChat = ({ user, group, socket }) => {
         <div ref={messagesEndRef} />
       </div>
 
+      {typingUsers.length > 0 && (
+        <div className="typing-indicator">
+          {typingUsers.map(typer => typer.username).join(', ')} {typingUsers.length === 1 ? 'is' : 'are'} typing...
+        </div>
+      )}
+
       <form onSubmit={handleSendMessage} className="message-input-form">
         <div className="message-input-group">
           <input
             type="text"
             value={newMessage}
-            onChange={(e) => setNewMessage(e.target.value)}
+            onChange={handleInputChange}
             placeholder={`Message #${group.name}...`}
             className="message-input"
           />
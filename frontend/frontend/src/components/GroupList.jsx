@@ -6,15 +6,23 @@ const GroupList = ({ onGroupSelect, selectedGroup, onGroupCreated, currentUser }
   const [showCreateForm, setShowCreateForm] = useState(false);
   const [newGroup, setNewGroup] = useState({ name: '', description: '' });
   const [loading, setLoading] = useState(true);
+  const [query, setQuery] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [joinedIds, setJoinedIds] = useState(new Set());
 
   useEffect(() => {
-    loadGroups();
-  }, []);
+    // Wait for a pause in typing before asking the server
+    const timer = setTimeout(() => loadGroups(), 250);
+    return () => clearTimeout(timer);
+  }, [query]);
 
-  const loadGroups = async () => {
+  // First page for the current name filter, or the page after cursor
+  const loadGroups = async (cursor = null) => {
     try {
-      const response = await groupChatAPI.getGroups();
-      setGroups(response.data);
+      const q = query.trim();
+      const response = await groupChatAPI.getGroups({ q: q || undefined, cursor: cursor || undefined });
+      setGroups(prev => (cursor ? [...prev, ...response.data.groups] : response.data.groups));
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error loading groups:', error);
     } finally {
@@ -34,19 +42,22 @@ const GroupList = ({ onGroupSelect, selectedGroup, onGroupCreated, currentUser }
     }
   };
 
-  const handleJoinGroup = async (groupId) => {
+  const handleJoinGroup = async (e, groupId) => {
+    // Joining is its own action, not a side effect of opening the group
+    e.stopPropagation();
     try {
-      await groupChatAPI.joinGroup(groupId);
-      loadGroups(); // Reload to update membership status
+      const response = await groupChatAPI.joinGroup(groupId);
+      setJoinedIds(prev => new Set(prev).add(groupId));
+      // Update the count in place so later pages stay loaded
+      if (response.data.message === 'Joined group successfully') {
+        setGroups(prev => prev.map(group =>
+          group.id === groupId ? { ...group, member_count: group.member_count + 1 } : group));
+      }
     } catch (error) {
       console.error('Error joining group:', error);
     }
   };
 
-  if (loading) {
-    return <div style={{ padding: '1rem', textAlign: 'center' }}>Loading groups...</div>;
-  }
-
   return (
     <div>
       <div style={{ padding: '1rem' }}>
@@ -90,12 +101,25 @@ const GroupList = ({ onGroupSelect, selectedGroup, onGroupCreated, currentUser }
         </form>
       )}
 
+      <div style={{ padding: '0 1rem 0.5rem' }}>
+        <input
+          type="text"
+          placeholder="Search groups by name..."
+          value={query}
+          onChange={(e) => setQuery(e.target.value)}
+          style={{ width: '100%' }}
+        />
+      </div>
+
+      {loading && <div style={{ padding: '1rem', textAlign: 'center' }}>Loading groups...</div>}
+
       <ul className="group-list">
         {groups.map(group => (
           <li
             key={group.id}
             className={`group-item ${selectedGroup?.id === group.id ? 'active' : ''}`}
             onClick={() => onGroupSelect(group)}
+            style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center' }}
           >
             <div>
               <div style={{ fontWeight: 'bold' }}>#{group.name}</div>
@@ -108,9 +132,19 @@ const GroupList = ({ onGroupSelect, selectedGroup, onGroupCreated, currentUser }
                 </div>
               )}
             </div>
+            {!joinedIds.has(group.id) && (
+              <button className="btn btn-secondary" onClick={(e) => handleJoinGroup(e, group.id)}>
+                Join
+              </button>
+            )}
           </li>
         ))}
       </ul>
+      {nextCursor && (
+        <div style={{ padding: '0.5rem 1rem', textAlign: 'center' }}>
+          <button onClick={() => loadGroups(nextCursor)}>Load more</button>
+        </div>
+      )}
     </div>
   );
 };
@@ -1,18 +1,38 @@
 import React, { useState, useEffect } from 'react';
 import { usersAPI } from '../services/api';
 
-const UserList = ({ onUserSelect, selectedUser }) => {
+const UserList = ({ onUserSelect, selectedUser, onlineUsers }) => {
   const [users, setUsers] = useState([]);
+  const [recentContacts, setRecentContacts] = useState([]);
+  const [query, setQuery] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    loadUsers();
+    loadRecentContacts();
   }, []);
 
-  const loadUsers = async () => {
+  useEffect(() => {
+    // Wait for a pause in typing before asking the server
+    const timer = setTimeout(() => loadUsers(query.trim()), 250);
+    return () => clearTimeout(timer);
+  }, [query]);
+
+  const loadRecentContacts = async () => {
+    try {
+      const response = await usersAPI.getRecentContacts();
+      setRecentContacts(response.data);
+    } catch (error) {
+      console.error('Error loading recent contacts:', error);
+    }
+  };
+
+  const loadUsers = async (q, cursor = null) => {
     try {
-      const response = await usersAPI.getUsers();
-      setUsers(response.data);
+      // Prefix matches are index range scans; 'contains' would scan the table
+      const response = await usersAPI.searchUsers({ q: q || undefined, cursor: cursor || undefined });
+      setUsers(prev => (cursor ? [...prev, ...response.data.users] : response.data.users));
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error loading users:', error);
     } finally {
@@ -20,27 +40,50 @@ const UserList = ({ onUserSelect, selectedUser }) => {
     }
   };
 
-  if (loading) {
-    return <div style={{ padding: '1rem', textAlign: 'center' }}>Loading users...</div>;
-  }
+  const renderUser = (user) => (
+    <li
+      key={user.id}
+      className={`user-item ${selectedUser?.id === user.id ? 'active' : ''}`}
+      onClick={() => onUserSelect(user)}
+    >
+      <span className={`user-status ${onlineUsers?.has(user.id) ? '' : 'offline'}`}></span>
+      <div>
+        <div style={{ fontWeight: 'bold' }}>{user.username}</div>
+        <div style={{ fontSize: '0.8rem', color: '#bdc3c7' }}>{user.email}</div>
+      </div>
+    </li>
+  );
 
   return (
-    <ul className="user-list">
-      {users.map(user => (
-        <li
-          key={user.id}
-          className={`user-item ${selectedUser?.id === user.id ? 'active' : ''}`}
-          onClick={() => onUserSelect(user)}
-        >
-          <span className="user-status"></span>
-          <div>
-            <div style={{ fontWeight: 'bold' }}>{user.username}</div>
-            <div style={{ fontSize: '0.8rem', color: '#bdc3c7' }}>{user.email}</div>
-          </div>
-        </li>
-      ))}
-    </ul>
+    <div>
+      <div style={{ padding: '0.5rem 1rem' }}>
+        <input
+          type="text"
+          placeholder="Search users..."
+          value={query}
+          onChange={(e) => setQuery(e.target.value)}
+          style={{ width: '100%' }}
+        />
+      </div>
+      {!query && recentContacts.length > 0 && (
+        <>
+          <div style={{ padding: '0 1rem', fontSize: '0.8rem', color: '#bdc3c7' }}>Recent</div>
+          <ul className="user-list">{recentContacts.map(renderUser)}</ul>
+          <div style={{ padding: '0 1rem', fontSize: '0.8rem', color: '#bdc3c7' }}>All users</div>
+        </>
+      )}
+      {loading ? (
+        <div style={{ padding: '1rem', textAlign: 'center' }}>Loading users...</div>
+      ) : (
+        <ul className="user-list">{users.map(renderUser)}</ul>
+      )}
+      {nextCursor && (
+        <div style={{ padding: '0.5rem 1rem', textAlign: 'center' }}>
+          <button onClick={() => loadUsers(query.trim(), nextCursor)}>Load more</button>
+        </div>
+      )}
+    </div>
   );
 };
 
-export default UserList;
\ No newline at end of file
+export default UserList;
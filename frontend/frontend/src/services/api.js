@@ -19,25 +19,47 @@ export const authAPI = {
 // Users API
 export const usersAPI = {
   getUsers: () => api.get('/users'),
+  // Paged directory: { q, match: 'prefix' | 'contains', cursor, limit }
+  searchUsers: (params) => api.get('/users/search', { params }),
+  getRecentContacts: () => api.get('/users/recent'),
 };
 
 // Private Chat API
 export const privateChatAPI = {
   startChat: (otherUserId) => api.post(`/private/start-chat/${otherUserId}`),
   sendMessage: (data) => api.post('/private/send-message', data),
-  getMessages: (otherUserId) => api.get(`/private/messages/${otherUserId}`),
+  getMessages: (otherUserId, params) => api.get(`/private/messages/${otherUserId}`, { params }),
   getChats: () => api.get('/private/chats'),
+  markRead: (otherUserId) => api.post(`/private/chats/${otherUserId}/read`),
+};
+
+// Batched sends: [{ type: 'private', receiver_id, content } | { type: 'group', group_id, content }]
+export const messagesAPI = {
+  sendBatch: (messages) => api.post('/messages/batch', { messages }),
+  sync: (sinceId, params) => api.get('/sync', { params: { since_id: sinceId, ...params } }),
+  // Every message newer than sinceId across the user's chats, following continuation pages
+  syncSince: async (sinceId) => {
+    const messages = [];
+    let cursor = sinceId;
+    while (cursor !== null) {
+      const response = await messagesAPI.sync(cursor);
+      messages.push(...response.data.messages);
+      cursor = response.data.next_cursor;
+    }
+    return messages;
+  },
 };
 
 // Group Chat API
 export const groupChatAPI = {
-  getGroups: () => api.get('/groups'),
+  getGroups: (params) => api.get('/groups', { params }),
   getMyGroups: () => api.get('/groups/my'),
   createGroup: (data) => api.post('/groups/create', data),
   joinGroup: (groupId) => api.post(`/groups/${groupId}/join`),
   sendMessage: (groupId, data) => api.post(`/groups/${groupId}/send-message`, data),
-  getMessages: (groupId) => api.get(`/groups/${groupId}/messages`),
+  getMessages: (groupId, params) => api.get(`/groups/${groupId}/messages`, { params }),
   getMembers: (groupId) => api.get(`/groups/${groupId}/members`),
+  markRead: (groupId) => api.post(`/groups/${groupId}/read`),
 };
 
 export default api;
\ No newline at end of file